@@ -1,12 +1,35 @@
-from flask import Flask, request, jsonify
+import hashlib
+import logging
+import os
+import time
+from datetime import datetime
+from flask import Flask, g, request, jsonify, send_file, url_for
 from flask_cors import CORS
 from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
-from werkzeug.utils import secure_filename
-import os
-from process_data import GoodreadsDataProcessor
+from werkzeug.middleware.proxy_fix import ProxyFix
+from process_data import quick_validate_goodreads_csv
+from jobs import job_store, start_cover_job
+from cover_proxy import (
+    COVER_MAX_AGE, COVER_PROXY, cover_key, cover_url_from_key, get_thumbnail_store, proxy_cover_urls, proxyable
+)
+from result_cache import analysis_results, book_lists, get_processor, prefetch_processor, result_key, upload_digest
+from book_list import DEFAULT_PAGE_SIZE, DEFAULT_SORT, attach_book_lists, parse_fields
+from incremental import reuse_snapshot, save_snapshot
+from percentiles import add_percentiles, record_readers
+from instrumentation import (
+    http_request_duration, log_event, metrics, record_cache_lookup, request_timings, server_timing_header, span,
+    start_request_timings
+)
+from serialization import COMPRESS_MIN_BYTES, compress, dumps, negotiate_encoding
 
 app = Flask(__name__)
+# Render terminates TLS in front of gunicorn; trust its X-Forwarded-* headers so the absolute
+# cover and book list URLs handed to the frontend keep the https scheme and public host
+TRUSTED_PROXIES = int(os.environ.get('TRUSTED_PROXIES', '1'))
+if TRUSTED_PROXIES:
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=TRUSTED_PROXIES, x_proto=TRUSTED_PROXIES,
+                            x_host=TRUSTED_PROXIES)
 CORS(app, resources={r"/*": {"origins": "*"}})
 
 limiter = Limiter(
@@ -15,9 +38,74 @@ limiter = Limiter(
     default_limits=["100 per day", "10 per minute"]
 )
 
-app.config['UPLOAD_FOLDER'] = 'uploads'
 app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024
 ALLOWED_EXTENSIONS = {'csv'}
+DEFAULT_PERIOD = ('2024-01-01', '2024-12-31')
+MAX_YEARS_PER_REQUEST = 10
+
+def _request_param(name):
+    return request.args.get(name, request.form.get(name))
+
+def _cover_proxy_url(url):
+    return url_for('get_cover', key=cover_key(url), _external=True)
+
+def _proxied(stats):
+    """
+    Serve covers through /covers/<key> unless COVER_PROXY is turned off
+    """
+    if COVER_PROXY:
+        proxy_cover_urls(stats, _cover_proxy_url)
+    return stats
+
+def _books_url(books_id):
+    return url_for('get_books', books_id=books_id, _external=True)
+
+def _json_response(payload):
+    """
+    Compact JSON response for statistics and job payloads, keys are kept in the order
+    the statistics were built in
+    """
+    with span('json_encode'):
+        body = dumps(payload)
+    return app.response_class(body, mimetype='application/json')
+
+def _requested_period():
+    """
+    Period asked for by start_date/end_date (YYYY-MM-DD) or a comma separated list of years
+    Returns (start_date, end_date, years), raises ValueError for malformed values
+    """
+    years = _request_param('years')
+    if years:
+        years = sorted({int(year) for year in years.split(',') if year.strip()})
+        if not years or len(years) > MAX_YEARS_PER_REQUEST or not all(1 <= year <= 9999 for year in years):
+            raise ValueError(f'Provide between 1 and {MAX_YEARS_PER_REQUEST} years')
+        return None, None, years
+
+    start_date = _request_param('start_date') or DEFAULT_PERIOD[0]
+    end_date = _request_param('end_date') or DEFAULT_PERIOD[1]
+    for value in (start_date, end_date):
+        datetime.strptime(value, '%Y-%m-%d')
+    if start_date > end_date:
+        raise ValueError('start_date must not be after end_date')
+    return start_date, end_date, None
+
+@app.before_request
+def start_timing():
+    g.request_start = time.perf_counter()
+    start_request_timings()
+
+@app.after_request
+def add_timing(response):
+    """
+    Server-Timing header with the duration of every stage of the request, and the latency histogram
+    Registered first so it runs after the other after_request hooks (compression included)
+    """
+    total = time.perf_counter() - g.get('request_start', time.perf_counter())
+    timings = request_timings()
+    response.headers['Server-Timing'] = server_timing_header(timings or {}, total)
+    endpoint = request.url_rule.rule if request.url_rule else 'unmatched'
+    http_request_duration.observe(total, endpoint=endpoint, status=str(response.status_code))
+    return response
 
 @app.after_request
 def add_security_headers(response):
@@ -31,6 +119,35 @@ def add_security_headers(response):
         response.headers[key] = value
     return response
 
+@app.after_request
+def compress_response(response):
+    """
+    gzip or brotli encode JSON bodies, as negotiated through Accept-Encoding
+    """
+    if (response.mimetype != 'application/json' or response.direct_passthrough
+            or 'Content-Encoding' in response.headers):
+        return response
+    body = response.get_data()
+    if len(body) < COMPRESS_MIN_BYTES:
+        return response
+
+    response.vary.add('Accept-Encoding')
+    encoding = negotiate_encoding(request.headers.get('Accept-Encoding'))
+    if encoding is None:
+        return response
+
+    # Cached analysis results keep their compressed bodies next to them
+    key = g.get('result_key')
+    compressed = analysis_results.get(f"{key}:{encoding}") if key else None
+    if compressed is None:
+        with span('compress'):
+            compressed = compress(body, encoding)
+        if key:
+            analysis_results.put(f"{key}:{encoding}", compressed, len(compressed))
+    response.set_data(compressed)
+    response.headers['Content-Encoding'] = encoding
+    return response
+
 @app.route('/test', methods=['GET'])
 @limiter.limit("10 per minute")
 def test():
@@ -39,8 +156,6 @@ def test():
 @app.route('/validate', methods=['POST'])
 @limiter.limit("10 per minute")
 def validate_file():
-    print("Validate route hit!")
-    print("Request files:", request.files)
     if 'file' not in request.files:
         return jsonify({'error': 'No file uploaded'}), 400
         
@@ -48,21 +163,17 @@ def validate_file():
     if not file.filename.endswith('.csv'):
         return jsonify({'error': 'Invalid file type'}), 400
 
-    filename = secure_filename(file.filename.replace(" ", "_"))
-    filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-
     try:
-        os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
-        file.save(filepath)
-        processor = GoodreadsDataProcessor(filepath)
-        
-        validation_result = processor.validate_goodreads_csv()
+        data = file.stream.read()
+        log_event('upload_received', logging.DEBUG, endpoint='validate', filename=file.filename, size=len(data))
+        # Only the header and a small sample are parsed here
+        validation_result = quick_validate_goodreads_csv(data)
+        if validation_result['status']:
+            # The frontend uploads the same file to /analyze next, start parsing it now
+            prefetch_processor(upload_digest(data), data)
         return jsonify(validation_result)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
-    finally:
-        if os.path.exists(filepath):
-            os.remove(filepath)
 
 @app.route('/analyze', methods=['POST'])
 @limiter.limit("10 per minute")
@@ -72,22 +183,161 @@ def analyze_file():
         
     file = request.files['file']
     file.stream.seek(0)  # Rewind the file pointer
-    
-    filename = secure_filename(file.filename.replace(" ", "_"))
-    filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
 
     try:
-        os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
-        file.save(filepath)
-        # Add debug print
-        print(f"File saved, size: {os.path.getsize(filepath)}")
-        processor = GoodreadsDataProcessor(filepath)
-        stats = processor.get_statistics(start_date='2024-01-01', end_date='2024-12-31')
-        return jsonify(stats)
+        data = file.stream.read()
+        log_event('upload_received', logging.DEBUG, endpoint='analyze', filename=file.filename, size=len(data))
+        try:
+            start_date, end_date, years = _requested_period()
+        except ValueError as e:
+            return jsonify({'error': f'Invalid period: {str(e)}'}), 400
+
+        # books=paged leaves All Books Read out, the list is fetched from /books/<id> instead
+        paged = _request_param('books') == 'paged'
+        # Job mode: answer with the statistics right away and resolve covers in the background
+        job_mode = _request_param('async') in ('1', 'true')
+
+        # Identical uploads for the same period are answered from the result cache. Job mode
+        # answers carry a new job_id every time, they are neither cached nor answered from it
+        digest = upload_digest(data)
+        if years:
+            key = result_key(digest, 'years', ','.join(map(str, years)))
+        else:
+            key = result_key(digest, start_date, end_date)
+        if paged:
+            key += ':paged'
+        cached = None if job_mode else analysis_results.get(key)
+        if not job_mode:
+            record_cache_lookup('analysis_result', hits=int(cached is not None), misses=int(cached is None))
+        if cached is not None:
+            cached_body, cached_lists = cached
+            # The book lists the cached body refers to may have been evicted on their own
+            for books_id, book_list in cached_lists.items():
+                if book_lists.get(books_id) is None:
+                    book_lists.put(books_id, book_list, book_list.size)
+            g.result_key = key
+            return app.response_class(cached_body, mimetype='application/json')
+
+        # Parsed in memory (or picked up from /validate), nothing is written to disk
+        processor = get_processor(digest, data)
+        # The snapshot of an earlier version of this export spares cleaning and looking up unchanged books
+        reuse_snapshot(processor, _request_param('previous'))
+
+        if job_mode:
+            if years:
+                stats = processor.get_statistics_for_years(years, fetch_covers=False)
+                books = [
+                    book for year in years
+                    for book in processor.get_cover_requests(start_date=f"{year:04d}-01-01", end_date=f"{year:04d}-12-31")
+                ]
+                stats['job_id'] = start_cover_job(books)
+            else:
+                stats = processor.get_statistics(start_date=start_date, end_date=end_date, fetch_covers=False)
+                if isinstance(stats, dict):
+                    books = processor.get_cover_requests(start_date=start_date, end_date=end_date)
+                    stats['job_id'] = start_cover_job(books)
+            add_percentiles(stats)
+            record_readers(stats, digest)
+            # Covers arrive through the job, a book list that already has them is kept
+            attach_book_lists(_proxied(stats), digest, _books_url, paged, keep_existing=True)
+            return _json_response(stats)
+
+        if years:
+            stats = processor.get_statistics_for_years(years)
+        else:
+            stats = processor.get_statistics(start_date=start_date, end_date=end_date)
+        add_percentiles(stats)
+        record_readers(stats, digest)
+        if isinstance(stats, dict):
+            snapshot_id = save_snapshot(processor, digest)
+            if snapshot_id:
+                stats['snapshot_id'] = snapshot_id
+        lists = attach_book_lists(_proxied(stats), digest, _books_url, paged)
+        response = _json_response(stats)
+        body = response.get_data()
+        analysis_results.put(key, (body, lists), len(body) + sum(book_list.size for book_list in lists.values()))
+        g.result_key = key
+        return response
     except Exception as e:
         return jsonify({'error': str(e)}), 500
-    finally:
-        if os.path.exists(filepath):
-            os.remove(filepath)
+
+@app.route('/jobs/<job_id>', methods=['GET'])
+@limiter.limit("60 per minute")
+def get_job(job_id):
+    try:
+        since = max(int(request.args.get('since', 0)), 0)
+    except ValueError:
+        return jsonify({'error': 'Invalid since parameter'}), 400
+
+    job = job_store.get(job_id, since=since)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    if COVER_PROXY:
+        for update in job['covers']:
+            if proxyable(update['cover_url']):
+                update['cover_url'] = _cover_proxy_url(update['cover_url'])
+    return _json_response(job)
+
+@app.route('/books/<books_id>', methods=['GET'])
+@limiter.limit("120 per minute")
+def get_books(books_id):
+    book_list = book_lists.get(books_id)
+    record_cache_lookup('book_list', hits=int(book_list is not None), misses=int(book_list is None))
+    if book_list is None:
+        return jsonify({'error': 'Book list not found, analyze the file again'}), 404
+
+    try:
+        page = book_list.page(
+            sort=request.args.get('sort') or DEFAULT_SORT,
+            cursor=request.args.get('cursor'),
+            limit=int(request.args.get('limit', DEFAULT_PAGE_SIZE)),
+            fields=parse_fields(request.args.get('fields'))
+        )
+    except ValueError as e:
+        return jsonify({'error': f'Invalid book list request: {str(e)}'}), 400
+
+    # Pages are revalidated on every use, unchanged ones are answered with an empty 304.
+    # The tag is weak: gzip and brotli encodings of the page share it
+    response = _json_response(page)
+    response.set_etag(hashlib.sha256(response.get_data()).hexdigest(), weak=True)
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    return response.make_conditional(request)
+
+@app.route('/metrics', methods=['GET'])
+@limiter.exempt
+def get_metrics():
+    """
+    Prometheus text exposition of this worker's metrics
+    """
+    return app.response_class(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/covers/<key>', methods=['GET'])
+@limiter.limit("600 per minute")
+def get_cover(key):
+    url = cover_url_from_key(key)
+    if url is None:
+        return jsonify({'error': 'Cover not found'}), 404
+
+    store = get_thumbnail_store()
+    try:
+        path, digest = store.get_or_fetch(url)
+    except Exception as e:
+        log_event('cover_proxy_failed', logging.WARNING, url=url, error=str(e))
+        return jsonify({'error': 'Could not fetch cover'}), 502
+
+    # Keys are derived from the provider URL and thumbnails never change, so answers are
+    # cacheable for a long time; conditional requests are answered with 304
+    response = send_file(
+        path,
+        mimetype=store.mimetype(path),
+        conditional=True,
+        etag=digest,
+        last_modified=store.last_modified(path),
+        max_age=COVER_MAX_AGE
+    )
+    response.cache_control.immutable = True
+    return response
+
 if __name__ == '__main__':
   app.run(debug=False, host='0.0.0.0', port=5001)
\ No newline at end of file
@@ -0,0 +1,264 @@
+"""
+Regenerate wrapped reports for many exports at once
+
+Run from the backend directory:
+    python batch.py exports/ --periods 2023 2024 2024-06-01:2024-08-31 --output-dir reports/
+
+Inputs are directories of CSV exports, manifests (text files listing one export path per
+line, relative to the manifest) or single CSV files. Exports are parsed and their statistics
+computed in a process pool sized to the cores, while the covers of every export go through
+the one shared cover resolver of this process: each unique book is looked up once for the
+whole batch. Every (export, period) result is written with export_to_json to
+<output-dir>/<export name>/<period>.json. Outputs are written atomically and existing ones
+are skipped, so an interrupted batch is resumed by running the same command again.
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, as_completed, wait
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from process_data import (
+    GoodreadsDataProcessor, _cover_cache_keys, _lookup_key, cover_resolver, export_to_json
+)
+from streaming import STREAMING_MIN_BYTES, StreamingGoodreadsProcessor
+
+Period = Tuple[str, str]
+
+
+def parse_period(value: str) -> Period:
+    """
+    A calendar year ("2024") or a start:end date range ("2024-01-01:2024-06-30")
+    """
+    start, _, end = value.partition(':')
+    if not end:
+        start, end = f"{value}-01-01", f"{value}-12-31"
+    try:
+        if datetime.strptime(start, '%Y-%m-%d') > datetime.strptime(end, '%Y-%m-%d'):
+            raise ValueError
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Invalid period {value!r}, expected YYYY or YYYY-MM-DD:YYYY-MM-DD")
+    return start, end
+
+
+def period_label(period: Period) -> str:
+    start, end = period
+    if start[4:] == '-01-01' and end[4:] == '-12-31' and start[:4] == end[:4]:
+        return start[:4]
+    return f"{start}_{end}"
+
+
+def find_exports(inputs: List[str]) -> List[str]:
+    """
+    CSV paths from directories, manifests and CSV files, in a stable order
+    """
+    exports = []
+    for path in inputs:
+        if os.path.isdir(path):
+            exports.extend(sorted(
+                os.path.join(path, name) for name in os.listdir(path) if name.lower().endswith('.csv')
+            ))
+        elif path.lower().endswith('.csv'):
+            exports.append(path)
+        else:
+            base = os.path.dirname(path)
+            with open(path, encoding='utf-8') as f:
+                for line in f:
+                    line = line.strip()
+                    if line and not line.startswith('#'):
+                        exports.append(os.path.join(base, line))
+    return exports
+
+
+def output_dir_for(export: str, output_dir: str) -> str:
+    return os.path.join(output_dir, os.path.splitext(os.path.basename(export))[0])
+
+
+def output_path(export: str, period: Period, output_dir: str) -> str:
+    return os.path.join(output_dir_for(export, output_dir), f"{period_label(period)}.json")
+
+
+def analyze_export(export: str, periods: List[Period]) -> Dict[Period, tuple]:
+    """
+    Statistics (without covers) and cover lookups of each period of one export
+    Runs in the worker processes
+    """
+    if os.path.getsize(export) >= STREAMING_MIN_BYTES:
+        processor = StreamingGoodreadsProcessor(export)
+    else:
+        processor = GoodreadsDataProcessor(export)
+    results = {}
+    for start, end in periods:
+        stats = processor.get_statistics(start, end, fetch_covers=False)
+        books = processor.get_cover_requests(start, end) if isinstance(stats, dict) else []
+        results[(start, end)] = (stats, books)
+    return results
+
+
+def apply_cover_urls(stats: Dict, cover_urls: Dict[str, Optional[str]]):
+    """
+    Fill the covers of statistics computed with fetch_covers=False, as get_statistics would
+    """
+    for book in stats['All Books Read']:
+        book['cover_url'] = cover_urls.get(f"{book['title']}__{book['author']}")
+    cover_url_map = {book['title']: book['cover_url'] for book in stats['All Books Read']}
+    for book in stats['Book_Extremes'].values():
+        if isinstance(book, dict):
+            book['cover_url'] = cover_url_map.get(book['title'])
+
+
+class SharedCovers:
+    """
+    Cover lookups of the whole batch on the shared resolver, each unique book is only
+    submitted once (books are the same when get_covers_batch would share their lookup)
+    """
+
+    def __init__(self, **options):
+        self.options = options
+        # Lookup key -> (future of the batch resolving it, book id in that batch)
+        self._lookups = {}
+
+    def request(self, books: List[dict]) -> Dict[str, tuple]:
+        """
+        Submit the books not requested yet, returns the lookup of every book by its book id
+        """
+        new_books = []
+        new_keys = {}
+        lookups = {}
+        for book in books:
+            if not (book.get('isbn') or book.get('title')):
+                continue
+            # The same book id as in get_covers_batch
+            book_id = f"{book.get('title', '')}__{book.get('author', '')}"
+            key = _lookup_key(_cover_cache_keys(book), book_id)
+            if key not in self._lookups and key not in new_keys:
+                new_keys[key] = book_id
+                new_books.append(book)
+            lookups[book_id] = key
+
+        if new_books:
+            future = cover_resolver.submit(new_books, **self.options)
+            for key, book_id in new_keys.items():
+                self._lookups[key] = (future, book_id)
+        return {book_id: self._lookups[key] for book_id, key in lookups.items()}
+
+    @property
+    def unique_books(self) -> int:
+        return len(self._lookups)
+
+
+class PendingExport:
+    """
+    An analyzed export waiting for its covers before being written
+    """
+
+    def __init__(self, export: str, results: Dict[Period, tuple], covers: SharedCovers):
+        self.export = export
+        self.results = results
+        books = [book for _, period_books in results.values() for book in period_books]
+        self.lookups = covers.request(books)
+        self.futures = {future for future, _ in self.lookups.values()}
+
+    def ready(self) -> bool:
+        return all(future.done() for future in self.futures)
+
+    def write(self, output_dir: str) -> int:
+        cover_urls = {}
+        for book_id, (future, resolved_id) in self.lookups.items():
+            try:
+                cover_urls[book_id] = future.result().get(resolved_id)
+            except Exception:
+                cover_urls[book_id] = None
+
+        os.makedirs(output_dir_for(self.export, output_dir), exist_ok=True)
+        for period, (stats, _) in self.results.items():
+            if isinstance(stats, dict):
+                apply_cover_urls(stats, cover_urls)
+            path = output_path(self.export, period, output_dir)
+            # Written next to the output and renamed, so a crash never leaves a partial output behind
+            temporary = f"{path}.tmp"
+            export_to_json(stats, temporary)
+            os.replace(temporary, path)
+        return len(self.results)
+
+
+def run_batch(exports: List[str], periods: List[Period], output_dir: str, workers: int,
+              cover_deadline: Optional[float] = None) -> dict:
+    """
+    Write every missing (export, period) output, returns counts of the run
+    """
+    names = {}
+    for export in exports:
+        names.setdefault(output_dir_for(export, output_dir), []).append(export)
+    clashes = [paths for paths in names.values() if len(paths) > 1]
+    if clashes:
+        raise SystemExit(f"Exports with the same name would share an output directory: {clashes[0]}")
+
+    todo = {}
+    skipped = 0
+    for export in exports:
+        missing = [period for period in periods if not os.path.exists(output_path(export, period, output_dir))]
+        skipped += len(periods) - len(missing)
+        if missing:
+            todo[export] = missing
+    summary = {'exports': len(exports), 'written': 0, 'skipped': skipped, 'failed': [], 'unique_books': 0}
+    if not todo:
+        return summary
+
+    covers = SharedCovers(deadline=cover_deadline)
+    pending = []
+
+    def write_ready(block: bool):
+        if block and pending:
+            wait({future for export in pending for future in export.futures}, return_when=FIRST_COMPLETED)
+        for export in [export for export in pending if export.ready()]:
+            pending.remove(export)
+            try:
+                summary['written'] += export.write(output_dir)
+                print(f"Wrote {export.export} ({summary['written']} outputs written)")
+            except Exception as e:
+                summary['failed'].append(export.export)
+                print(f"Error writing {export.export}: {e}")
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(analyze_export, export, missing): export for export, missing in todo.items()}
+        for future in as_completed(futures):
+            export = futures[future]
+            try:
+                pending.append(PendingExport(export, future.result(), covers))
+            except Exception as e:
+                summary['failed'].append(export)
+                print(f"Error processing {export}: {e}")
+            write_ready(block=False)
+
+    while pending:
+        write_ready(block=True)
+    summary['unique_books'] = covers.unique_books
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('inputs', nargs='+', help='directories of CSV exports, manifests or CSV files')
+    parser.add_argument('--periods', nargs='+', type=parse_period, required=True,
+                        help='calendar years (2024) or date ranges (2024-01-01:2024-06-30)')
+    parser.add_argument('--output-dir', default='reports')
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help='processes (default: one per core)')
+    parser.add_argument('--cover-deadline', type=float,
+                        help='seconds allowed per cover batch (default: no deadline)')
+    args = parser.parse_args()
+
+    start_time = time.time()
+    exports = find_exports(args.inputs)
+    summary = run_batch(exports, args.periods, args.output_dir, args.workers, args.cover_deadline)
+    print(f"\n{summary['exports']} exports: {summary['written']} outputs written, "
+          f"{summary['skipped']} already written, {len(summary['failed'])} exports failed, "
+          f"{summary['unique_books']} unique books looked up in {time.time() - start_time:.2f} seconds")
+    if summary['failed']:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
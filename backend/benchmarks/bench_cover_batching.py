@@ -0,0 +1,62 @@
+"""
+Provider requests for one analysis-sized batch: per-book lookups versus batched ISBN lookups
+
+Run from the backend directory:
+    python -m benchmarks.bench_cover_batching --books 300 --missing-isbn-share 0.3
+"""
+import argparse
+import asyncio
+import os
+import random
+import time
+
+os.environ.setdefault('COVER_CACHE_PATH', '')
+# Keep the per-batch cover summaries out of the results
+os.environ.setdefault('LOG_LEVEL', 'WARNING')
+
+from benchmarks.mock_providers import MockProviders  # noqa: E402
+from process_data import get_covers_batch  # noqa: E402
+
+
+def analysis_books(first_id: int, books: int, missing_isbn_share: float, seed: int = 0) -> list[dict]:
+    """
+    Books as _books_for_cover_fetch builds them, ISBNs in the export's ="..." quoting
+    """
+    rng = random.Random(seed)
+    return [
+        {
+            'isbn': '=""' if rng.random() < missing_isbn_share else f'="{9780000000000 + book_id}"',
+            'title': f"Book {book_id}",
+            'author': f"Author {book_id % 97}"
+        }
+        for book_id in range(first_id, first_id + books)
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--books', type=int, default=300)
+    parser.add_argument('--missing-isbn-share', type=float, default=0.3)
+    parser.add_argument('--latency', type=float, default=0.02)
+    args = parser.parse_args()
+
+    mock = MockProviders(latency=args.latency).start()
+    try:
+        print(f"{args.books} books, {args.missing_isbn_share:.0%} without ISBN, "
+              f"{args.latency * 1000:.0f} ms provider latency")
+        # Different books per mode, so neither run is helped by the other's URL memo
+        for mode, batch_isbns in enumerate((False, True)):
+            books = analysis_books(mode * args.books, args.books, args.missing_isbn_share)
+            mock.reset_counts()
+            start = time.perf_counter()
+            covers = asyncio.run(get_covers_batch(books, batch_isbns=batch_isbns))
+            elapsed = time.perf_counter() - start
+            found = sum(cover is not None for cover in covers.values())
+            name = 'batched ISBN lookups' if batch_isbns else 'per-book lookups'
+            print(f"{name}: {mock.requests} requests, {elapsed * 1000:.0f} ms, {found} covers")
+    finally:
+        mock.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+"""
+Back-to-back cover batches: a new event loop and session per batch versus the shared CoverResolver
+
+Run from the backend directory:
+    python -m benchmarks.bench_cover_session --batches 10 --books 50 --latency 0.02 --tls
+
+Providers are served by a local mock server, which counts the client connections it
+accepts. Every connection avoided is a TCP (and, against the real providers, TLS)
+handshake saved.
+"""
+import argparse
+import asyncio
+import os
+import time
+
+os.environ.setdefault('COVER_CACHE_PATH', '')
+# Keep the per-batch cover summaries out of the results
+os.environ.setdefault('LOG_LEVEL', 'WARNING')
+
+from benchmarks.mock_providers import MockProviders  # noqa: E402
+from process_data import CoverResolver, get_covers_batch  # noqa: E402
+
+
+def batch_books(batch: int, books: int) -> list[dict]:
+    """
+    Distinct books for every batch, so no lookup is answered from the in-process URL memo
+    """
+    return [
+        {'isbn': f"{9780000000000 + batch * 100000 + i}", 'title': f"Book {batch}-{i}", 'author': f"Author {i}"}
+        for i in range(books)
+    ]
+
+
+def run_batches(resolve, mock: MockProviders, first_batch: int, batches: int, books: int) -> tuple[float, int, int]:
+    mock.reset_counts()
+    start = time.perf_counter()
+    for batch in range(first_batch, first_batch + batches):
+        resolve(batch_books(batch, books))
+    return time.perf_counter() - start, mock.requests, mock.connections
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--batches', type=int, default=10)
+    parser.add_argument('--books', type=int, default=50)
+    parser.add_argument('--latency', type=float, default=0.02)
+    parser.add_argument('--tls', action='store_true', help='serve the mock over HTTPS (needs openssl)')
+    args = parser.parse_args()
+
+    mock = MockProviders(latency=args.latency, tls=args.tls).start()
+    resolver = CoverResolver()
+    try:
+        modes = {
+            'asyncio.run per batch': lambda books: asyncio.run(get_covers_batch(books)),
+            'shared CoverResolver': resolver.resolve,
+        }
+        print(f"{args.batches} batches of {args.books} books, {args.latency * 1000:.0f} ms provider latency"
+              f"{' over TLS' if args.tls else ''}")
+        for mode, (name, resolve) in enumerate(modes.items()):
+            elapsed, requests, connections = run_batches(resolve, mock, mode * args.batches, args.batches, args.books)
+            print(f"{name}: {elapsed * 1000:.0f} ms, {requests} requests over {connections} connections")
+    finally:
+        resolver.close()
+        mock.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+"""
+Parse time and peak memory of a full read_csv versus the column-pruned, typed ingestion
+
+Run from the backend directory:
+    python -m benchmarks.bench_ingestion --rows 200000
+"""
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+
+import pandas as pd
+
+from benchmarks.synthetic_export import generate_synthetic_export
+from process_data import read_goodreads_export
+
+
+def full_read(csv_path):
+    """
+    The previous ingestion: every column with inferred dtypes
+    """
+    return pd.read_csv(csv_path)
+
+
+def measure(read, csv_path, repeat):
+    """
+    Best parse time, plus peak traced memory and final frame size of one run
+    """
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        read(csv_path)
+        timings.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    df = read(csv_path)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return min(timings), peak, df.memory_usage(deep=True).sum()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--rows', type=int, default=200000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    readers = {
+        'full read_csv': full_read,
+        'pruned + typed (c)': lambda path: read_goodreads_export(path, engine='c'),
+    }
+    try:
+        import pyarrow  # noqa: F401
+        readers['pruned + typed (pyarrow)'] = lambda path: read_goodreads_export(path, engine='pyarrow')
+    except ImportError:
+        print("pyarrow is not installed, skipping the pyarrow engine")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path = generate_synthetic_export(os.path.join(tmp, 'export.csv'), args.rows)
+        print(f"Rows: {args.rows} ({os.path.getsize(csv_path) / 2**20:.1f} MiB)")
+        for name, read in readers.items():
+            parse_time, peak, frame_size = measure(read, csv_path, args.repeat)
+            print(f"{name}: {parse_time * 1000:.0f} ms, peak {peak / 2**20:.1f} MiB, "
+                  f"frame {frame_size / 2**20:.1f} MiB")
+
+
+if __name__ == '__main__':
+    main()
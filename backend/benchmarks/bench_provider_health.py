@@ -0,0 +1,65 @@
+"""
+Cover batch latency with one degraded provider, with and without the provider circuit breakers
+
+Run from the backend directory:
+    python -m benchmarks.bench_provider_health --books 200 --batches 2 --scenario slow_google
+"""
+import argparse
+import asyncio
+import os
+import time
+
+os.environ.setdefault('COVER_CACHE_PATH', '')
+# Keep the per-batch cover summaries out of the results
+os.environ.setdefault('LOG_LEVEL', 'WARNING')
+
+import process_data  # noqa: E402
+from benchmarks.bench_cover_batching import analysis_books  # noqa: E402
+from benchmarks.mock_providers import MockProviders  # noqa: E402
+from process_data import get_covers_batch  # noqa: E402
+from provider_health import ProviderHealth  # noqa: E402
+
+# Mock provider settings of each scenario; Google answering after 6 s times out every request
+SCENARIOS = {
+    'healthy': {},
+    'slow_google': {'service_latency': {'google': 6}},
+    'rate_limited_google': {'service_rate_limit_share': {'google': 1.0}, 'retry_after': 60},
+    'failing_openlibrary': {'service_error_share': {'openlibrary': 1.0}},
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--books', type=int, default=200)
+    parser.add_argument('--batches', type=int, default=2, help='consecutive batches, as from separate requests')
+    parser.add_argument('--missing-isbn-share', type=float, default=0.3)
+    parser.add_argument('--latency', type=float, default=0.02)
+    parser.add_argument('--scenario', choices=SCENARIOS, nargs='+', default=list(SCENARIOS))
+    args = parser.parse_args()
+
+    print(f"{args.batches} batches of {args.books} books, {args.latency * 1000:.0f} ms provider latency")
+    first_id = 0
+    for scenario in args.scenario:
+        mock = MockProviders(latency=args.latency, separate_hosts=True, **SCENARIOS[scenario]).start()
+        try:
+            for enabled in (False, True):
+                process_data.provider_health = ProviderHealth(enabled=enabled)
+                runs = []
+                for _ in range(args.batches):
+                    # New books every batch, so neither the URL memo nor shared lookups help
+                    books = analysis_books(first_id, args.books, args.missing_isbn_share)
+                    first_id += args.books
+                    mock.reset_counts()
+                    start = time.perf_counter()
+                    covers = asyncio.run(get_covers_batch(books))
+                    found = sum(cover is not None for cover in covers.values())
+                    runs.append(f"{(time.perf_counter() - start) * 1000:.0f} ms / {mock.requests} requests / {found} covers")
+                name = 'circuit breakers' if enabled else 'no circuit breakers'
+                print(f"{scenario}, {name}: {', '.join(runs)}")
+        finally:
+            mock.stop()
+    process_data.provider_health = ProviderHealth()
+
+
+if __name__ == '__main__':
+    main()
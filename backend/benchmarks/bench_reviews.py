@@ -0,0 +1,59 @@
+"""
+Micro-benchmark for review cleaning: per-word regex passes vs the single-pass ReviewSanitizer
+
+Run from the backend directory:
+    python -m benchmarks.bench_reviews --reviews 5000 --words 2000
+"""
+import argparse
+import random
+import re
+
+import pandas as pd
+
+from benchmarks.bench_statistics import best_of
+from benchmarks.synthetic_export import REVIEW_WORDS
+from process_data import REVIEW_MAX_LENGTH, SWEAR_WORDS, ReviewSanitizer
+
+
+def per_word_clean(review, max_length=REVIEW_MAX_LENGTH):
+    """
+    The previous _clean_review_text: one freshly compiled regex pass per swear word
+    """
+    if not isinstance(review, str):
+        return ""
+    if len(review) > max_length:
+        review = review[:max_length] + "..."
+    for word, replacement in SWEAR_WORDS.items():
+        review = re.sub(re.compile(word, re.IGNORECASE), replacement, review)
+    return review
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--reviews', type=int, default=5000)
+    parser.add_argument('--words', type=int, default=2000, help='words per review')
+    parser.add_argument('--max-length', type=int, default=REVIEW_MAX_LENGTH)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    reviews = pd.Series([
+        ' '.join(rng.choice(REVIEW_WORDS) for _ in range(args.words)) if rng.random() < 0.8 else None
+        for _ in range(args.reviews)
+    ])
+    sanitizer = ReviewSanitizer(max_length=args.max_length)
+
+    per_word, single_pass, vectorized = best_of([
+        lambda: [per_word_clean(review, args.max_length) for review in reviews],
+        lambda: [sanitizer.clean(review) for review in reviews],
+        lambda: sanitizer.clean_series(reviews),
+    ], args.repeat)
+
+    print(f"Reviews: {args.reviews} x {args.words} words, truncated to {args.max_length} characters")
+    print(f"Per-word regex passes: {per_word * 1000:.1f} ms")
+    print(f"Single-pass clean(): {single_pass * 1000:.1f} ms ({per_word / single_pass:.2f}x)")
+    print(f"Vectorized clean_series(): {vectorized * 1000:.1f} ms ({per_word / vectorized:.2f}x)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+"""
+Encode time and response size of a statistics dict: jsonify and the previous export_to_json versus serialization.dumps
+
+Run from the backend directory:
+    python -m benchmarks.bench_serialization --rows 5000
+"""
+import argparse
+import json
+import os
+import tempfile
+
+os.environ.setdefault('COVER_CACHE_PATH', '')
+
+import numpy as np  # noqa: E402
+import pandas as pd  # noqa: E402
+from flask import Flask  # noqa: E402
+
+import serialization  # noqa: E402
+from benchmarks.bench_statistics import best_of  # noqa: E402
+from benchmarks.synthetic_export import generate_synthetic_export  # noqa: E402
+from process_data import GoodreadsDataProcessor  # noqa: E402
+
+
+def previous_export(stats) -> bytes:
+    """
+    export_to_json before the serialization layer: a recursive conversion walk, then indented json.dump
+    """
+    def convert_to_native_types(obj):
+        if isinstance(obj, (np.integer, np.floating)):
+            return float(obj)
+        elif isinstance(obj, pd.Period):
+            return str(obj)
+        elif isinstance(obj, dict):
+            return {key: convert_to_native_types(value) for key, value in obj.items()}
+        elif isinstance(obj, list):
+            return [convert_to_native_types(item) for item in obj]
+        return obj
+
+    return json.dumps(convert_to_native_types(stats), ensure_ascii=False, indent=2).encode('utf-8')
+
+
+def stdlib_dumps(stats, compact=True) -> bytes:
+    """
+    serialization.dumps as it runs without orjson installed
+    """
+    orjson, serialization.orjson = serialization.orjson, None
+    try:
+        return serialization.dumps(stats, compact=compact)
+    finally:
+        serialization.orjson = orjson
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--rows', type=int, default=5000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path = generate_synthetic_export(os.path.join(tmp, 'export.csv'), args.rows, years=(2024,))
+        processor = GoodreadsDataProcessor(csv_path)
+    stats = processor.get_statistics('2024-01-01', '2024-12-31', fetch_covers=False)
+    flask_json = Flask(__name__).json
+
+    encoders = {
+        'jsonify (API before)': lambda: flask_json.dumps(stats).encode('utf-8'),
+        'export_to_json (CLI before)': lambda: previous_export(stats),
+        'dumps, compact': lambda: serialization.dumps(stats),
+        'dumps, indented': lambda: serialization.dumps(stats, compact=False),
+        'dumps, compact, without orjson': lambda: stdlib_dumps(stats),
+    }
+    if serialization.orjson is None:
+        print("orjson is not installed, dumps uses the standard library encoder")
+    timings = best_of(list(encoders.values()), args.repeat)
+
+    print(f"Rows: {args.rows}, {len(stats['All Books Read'])} books in the response")
+    for (name, encode), elapsed in zip(encoders.items(), timings):
+        print(f"{name}: {elapsed * 1000:.1f} ms, {len(encode()) / 1024:.0f} KiB")
+
+    body = serialization.dumps(stats)
+    encodings = ['gzip', 'br'] if serialization.brotli is not None else ['gzip']
+    compressors = [lambda encoding=encoding: serialization.compress(body, encoding) for encoding in encodings]
+    for encoding, elapsed, compress in zip(encodings, best_of(compressors, args.repeat), compressors):
+        print(f"Content-Encoding {encoding}: {elapsed * 1000:.1f} ms, {len(compress()) / 1024:.0f} KiB")
+    if serialization.brotli is None:
+        print("brotli is not installed, only gzip is offered")
+
+
+if __name__ == '__main__':
+    main()
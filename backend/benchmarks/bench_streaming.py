@@ -0,0 +1,65 @@
+"""
+Peak memory and time of get_statistics on a whole loaded export versus streaming mode
+
+Run from the backend directory:
+    python -m benchmarks.bench_streaming --rows 200000 --chunk-rows 5000
+"""
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+
+os.environ.setdefault('COVER_CACHE_PATH', '')
+
+from benchmarks.synthetic_export import generate_synthetic_export  # noqa: E402
+from process_data import GoodreadsDataProcessor  # noqa: E402
+from streaming import StreamingGoodreadsProcessor  # noqa: E402
+
+
+def measure(run):
+    """
+    Time of one run and peak traced memory of another, covering both loading and statistics
+    Tracing slows allocations down, so the timed run is not traced
+    """
+    start = time.perf_counter()
+    stats = run()
+    elapsed = time.perf_counter() - start
+
+    tracemalloc.start()
+    run()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak, stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--rows', type=int, default=200000)
+    parser.add_argument('--chunk-rows', type=int, default=5000)
+    parser.add_argument('--start', default='2024-01-01')
+    parser.add_argument('--end', default='2024-12-31')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path = generate_synthetic_export(os.path.join(tmp, 'export.csv'), args.rows)
+        print(f"Rows: {args.rows} ({os.path.getsize(csv_path) / 2**20:.1f} MiB), "
+              f"period {args.start} to {args.end}")
+
+        runs = {
+            'in memory': lambda: GoodreadsDataProcessor(csv_path).get_statistics(
+                args.start, args.end, fetch_covers=False),
+            f'streaming ({args.chunk_rows} rows per chunk)': lambda: StreamingGoodreadsProcessor(
+                csv_path, chunk_rows=args.chunk_rows).get_statistics(args.start, args.end, fetch_covers=False),
+        }
+        results = {}
+        for name, run in runs.items():
+            elapsed, peak, results[name] = measure(run)
+            print(f"{name}: {elapsed * 1000:.0f} ms, peak {peak / 2**20:.1f} MiB")
+
+        first, second = results.values()
+        print(f"Identical output: {first == second}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,188 @@
+"""
+Local stand-in for the Google Books and Open Library endpoints used by the cover lookups
+"""
+import asyncio
+import os
+import random
+import ssl
+import subprocess
+import tempfile
+import threading
+import zlib
+from typing import Dict, Optional
+
+from aiohttp import web
+
+import process_data
+
+
+class MockProviders:
+    """
+    Serves the provider endpoints from a background thread on 127.0.0.1
+
+    Every response is delayed by `latency` seconds. A book gets a Google Books cover for
+    about `google_hit_share` of the ISBNs and queries and an Open Library cover otherwise,
+    decided by a checksum so runs are repeatable. Requests and client connections
+    (distinct client address/port pairs) are counted.
+    About `error_share` of the requests fail with a 503 and `rate_limit_share` get a 429 with
+    a Retry-After of `retry_after` seconds, drawn from a seeded generator.
+    service_latency, service_error_share and service_rate_limit_share override these for
+    one service ('google' or 'openlibrary'), to degrade a single provider. With
+    separate_hosts=True Google Books is served on a port of its own, so its requests don't
+    share connections (COVER_FETCH_PER_HOST) with Open Library's, as with the real providers.
+    With tls=True it serves HTTPS with a throwaway self-signed certificate (needs the openssl
+    command line tool), the cover lookups don't verify certificates.
+    """
+
+    def __init__(self, latency: float = 0.02, google_hit_share: float = 0.5, cover_bytes: int = 20000,
+                 tls: bool = False, error_share: float = 0.0, rate_limit_share: float = 0.0,
+                 retry_after: int = 1, seed: int = 0, service_latency: Optional[Dict[str, float]] = None,
+                 service_error_share: Optional[Dict[str, float]] = None,
+                 service_rate_limit_share: Optional[Dict[str, float]] = None, separate_hosts: bool = False):
+        self.latency = latency
+        self.separate_hosts = separate_hosts
+        self.service_latency = service_latency or {}
+        self.service_error_share = service_error_share or {}
+        self.service_rate_limit_share = service_rate_limit_share or {}
+        self.tls = tls
+        self.google_hit_share = google_hit_share
+        self.cover_bytes = cover_bytes
+        self.error_share = error_share
+        self.rate_limit_share = rate_limit_share
+        self.retry_after = retry_after
+        self._rng = random.Random(seed)
+        self.requests = 0
+        self.errors = 0
+        self.rate_limited = 0
+        self.peers = set()
+        self.base_url: Optional[str] = None
+        self.google_url: Optional[str] = None
+        self._loop = asyncio.new_event_loop()
+        self._runner = None
+        self._thread = threading.Thread(target=self._loop.run_forever, name='mock-providers', daemon=True)
+
+    @property
+    def connections(self) -> int:
+        return len(self.peers)
+
+    def _hit(self, key: str) -> bool:
+        return zlib.crc32(key.encode()) % 1000 < self.google_hit_share * 1000
+
+    async def _count(self, request: web.Request, service: str = 'openlibrary') -> Optional[web.Response]:
+        """
+        Count and delay a request, returns the failure to answer it with, if any
+        """
+        self.requests += 1
+        self.peers.add(request.transport.get_extra_info('peername'))
+        await asyncio.sleep(self.service_latency.get(service, self.latency))
+        rate_limit_share = self.service_rate_limit_share.get(service, self.rate_limit_share)
+        error_share = self.service_error_share.get(service, self.error_share)
+        roll = self._rng.random()
+        if roll < rate_limit_share:
+            self.rate_limited += 1
+            return web.json_response({'error': 'Rate limit exceeded'}, status=429,
+                                     headers={'Retry-After': str(self.retry_after)})
+        if roll < rate_limit_share + error_share:
+            self.errors += 1
+            return web.Response(status=503, text='Service unavailable')
+        return None
+
+    def _thumbnail(self, key: str) -> str:
+        return f"{self.base_url}/thumbnails/{zlib.crc32(key.encode())}.jpg"
+
+    async def _volumes(self, request: web.Request) -> web.Response:
+        failure = await self._count(request, 'google')
+        if failure is not None:
+            return failure
+        query = request.query.get('q', '')
+        terms = [term for term in query.split(' OR ') if term.startswith('isbn:')]
+        if not terms:
+            if not self._hit(query):
+                return web.json_response({})
+            return web.json_response({'items': [{'volumeInfo': {'imageLinks': {'thumbnail': self._thumbnail(query)}}}]})
+
+        # ISBN queries, possibly OR-combined: one volume per ISBN that has a Google cover
+        items = []
+        for term in terms:
+            isbn = term[len('isbn:'):]
+            if self._hit(isbn):
+                items.append({'volumeInfo': {
+                    'industryIdentifiers': [{'type': 'ISBN_13', 'identifier': isbn}],
+                    'imageLinks': {'thumbnail': self._thumbnail(isbn)}
+                }})
+        return web.json_response({'items': items} if items else {})
+
+    async def _books(self, request: web.Request) -> web.Response:
+        failure = await self._count(request)
+        if failure is not None:
+            return failure
+        books = {}
+        for bibkey in request.query.get('bibkeys', '').split(','):
+            if bibkey:
+                books[bibkey] = {'bib_key': bibkey, 'thumbnail_url': f"{self.base_url}/b/id/{zlib.crc32(bibkey.encode())}-S.jpg"}
+        return web.json_response(books)
+
+    async def _search(self, request: web.Request) -> web.Response:
+        failure = await self._count(request)
+        if failure is not None:
+            return failure
+        return web.json_response({'docs': [{'cover_i': zlib.crc32(request.query.get('title', '').encode())}]})
+
+    async def _cover(self, request: web.Request) -> web.Response:
+        failure = await self._count(request)
+        if failure is not None:
+            return failure
+        headers = {'Content-Range': f"bytes 0-{process_data.MIN_COVER_BYTES}/{self.cover_bytes}"}
+        return web.Response(status=206, body=b'\0' * (process_data.MIN_COVER_BYTES + 1), headers=headers)
+
+    @staticmethod
+    def _self_signed_context() -> ssl.SSLContext:
+        with tempfile.TemporaryDirectory() as tmp:
+            cert, key = os.path.join(tmp, 'cert.pem'), os.path.join(tmp, 'key.pem')
+            subprocess.run(
+                ['openssl', 'req', '-x509', '-newkey', 'rsa:2048', '-nodes', '-days', '1',
+                 '-subj', '/CN=127.0.0.1', '-keyout', key, '-out', cert],
+                check=True, capture_output=True
+            )
+            context = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+            context.load_cert_chain(cert, key)
+        return context
+
+    async def _start(self) -> tuple:
+        app = web.Application()
+        app.router.add_get('/books/v1/volumes', self._volumes)
+        app.router.add_get('/search.json', self._search)
+        app.router.add_get('/api/books', self._books)
+        app.router.add_get('/b/{kind}/{key}', self._cover)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        ssl_context = self._self_signed_context() if self.tls else None
+        urls = []
+        for _ in range(2 if self.separate_hosts else 1):
+            site = web.TCPSite(self._runner, '127.0.0.1', 0, ssl_context=ssl_context)
+            await site.start()
+            port = site._server.sockets[0].getsockname()[1]
+            urls.append(f"{'https' if self.tls else 'http'}://127.0.0.1:{port}")
+        return urls[0], urls[-1]
+
+    def start(self) -> 'MockProviders':
+        """
+        Start serving and point process_data's provider endpoints at this server
+        """
+        self._thread.start()
+        self.base_url, self.google_url = asyncio.run_coroutine_threadsafe(self._start(), self._loop).result()
+        process_data.GOOGLE_BOOKS_API = f"{self.google_url}/books/v1"
+        process_data.OPEN_LIBRARY_API = self.base_url
+        process_data.OPEN_LIBRARY_COVERS = self.base_url
+        return self
+
+    def reset_counts(self):
+        self.requests = 0
+        self.errors = 0
+        self.rate_limited = 0
+        self.peers = set()
+
+    def stop(self):
+        asyncio.run_coroutine_threadsafe(self._runner.cleanup(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
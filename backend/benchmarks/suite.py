@@ -0,0 +1,225 @@
+"""
+Offline benchmark suite: ingestion, date filtering, statistics, cover batches and end-to-end /analyze
+
+Run from the backend directory:
+    python -m benchmarks.suite --shape typical --output results.json --compare previous.json
+
+Exports are synthetic (benchmarks/synthetic_export.py) and covers come from the local mock
+providers (benchmarks/mock_providers.py), so runs are repeatable without network access.
+Results are written as JSON; with --compare each benchmark is printed next to a previous
+results file and slowdowns beyond --tolerance are flagged.
+"""
+import argparse
+import asyncio
+import io
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+os.environ.setdefault('COVER_CACHE_PATH', '')
+# Keep the per-batch cover summaries out of the results
+os.environ.setdefault('LOG_LEVEL', 'WARNING')
+# Synthetic readers must not end up in the real percentile sketches
+os.environ.setdefault('PERCENTILE_PATH', '')
+
+import numpy as np  # noqa: E402
+import pandas as pd  # noqa: E402
+
+import process_data  # noqa: E402
+import serialization  # noqa: E402
+from benchmarks.mock_providers import MockProviders  # noqa: E402
+from benchmarks.synthetic_export import EXPORT_SHAPES, generate_shaped_export  # noqa: E402
+from process_data import GoodreadsDataProcessor, get_covers_batch, read_goodreads_export  # noqa: E402
+
+BENCHMARKS = ('ingestion', 'filter_date_range', 'get_statistics', 'get_covers_batch', 'analyze')
+
+
+def measure(func, repeat: int) -> dict:
+    """
+    Wall-clock timings of `repeat` calls, in milliseconds
+    """
+    runs = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        runs.append((time.perf_counter() - start) * 1000)
+    return {
+        'best_ms': round(min(runs), 3),
+        'median_ms': round(statistics.median(runs), 3),
+        'runs_ms': [round(run, 3) for run in runs]
+    }
+
+
+def bench_covers(processor, mock: MockProviders, args) -> dict:
+    books = processor.get_cover_requests(args.start, args.end)[:args.cover_books]
+    counts = []
+
+    def run():
+        # Every run starts cold: no verified cover URLs or provider health from the previous one
+        process_data._verified_urls.clear()
+        process_data.provider_health.reset()
+        mock.reset_counts()
+        covers = asyncio.run(get_covers_batch(books))
+        counts.append({
+            'requests': mock.requests,
+            'errors': mock.errors,
+            'rate_limited': mock.rate_limited,
+            'covers_found': sum(cover is not None for cover in covers.values())
+        })
+
+    result = measure(run, args.repeat)
+    result.update(books=len(books), **counts[-1])
+    return result
+
+
+def bench_analyze(csv_path: str, mock: MockProviders, args) -> dict:
+    from app import app, limiter
+    from result_cache import analysis_results, book_lists, parsed_uploads
+
+    limiter.enabled = False
+    client = app.test_client()
+    with open(csv_path, 'rb') as f:
+        data = f.read()
+
+    def run():
+        # Every run starts cold: no parsed upload, cached result, verified cover URL or provider health
+        for cache in (parsed_uploads, analysis_results, book_lists):
+            cache.clear()
+        process_data._verified_urls.clear()
+        process_data.provider_health.reset()
+        response = client.post(
+            '/analyze',
+            data={'file': (io.BytesIO(data), 'export.csv'), 'start_date': args.start, 'end_date': args.end},
+            headers={'Accept-Encoding': 'gzip'}
+        )
+        if response.status_code != 200:
+            raise RuntimeError(f"/analyze answered {response.status_code}: {response.get_data(as_text=True)}")
+        sizes.append(len(response.get_data()))
+
+    sizes = []
+    result = measure(run, args.repeat)
+    result['response_bytes'] = sizes[-1]
+    return result
+
+
+def run_suite(args) -> dict:
+    selected = args.only.split(',') if args.only else list(BENCHMARKS)
+    unknown = set(selected) - set(BENCHMARKS)
+    if unknown:
+        raise SystemExit(f"Unknown benchmarks: {', '.join(sorted(unknown))}")
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path = generate_shaped_export(os.path.join(tmp, 'export.csv'), args.shape, args.rows)
+        processor = GoodreadsDataProcessor(csv_path)
+
+        if 'ingestion' in selected:
+            results['ingestion'] = measure(lambda: read_goodreads_export(csv_path), args.repeat)
+        if 'filter_date_range' in selected:
+            results['filter_date_range'] = measure(
+                lambda: processor._filter_date_range(args.start, args.end), args.repeat)
+        if 'get_statistics' in selected:
+            results['get_statistics'] = measure(
+                lambda: processor.get_statistics(args.start, args.end, fetch_covers=False), args.repeat)
+
+        if {'get_covers_batch', 'analyze'} & set(selected):
+            mock = MockProviders(latency=args.latency, error_share=args.error_share,
+                                 rate_limit_share=args.rate_limit_share).start()
+            try:
+                if 'get_covers_batch' in selected:
+                    results['get_covers_batch'] = bench_covers(processor, mock, args)
+                if 'analyze' in selected:
+                    results['analyze'] = bench_analyze(csv_path, mock, args)
+            finally:
+                mock.stop()
+
+        config = {
+            'shape': args.shape,
+            'rows': len(processor.df),
+            'period': [args.start, args.end],
+            'repeat': args.repeat,
+            'latency': args.latency,
+            'error_share': args.error_share,
+            'rate_limit_share': args.rate_limit_share,
+            'cover_books': args.cover_books
+        }
+
+    return {
+        'created': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'environment': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'pandas': pd.__version__,
+            'numpy': np.__version__,
+            'orjson': serialization.orjson is not None
+        },
+        'config': config,
+        'benchmarks': results
+    }
+
+
+def compare(current: dict, previous: dict, tolerance: float) -> list:
+    """
+    Print each benchmark's best time next to the previous run's, returns the regressed ones
+    """
+    if current['config'] != previous['config']:
+        print("Warning: the previous run used another configuration, timings may not be comparable")
+    regressions = []
+    for name, result in current['benchmarks'].items():
+        before = previous['benchmarks'].get(name)
+        if before is None:
+            print(f"{name}: {result['best_ms']:.1f} ms (new)")
+            continue
+        change = result['best_ms'] / before['best_ms'] - 1 if before['best_ms'] else 0.0
+        flag = ''
+        if change > tolerance:
+            flag = '  <-- slower'
+            regressions.append(name)
+        print(f"{name}: {before['best_ms']:.1f} ms -> {result['best_ms']:.1f} ms ({change:+.1%}){flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--shape', choices=sorted(EXPORT_SHAPES), default='typical')
+    parser.add_argument('--rows', type=int, help="overrides the shape's number of rows")
+    parser.add_argument('--start', default='2024-01-01')
+    parser.add_argument('--end', default='2024-12-31')
+    parser.add_argument('--only', help=f"comma separated subset of {', '.join(BENCHMARKS)}")
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--latency', type=float, default=0.02, help='mock provider latency (seconds)')
+    parser.add_argument('--error-share', type=float, default=0.0, help='share of provider requests failing with 503')
+    parser.add_argument('--rate-limit-share', type=float, default=0.0, help='share of provider requests getting a 429')
+    parser.add_argument('--cover-books', type=int, default=200, help='books in the get_covers_batch benchmark')
+    parser.add_argument('--output', help='write the results to this JSON file')
+    parser.add_argument('--compare', help='previous results file to compare with')
+    parser.add_argument('--tolerance', type=float, default=0.1, help='slowdown flagged as a regression')
+    parser.add_argument('--strict', action='store_true', help='exit with status 1 on a regression')
+    args = parser.parse_args()
+
+    results = run_suite(args)
+    for name, result in results['benchmarks'].items():
+        extra = ', '.join(f"{key} {value}" for key, value in result.items() if not key.endswith('_ms'))
+        print(f"{name}: best {result['best_ms']:.1f} ms, median {result['median_ms']:.1f} ms"
+              f"{f' ({extra})' if extra else ''}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.output}")
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            previous = json.load(f)
+        regressions = compare(results, previous, args.tolerance)
+        if regressions and args.strict:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,123 @@
+"""
+Synthetic Goodreads exports of configurable size and shape
+
+Write one from the backend directory:
+    python -m benchmarks.synthetic_export export.csv --shape heavy_reviews --rows 5000
+"""
+import argparse
+import csv
+import random
+from typing import Dict, Optional, TextIO
+
+# Column layout of a real Goodreads library export
+GOODREADS_COLUMNS = [
+    'Book Id', 'Title', 'Author', 'Author l-f', 'Additional Authors', 'ISBN', 'ISBN13',
+    'My Rating', 'Average Rating', 'Publisher', 'Binding', 'Number of Pages',
+    'Year Published', 'Original Publication Year', 'Date Read', 'Date Added',
+    'Bookshelves', 'Bookshelves with positions', 'Exclusive Shelf', 'My Review',
+    'Spoiler', 'Private Notes', 'Read Count', 'Owned Copies'
+]
+
+REVIEW_WORDS = (
+    "the a story characters plot ending loved hated slow fast writing world "
+    "damn shit ass class pass fucking brilliant boring"
+).split()
+
+
+# Export shapes for the benchmark suite: keyword arguments of write_synthetic_export
+EXPORT_SHAPES = {
+    'small': {'rows': 300},
+    'typical': {'rows': 2000},
+    'heavy_reviews': {'rows': 2000, 'review_share': 0.9, 'max_review_words': 2000},
+    'sparse_isbn': {'rows': 2000, 'missing_isbn_share': 0.8, 'isbn_x_share': 0.1},
+    'mostly_unread': {'rows': 5000, 'shelves': {'read': 0.2, 'to-read': 0.7, 'currently-reading': 0.1}},
+    'messy': {'rows': 2000, 'undated_read_share': 0.1, 'isbn_x_share': 0.1, 'isbn13_share': 0.6},
+    'large': {'rows': 50000},
+}
+
+
+def write_synthetic_export(out: TextIO, rows: int, seed: int = 0, years=(2022, 2023, 2024),
+                           read_share: float = 0.75, missing_isbn_share: float = 0.3,
+                           review_share: float = 0.5, max_review_words: int = 300,
+                           shelves: Optional[Dict[str, float]] = None, isbn_x_share: float = 0.0,
+                           isbn13_share: float = 0.0, undated_read_share: float = 0.0):
+    """
+    Write a synthetic Goodreads export with `rows` books to an open text file
+    ISBNs use the export's ="..." quoting (="" when missing) and titles sometimes
+    carry a "(Series, #n)" suffix, like the real thing.
+    shelves maps exclusive shelves to weights and replaces read_share. The other shapes:
+    ISBN-10s with an X check digit, filled ISBN13 columns and read books without a
+    Date Read, all off by default (the default export is the same as before they existed).
+    """
+    rng = random.Random(seed)
+    writer = csv.writer(out)
+    writer.writerow(GOODREADS_COLUMNS)
+
+    for book_id in range(1, rows + 1):
+        if shelves:
+            shelf = rng.choices(list(shelves), weights=list(shelves.values()))[0]
+        else:
+            shelf = 'read' if rng.random() < read_share else rng.choice(['to-read', 'currently-reading'])
+        year = rng.choice(years)
+        date_added = f"{year}/{rng.randint(1, 12):02d}/{rng.randint(1, 28):02d}"
+        date_read = ''
+        if shelf == 'read':
+            date_read = f"{year}/{rng.randint(1, 12):02d}/{rng.randint(1, 28):02d}"
+            if undated_read_share and rng.random() < undated_read_share:
+                date_read = ''
+
+        title = f"Book {book_id}"
+        if rng.random() < 0.2:
+            title += f" (Series {book_id % 97}, #{rng.randint(1, 9)})"
+
+        isbn = '=""' if rng.random() < missing_isbn_share else f'="{rng.randint(10**9, 10**10 - 1)}"'
+        if isbn_x_share and isbn != '=""' and rng.random() < isbn_x_share:
+            isbn = f'{isbn[:-2]}X"'
+        isbn13 = ''
+        if isbn13_share and isbn != '=""' and rng.random() < isbn13_share:
+            isbn13 = f'="978{isbn[2:11]}{rng.randint(0, 9)}"'
+        review = ''
+        if shelf == 'read' and rng.random() < review_share:
+            review = ' '.join(rng.choice(REVIEW_WORDS) for _ in range(rng.randint(1, max_review_words)))
+
+        writer.writerow([
+            book_id, title, f"Author {rng.randint(1, rows // 10 + 1)}", '', '',
+            isbn, isbn13, rng.randint(0, 5) if shelf == 'read' else 0,
+            f"{rng.uniform(2.5, 4.8):.2f}", 'Publisher', 'Paperback',
+            rng.randint(40, 1200) if rng.random() < 0.97 else '',
+            rng.randint(1900, 2024), '', date_read, date_added,
+            '' if shelf == 'read' else shelf, '', shelf, review, '', '', 1, 0
+        ])
+
+
+def generate_synthetic_export(path: str, rows: int, seed: Optional[int] = 0, **kwargs) -> str:
+    """
+    Write a synthetic Goodreads export to `path` and return the path
+    """
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        write_synthetic_export(f, rows, seed=seed, **kwargs)
+    return path
+
+
+def generate_shaped_export(path: str, shape: str, rows: Optional[int] = None, seed: Optional[int] = 0) -> str:
+    """
+    Write an export of one of the EXPORT_SHAPES, optionally with another number of rows
+    """
+    options = dict(EXPORT_SHAPES[shape])
+    if rows is not None:
+        options['rows'] = rows
+    return generate_synthetic_export(path, options.pop('rows'), seed=seed, **options)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('path')
+    parser.add_argument('--shape', choices=sorted(EXPORT_SHAPES), default='typical')
+    parser.add_argument('--rows', type=int, help="overrides the shape's number of rows")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    generate_shaped_export(args.path, args.shape, args.rows, args.seed)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,144 @@
+import base64
+import binascii
+import hashlib
+import math
+from typing import Callable, Dict, List, Optional
+
+from result_cache import book_lists, result_key
+from serialization import dumps
+
+BOOK_FIELDS = ('title', 'author', 'rating', 'pages', 'date_read', 'review', 'isbn', 'year_published', 'cover_url')
+SORT_FIELDS = ('title', 'author', 'rating', 'pages', 'date_read', 'year_published')
+# The order All Books Read is built in, most recently read first
+DEFAULT_SORT = '-date_read'
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+def book_list_id(digest: str, start_date: str, end_date: str) -> str:
+    """
+    /books/<id> id of the book list of an upload's period, the same for every request asking for it
+    """
+    return hashlib.sha256(result_key(digest, start_date, end_date).encode()).hexdigest()[:32]
+
+
+def parse_fields(value: Optional[str]) -> Optional[List[str]]:
+    """
+    Fields asked for by a comma separated fields parameter, None for all of them
+    """
+    if not value:
+        return None
+    fields = [field.strip() for field in value.split(',') if field.strip()]
+    unknown = [field for field in fields if field not in BOOK_FIELDS]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    return fields
+
+
+def _encode_cursor(sort: str, offset: int) -> str:
+    return base64.urlsafe_b64encode(f"{sort}:{offset}".encode()).decode().rstrip('=')
+
+
+def _decode_cursor(cursor: str, sort: str) -> int:
+    try:
+        cursor_sort, offset = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode().rsplit(':', 1)
+        offset = int(offset)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise ValueError('Malformed cursor')
+    if cursor_sort != sort or offset < 0:
+        raise ValueError('Cursor belongs to another sort order')
+    return offset
+
+
+def _missing(value) -> bool:
+    # Sparse columns can hand over NaN rather than None
+    return value is None or (isinstance(value, float) and math.isnan(value))
+
+
+def _sort_key(field: str) -> Callable:
+    if field in ('title', 'author'):
+        return lambda value: str(value).casefold()
+    return lambda value: value
+
+
+class BookList:
+    """
+    All Books Read of one analyzed period, served a page at a time by /books/<id>
+    Sort orders are computed on first use and shared by all pages
+    """
+
+    def __init__(self, books: List[Dict]):
+        self.books = books
+        self.size = len(dumps(books))
+        self._orders = {DEFAULT_SORT: list(range(len(books)))}
+
+    def order(self, sort: str) -> List[int]:
+        """
+        Book positions in a sort order: a field, descending with a leading '-'
+        Books without a value come last, ties keep the All Books Read order
+        """
+        if sort not in self._orders:
+            field = sort.lstrip('-')
+            if field not in SORT_FIELDS:
+                raise ValueError(f"Can't sort by {field}")
+            key = _sort_key(field)
+            present = [i for i, book in enumerate(self.books) if not _missing(book[field])]
+            missing = [i for i, book in enumerate(self.books) if _missing(book[field])]
+            present.sort(key=lambda i: key(self.books[i][field]), reverse=sort.startswith('-'))
+            self._orders[sort] = present + missing
+        return self._orders[sort]
+
+    def page(self, sort: str = DEFAULT_SORT, cursor: Optional[str] = None, limit: int = DEFAULT_PAGE_SIZE,
+             fields: Optional[List[str]] = None) -> Dict:
+        """
+        One page of books, with the cursor of the next page (None on the last one)
+        """
+        if not 1 <= limit <= MAX_PAGE_SIZE:
+            raise ValueError(f"limit must be between 1 and {MAX_PAGE_SIZE}")
+        order = self.order(sort)
+        offset = _decode_cursor(cursor, sort) if cursor else 0
+        positions = order[offset:offset + limit]
+
+        if fields is None:
+            books = [self.books[i] for i in positions]
+        else:
+            books = [{field: self.books[i][field] for field in fields} for i in positions]
+        end = offset + len(positions)
+        return {
+            'books': books,
+            'total': len(order),
+            'sort': sort,
+            'next_cursor': _encode_cursor(sort, end) if end < len(order) else None
+        }
+
+
+def attach_book_lists(stats, digest: str, to_books_url: Callable[[str], str], paged: bool = False,
+                      keep_existing: bool = False) -> Dict[str, BookList]:
+    """
+    Keep the All Books Read list of every period of a get_statistics (or get_statistics_for_years)
+    result for /books/<id>, and reference it from the period's Book_List section.
+    With paged=True the list itself is left out of the statistics. keep_existing=True keeps
+    a list already registered for the period (one with covers, when these statistics have none).
+    Returns the lists by id.
+    """
+    if not isinstance(stats, dict):
+        return {}
+    if 'All Books Read' not in stats:
+        registered = {}
+        for period in stats.values():
+            registered.update(attach_book_lists(period, digest, to_books_url, paged, keep_existing))
+        return registered
+
+    books_id = book_list_id(digest, stats['Time_Period']['start'], stats['Time_Period']['end'])
+    book_list = book_lists.get(books_id) if keep_existing else None
+    if book_list is None:
+        book_list = BookList(stats['All Books Read'])
+        book_lists.put(books_id, book_list, book_list.size)
+    stats['Book_List'] = {
+        'id': books_id,
+        'total': len(book_list.books),
+        'url': to_books_url(books_id)
+    }
+    if paged:
+        del stats['All Books Read']
+    return {books_id: book_list}
@@ -0,0 +1,123 @@
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, Optional
+
+# Found covers rarely change, "not found" results are worth retrying sooner
+COVER_HIT_TTL = 30 * 24 * 60 * 60
+COVER_MISS_TTL = 24 * 60 * 60
+COVER_CACHE_MAX_ENTRIES = 50000
+COVER_CACHE_PATH = os.environ.get('COVER_CACHE_PATH', os.path.join('cache', 'covers.sqlite3'))
+
+
+class CoverCache:
+    """
+    Persistent cover URL cache backed by SQLite
+
+    The database file is shared by every worker process on the host, so a cover
+    resolved for one user is reused by everyone else. Misses are stored as NULL
+    with a shorter TTL, and the least recently used rows are evicted once the
+    cache grows past max_entries.
+    """
+
+    def __init__(self, path: str = COVER_CACHE_PATH, hit_ttl: int = COVER_HIT_TTL,
+                 miss_ttl: int = COVER_MISS_TTL, max_entries: int = COVER_CACHE_MAX_ENTRIES):
+        self.path = path
+        self.hit_ttl = hit_ttl
+        self.miss_ttl = miss_ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS covers (
+                    key TEXT PRIMARY KEY,
+                    url TEXT,
+                    expires_at REAL NOT NULL,
+                    last_used REAL NOT NULL
+                )
+            """)
+            conn.execute('CREATE INDEX IF NOT EXISTS covers_last_used ON covers (last_used)')
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=5)
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, Optional[str]]:
+        """
+        Look up cached entries for the given keys
+        Returns a dictionary containing only the keys that are cached and not expired,
+        mapped to their cover URL (None for a cached miss)
+        """
+        keys = list(dict.fromkeys(keys))
+        if not keys:
+            return {}
+
+        now = time.time()
+        found = {}
+        with self._lock, self._connect() as conn:
+            # Stay well below SQLite's bound parameter limit
+            for start in range(0, len(keys), 500):
+                chunk = keys[start:start + 500]
+                placeholders = ','.join('?' * len(chunk))
+                rows = conn.execute(
+                    f'SELECT key, url FROM covers WHERE key IN ({placeholders}) AND expires_at > ?',
+                    (*chunk, now)
+                ).fetchall()
+                found.update(rows)
+
+            if found:
+                conn.executemany(
+                    'UPDATE covers SET last_used = ? WHERE key = ?',
+                    [(now, key) for key in found]
+                )
+        return found
+
+    def set_many(self, entries: Dict[str, Optional[str]]):
+        """
+        Store cover URLs (or None for "no cover found") and evict the oldest entries
+        if the cache grew past its size cap
+        """
+        if not entries:
+            return
+
+        now = time.time()
+        rows = [
+            (key, url, now + (self.hit_ttl if url else self.miss_ttl), now)
+            for key, url in entries.items()
+        ]
+        with self._lock, self._connect() as conn:
+            conn.executemany(
+                'INSERT OR REPLACE INTO covers (key, url, expires_at, last_used) VALUES (?, ?, ?, ?)',
+                rows
+            )
+            conn.execute('DELETE FROM covers WHERE expires_at <= ?', (now,))
+            count = conn.execute('SELECT COUNT(*) FROM covers').fetchone()[0]
+            if count > self.max_entries:
+                conn.execute(
+                    'DELETE FROM covers WHERE key IN '
+                    '(SELECT key FROM covers ORDER BY last_used ASC LIMIT ?)',
+                    (count - self.max_entries,)
+                )
+
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+
+def get_cover_cache() -> Optional[CoverCache]:
+    """
+    Return the process-wide cover cache, creating it on first use
+    Returns None if the cache is disabled (COVER_CACHE_PATH set to an empty string)
+    """
+    global _default_cache
+    if not COVER_CACHE_PATH:
+        return None
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = CoverCache()
+        return _default_cache
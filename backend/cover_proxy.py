@@ -0,0 +1,270 @@
+import base64
+import binascii
+import hashlib
+import mimetypes
+import os
+import threading
+import time
+from io import BytesIO
+from typing import Callable, Optional, Tuple
+from urllib.parse import urljoin, urlparse
+
+import requests
+
+from instrumentation import record_cache_lookup
+from process_data import OPEN_LIBRARY_COVERS
+
+# Set COVER_PROXY=0 (or empty) to hand out the providers' cover URLs instead of /covers/<key> ones
+COVER_PROXY = os.environ.get('COVER_PROXY', '1') not in ('0', '')
+# Normalized thumbnails, shared by all workers on the host
+COVER_PROXY_DIR = os.environ.get('COVER_PROXY_DIR', 'cache/thumbnails')
+COVER_PROXY_MAX_BYTES = 512 * 1024 * 1024
+COVER_THUMBNAIL_WIDTH = 256
+COVER_FETCH_TIMEOUT = 5
+# Larger downloads are abandoned, covers are a few hundred KB at most
+COVER_FETCH_MAX_BYTES = 5 * 1024 * 1024
+COVER_FETCH_MAX_REDIRECTS = 3
+# Thumbnails never change for a given key, let browsers keep them for a year
+COVER_MAX_AGE = 365 * 24 * 60 * 60
+# Only covers from these hosts are proxied, /covers can't be used to fetch arbitrary URLs
+COVER_PROXY_HOSTS = {
+    'books.google.com',
+    'books.googleusercontent.com',
+    urlparse(OPEN_LIBRARY_COVERS).hostname,
+    *filter(None, os.environ.get('COVER_PROXY_HOSTS', '').split(','))
+}
+# Redirects are only followed to those hosts and these domains; Open Library sends its
+# covers on to archive.org
+COVER_REDIRECT_DOMAINS = ('archive.org',)
+# Disk usage is checked after this many new thumbnails
+PRUNE_EVERY = 200
+
+IMAGE_SIGNATURES = {
+    b'\xff\xd8\xff': 'jpg',
+    b'\x89PNG': 'png',
+    b'GIF8': 'gif',
+}
+
+
+def cover_key(url: str) -> str:
+    """
+    /covers/<key> key for a provider cover URL (the URL itself, base64url encoded)
+    Keys are stateless, so any worker can serve any key
+    """
+    return base64.urlsafe_b64encode(url.encode()).decode().rstrip('=')
+
+
+def cover_url_from_key(key: str) -> Optional[str]:
+    """
+    Provider cover URL of a key, None if it doesn't decode to a URL on an allowed host
+    """
+    try:
+        url = base64.urlsafe_b64decode(key + '=' * (-len(key) % 4)).decode()
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        return None
+    parsed = urlparse(url)
+    if parsed.scheme not in ('http', 'https') or parsed.hostname not in COVER_PROXY_HOSTS:
+        return None
+    return url
+
+
+def proxyable(url: Optional[str]) -> bool:
+    """
+    Whether a cover URL is on a host the proxy serves
+    """
+    return bool(url) and cover_url_from_key(cover_key(url)) is not None
+
+
+def _redirect_allowed(url: str) -> bool:
+    parsed = urlparse(url)
+    host = parsed.hostname or ''
+    return parsed.scheme in ('http', 'https') and (
+        host in COVER_PROXY_HOSTS or any(host.endswith(f".{domain}") for domain in COVER_REDIRECT_DOMAINS))
+
+
+def download_cover(url: str) -> bytes:
+    """
+    Download a provider cover, following redirects only to allowed hosts
+    Raises ValueError for other redirects and covers over COVER_FETCH_MAX_BYTES
+    """
+    for _ in range(COVER_FETCH_MAX_REDIRECTS + 1):
+        with requests.get(url, timeout=COVER_FETCH_TIMEOUT, allow_redirects=False, stream=True) as response:
+            if response.is_redirect:
+                url = urljoin(url, response.headers['Location'])
+                if not _redirect_allowed(url):
+                    raise ValueError(f"Cover redirected to {url}")
+                continue
+            response.raise_for_status()
+            length = response.headers.get('Content-Length', '')
+            if length.isdigit() and int(length) > COVER_FETCH_MAX_BYTES:
+                raise ValueError(f"Cover is {length} bytes")
+            data = bytearray()
+            for chunk in response.iter_content(64 * 1024):
+                data += chunk
+                if len(data) > COVER_FETCH_MAX_BYTES:
+                    raise ValueError(f"Cover is over {COVER_FETCH_MAX_BYTES} bytes")
+            return bytes(data)
+    raise ValueError(f"Cover redirected more than {COVER_FETCH_MAX_REDIRECTS} times")
+
+
+def _image_extension(data: bytes) -> str:
+    for signature, extension in IMAGE_SIGNATURES.items():
+        if data.startswith(signature):
+            return extension
+    return 'jpg'
+
+
+def normalize_image(data: bytes, width: int = COVER_THUMBNAIL_WIDTH) -> Tuple[bytes, str]:
+    """
+    Shrink a cover to `width` pixels wide and re-encode it as JPEG
+    Returns (image bytes, file extension). Without Pillow the image is kept as it is.
+    """
+    try:
+        from PIL import Image
+    except ImportError:
+        return data, _image_extension(data)
+
+    with Image.open(BytesIO(data)) as image:
+        image = image.convert('RGB')
+        if image.width > width:
+            image = image.resize((width, round(image.height * width / image.width)), Image.LANCZOS)
+        out = BytesIO()
+        image.save(out, format='JPEG', quality=85, optimize=True)
+    return out.getvalue(), 'jpg'
+
+
+class ThumbnailStore:
+    """
+    Content-addressed disk cache of normalized cover thumbnails
+
+    blobs/ holds each thumbnail once, named by the SHA-256 of its bytes (which doubles as
+    its ETag); urls/ maps the SHA-256 of a provider URL to the blob it was normalized into.
+    Files are written atomically, so workers can share the directory. Once the blobs
+    outgrow max_bytes the least recently written ones are removed.
+    """
+
+    def __init__(self, directory: str = COVER_PROXY_DIR, max_bytes: int = COVER_PROXY_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._writes = 0
+        os.makedirs(os.path.join(directory, 'blobs'), exist_ok=True)
+        os.makedirs(os.path.join(directory, 'urls'), exist_ok=True)
+
+    def _url_path(self, url: str) -> str:
+        return os.path.join(self.directory, 'urls', hashlib.sha256(url.encode()).hexdigest())
+
+    def _blob_path(self, name: str) -> str:
+        return os.path.join(self.directory, 'blobs', name)
+
+    @staticmethod
+    def _write_atomic(path: str, data: bytes):
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    def get(self, url: str) -> Optional[Tuple[str, str]]:
+        """
+        (blob path, digest) of an already stored cover, None if it needs fetching
+        """
+        try:
+            with open(self._url_path(url), encoding='utf-8') as f:
+                name = f.read().strip()
+        except FileNotFoundError:
+            return None
+        path = self._blob_path(name)
+        if not name or not os.path.exists(path):
+            return None
+        return path, name.split('.', 1)[0]
+
+    def fetch(self, url: str) -> Tuple[str, str]:
+        """
+        Download a cover, store its normalized thumbnail and return (blob path, digest)
+        """
+        data, extension = normalize_image(download_cover(url))
+        digest = hashlib.sha256(data).hexdigest()
+        name = f"{digest}.{extension}"
+        path = self._blob_path(name)
+        if not os.path.exists(path):
+            self._write_atomic(path, data)
+        self._write_atomic(self._url_path(url), name.encode())
+
+        with self._lock:
+            self._writes += 1
+            prune = self._writes % PRUNE_EVERY == 0
+        if prune:
+            self.prune()
+        return path, digest
+
+    def get_or_fetch(self, url: str) -> Tuple[str, str]:
+        stored = self.get(url)
+        record_cache_lookup('thumbnail', hits=int(stored is not None), misses=int(stored is None))
+        return stored or self.fetch(url)
+
+    def prune(self):
+        """
+        Remove the least recently written thumbnails until the blobs fit in max_bytes
+        URL entries pointing at removed blobs are refetched on their next request
+        """
+        blobs = []
+        with os.scandir(os.path.join(self.directory, 'blobs')) as entries:
+            for entry in entries:
+                if entry.is_file() and not entry.name.endswith('.tmp'):
+                    stat = entry.stat()
+                    blobs.append((stat.st_mtime, stat.st_size, entry.path))
+        total = sum(size for _, size, _ in blobs)
+        for _, size, path in sorted(blobs):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+
+    @staticmethod
+    def mimetype(path: str) -> str:
+        return mimetypes.guess_type(path)[0] or 'image/jpeg'
+
+    @staticmethod
+    def last_modified(path: str) -> float:
+        try:
+            return os.path.getmtime(path)
+        except OSError:
+            return time.time()
+
+
+_thumbnail_store = None
+_thumbnail_store_lock = threading.Lock()
+
+
+def get_thumbnail_store() -> ThumbnailStore:
+    """
+    Process-wide thumbnail store, created on first use
+    """
+    global _thumbnail_store
+    with _thumbnail_store_lock:
+        if _thumbnail_store is None:
+            _thumbnail_store = ThumbnailStore()
+        return _thumbnail_store
+
+
+def proxy_cover_urls(stats, to_proxy_url: Callable[[str], str]):
+    """
+    Point the cover URLs of a get_statistics result (or of a get_statistics_for_years one)
+    at the proxy, in place. URLs on hosts the proxy doesn't serve are left as they are.
+    """
+    if not isinstance(stats, dict):
+        return stats
+    if 'All Books Read' not in stats:
+        for period in stats.values():
+            proxy_cover_urls(period, to_proxy_url)
+        return stats
+
+    books = list(stats['All Books Read'])
+    books += [book for book in stats.get('Book_Extremes', {}).values() if isinstance(book, dict)]
+    for book in books:
+        if proxyable(book.get('cover_url')):
+            book['cover_url'] = to_proxy_url(book['cover_url'])
+    return stats
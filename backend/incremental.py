@@ -0,0 +1,238 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional
+
+import pandas as pd
+
+from instrumentation import log_event, record_cache_lookup, span
+from process_data import INGEST_COLUMNS, GoodreadsDataProcessor
+from serialization import dumps
+
+# Snapshots keep cleaned reviews on disk, so they are only stored when a path is configured
+SNAPSHOT_PATH = os.environ.get('SNAPSHOT_PATH', '')
+SNAPSHOT_TTL = 90 * 24 * 60 * 60
+SNAPSHOT_MAX_ENTRIES = 1000
+# Columns compared between two versions of an export, Book Id tells which rows to compare
+DIGEST_COLUMNS = [col for col in INGEST_COLUMNS if col != 'Book Id']
+
+
+def row_digests(df: pd.DataFrame) -> list:
+    """
+    64-bit digest of every row's ingested values, in row order
+    """
+    columns = [col for col in DIGEST_COLUMNS if col in df.columns]
+    return pd.util.hash_pandas_object(df[columns], index=False).tolist()
+
+
+class ExportSnapshot:
+    """
+    Compact record of an analyzed export: the digest of every row by Book Id, along with
+    the cleaned review and found cover of the rows that had them computed.
+    Applied to a later upload of the same library, unchanged rows get their review and
+    cover back and only changed or new rows are cleaned and looked up again.
+    """
+
+    def __init__(self, digests: Dict[int, int], reviews: Dict[int, str], covers: Dict[int, str],
+                 sanitizer: str):
+        self.digests = digests
+        self.reviews = reviews
+        self.covers = covers
+        self.sanitizer = sanitizer
+
+    @classmethod
+    def capture(cls, processor: GoodreadsDataProcessor) -> Optional['ExportSnapshot']:
+        """
+        Snapshot of what the processor knows, None for exports without a Book Id column
+        and for streamed exports
+        """
+        df = processor.df
+        if df is None or processor.known_reviews is None or 'Book Id' not in df.columns:
+            return None
+
+        book_ids = df['Book Id']
+        # Rows without an id, or sharing one, can't be told apart in the next version
+        unique = (book_ids.notna() & ~book_ids.duplicated(keep=False)).to_numpy()
+        labels = df.index[unique]
+        ids = book_ids[unique].astype('int64').tolist()
+        id_by_label = dict(zip(labels, ids))
+        digests = [digest for digest, keep in zip(row_digests(df), unique) if keep]
+        return cls(
+            dict(zip(ids, digests)),
+            {id_by_label[label]: review for label, review in list(processor.known_reviews.items())
+             if label in id_by_label},
+            {id_by_label[label]: url for label, url in list(processor.known_covers.items())
+             if label in id_by_label},
+            processor.review_sanitizer.fingerprint()
+        )
+
+    def apply(self, processor: GoodreadsDataProcessor) -> Optional[Dict[str, int]]:
+        """
+        Hand the reviews and covers of unchanged rows to the processor of a newer upload
+        Returns how many rows are unchanged, changed, added and removed (None if the
+        processor can't reuse anything)
+        """
+        df = processor.df
+        if df is None or processor.known_reviews is None or 'Book Id' not in df.columns:
+            return None
+
+        reuse_reviews = self.sanitizer == processor.review_sanitizer.fingerprint()
+        counts = {'unchanged': 0, 'changed': 0, 'added': 0, 'removed': 0}
+        seen = set()
+        for label, book_id, digest in zip(df.index, df['Book Id'].tolist(), row_digests(df)):
+            previous = self.digests.get(book_id)
+            if previous is None:
+                counts['added'] += 1
+                continue
+            seen.add(book_id)
+            if previous != digest:
+                counts['changed'] += 1
+                continue
+            counts['unchanged'] += 1
+            if reuse_reviews and book_id in self.reviews:
+                processor.known_reviews.setdefault(label, self.reviews[book_id])
+            if book_id in self.covers:
+                processor.known_covers.setdefault(label, self.covers[book_id])
+        counts['removed'] = len(self.digests) - len(seen)
+        return counts
+
+    def to_bytes(self) -> bytes:
+        return zlib.compress(dumps({
+            'digests': list(self.digests.items()),
+            'reviews': list(self.reviews.items()),
+            'covers': list(self.covers.items()),
+            'sanitizer': self.sanitizer
+        }))
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> 'ExportSnapshot':
+        fields = json.loads(zlib.decompress(data))
+        return cls(dict(fields['digests']), dict(fields['reviews']), dict(fields['covers']), fields['sanitizer'])
+
+
+class SnapshotStore:
+    """
+    Export snapshots by id backed by SQLite, shared by every worker process on the host
+
+    Snapshots expire after ttl seconds and the least recently used ones are evicted once
+    the store holds more than max_entries.
+    """
+
+    def __init__(self, path: str = SNAPSHOT_PATH, ttl: int = SNAPSHOT_TTL, max_entries: int = SNAPSHOT_MAX_ENTRIES):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS snapshots (
+                    id TEXT PRIMARY KEY,
+                    data BLOB NOT NULL,
+                    expires_at REAL NOT NULL,
+                    last_used REAL NOT NULL
+                )
+            """)
+            conn.execute('CREATE INDEX IF NOT EXISTS snapshots_last_used ON snapshots (last_used)')
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=5)
+
+    def get(self, snapshot_id: str) -> Optional[ExportSnapshot]:
+        now = time.time()
+        with self._lock, self._connect() as conn:
+            row = conn.execute(
+                'SELECT data FROM snapshots WHERE id = ? AND expires_at > ?', (snapshot_id, now)
+            ).fetchone()
+            if row is not None:
+                conn.execute('UPDATE snapshots SET last_used = ? WHERE id = ?', (now, snapshot_id))
+        return ExportSnapshot.from_bytes(row[0]) if row is not None else None
+
+    def put(self, snapshot_id: str, snapshot: ExportSnapshot):
+        data = snapshot.to_bytes()
+        now = time.time()
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                'INSERT OR REPLACE INTO snapshots (id, data, expires_at, last_used) VALUES (?, ?, ?, ?)',
+                (snapshot_id, data, now + self.ttl, now)
+            )
+            conn.execute('DELETE FROM snapshots WHERE expires_at <= ?', (now,))
+            count = conn.execute('SELECT COUNT(*) FROM snapshots').fetchone()[0]
+            if count > self.max_entries:
+                conn.execute(
+                    'DELETE FROM snapshots WHERE id IN '
+                    '(SELECT id FROM snapshots ORDER BY last_used ASC LIMIT ?)',
+                    (count - self.max_entries,)
+                )
+
+
+_default_store = None
+_default_store_lock = threading.Lock()
+# Snapshots are encoded and written off the request thread
+_writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix='snapshot-writer')
+
+
+def get_snapshot_store() -> Optional[SnapshotStore]:
+    """
+    Return the process-wide snapshot store, creating it on first use
+    Returns None if snapshots are disabled (SNAPSHOT_PATH unset or empty)
+    """
+    global _default_store
+    if not SNAPSHOT_PATH:
+        return None
+    with _default_store_lock:
+        if _default_store is None:
+            _default_store = SnapshotStore()
+        return _default_store
+
+
+def reuse_snapshot(processor: GoodreadsDataProcessor, snapshot_id: Optional[str]) -> Optional[Dict[str, int]]:
+    """
+    Apply the stored snapshot of a previous upload to the processor of a new one
+    Returns the row counts of ExportSnapshot.apply, None if there was nothing to reuse
+    """
+    store = get_snapshot_store()
+    if store is None or not snapshot_id:
+        return None
+    with span('snapshot'):
+        snapshot = store.get(snapshot_id)
+        counts = snapshot.apply(processor) if snapshot is not None else None
+    if counts is None:
+        log_event('snapshot_missing', snapshot_id=snapshot_id)
+        return None
+    record_cache_lookup('snapshot_row', hits=counts['unchanged'], misses=counts['changed'] + counts['added'])
+    log_event('snapshot_reused', snapshot_id=snapshot_id, **counts)
+    return counts
+
+
+def save_snapshot(processor: GoodreadsDataProcessor, snapshot_id: str) -> Optional[str]:
+    """
+    Store a snapshot of the processor's export in the background
+    Returns the id to reuse it with, None if snapshots are disabled or not possible for this export
+    """
+    store = get_snapshot_store()
+    if store is None:
+        return None
+    with span('snapshot'):
+        snapshot = ExportSnapshot.capture(processor)
+    if snapshot is None:
+        return None
+    _writer.submit(_write_snapshot, store, snapshot_id, snapshot)
+    return snapshot_id
+
+
+def _write_snapshot(store: SnapshotStore, snapshot_id: str, snapshot: ExportSnapshot):
+    try:
+        with span('snapshot_write'):
+            store.put(snapshot_id, snapshot)
+    except Exception as e:
+        log_event('snapshot_write_failed', logging.WARNING, snapshot_id=snapshot_id, error=str(e))
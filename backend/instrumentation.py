@@ -0,0 +1,215 @@
+import contextvars
+import json
+import logging
+import os
+import random
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Dict, Optional, Sequence, Tuple
+
+# Share of per-book cover events written to the log (1 logs every book, 0 none)
+COVER_LOG_SAMPLE_RATE = float(os.environ.get('COVER_LOG_SAMPLE_RATE', '0.01'))
+LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO')
+# Upper bounds (seconds) of the latency histogram buckets
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(names: Sequence[str], values: Sequence, extra: str = '') -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+class Counter:
+    """
+    Monotonic count per label combination, in the Prometheus text format
+    """
+
+    kind = 'counter'
+
+    def __init__(self, name: str, help_text: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.help_text = help_text
+        self.labels = tuple(labels)
+        self._values: Dict[Tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels):
+        key = tuple(labels[name] for name in self.labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        with self._lock:
+            return self._values.get(tuple(labels[name] for name in self.labels), 0)
+
+    def samples(self) -> list:
+        with self._lock:
+            values = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.labels, key)} {value:g}" for key, value in values]
+
+
+class Histogram:
+    """
+    Observation counts per latency bucket and label combination, in the Prometheus text format
+    """
+
+    kind = 'histogram'
+
+    def __init__(self, name: str, help_text: str, labels: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        # label values -> (count per bucket, sum, count)
+        self._values: Dict[Tuple, list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = tuple(labels[name] for name in self.labels)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    entry[0][i] += 1
+                    break
+            entry[1] += value
+            entry[2] += 1
+
+    def samples(self) -> list:
+        with self._lock:
+            values = sorted((key, (list(buckets), total, count)) for key, (buckets, total, count) in self._values.items())
+        lines = []
+        for key, (buckets, total, count) in values:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, buckets):
+                cumulative += bucket_count
+                bucket_labels = _format_labels(self.labels, key, 'le="%g"' % bound)
+                lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+            inf_labels = _format_labels(self.labels, key, 'le="+Inf"')
+            lines.append(f"{self.name}_bucket{inf_labels} {count}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labels, key)} {total:g}")
+            lines.append(f"{self.name}_count{_format_labels(self.labels, key)} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    """
+    The metrics of this worker process, rendered for /metrics
+    """
+
+    def __init__(self):
+        self._metrics = OrderedDict()
+
+    def counter(self, name: str, help_text: str, labels: Sequence[str] = ()) -> Counter:
+        return self._metrics.setdefault(name, Counter(name, help_text, labels))
+
+    def histogram(self, name: str, help_text: str, labels: Sequence[str] = ()) -> Histogram:
+        return self._metrics.setdefault(name, Histogram(name, help_text, labels))
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.help_text}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples())
+        return '\n'.join(lines) + '\n'
+
+
+metrics = MetricsRegistry()
+stage_duration = metrics.histogram(
+    'goodreads_stage_duration_seconds', 'Time spent in each processing stage', ('stage',))
+http_request_duration = metrics.histogram(
+    'goodreads_http_request_duration_seconds', 'HTTP request latency', ('endpoint', 'status'))
+provider_requests = metrics.counter(
+    'goodreads_provider_requests_total', 'Cover provider lookups by outcome (success, miss, error, timeout, rate_limited)',
+    ('provider', 'outcome'))
+provider_duration = metrics.histogram(
+    'goodreads_provider_request_duration_seconds', 'Cover provider lookup latency', ('provider',))
+cache_lookups = metrics.counter(
+    'goodreads_cache_lookups_total', 'Cache lookups by cache and result (hit or miss)', ('cache', 'result'))
+cover_deadline_timeouts = metrics.counter(
+    'goodreads_cover_deadline_timeouts_total', 'Books left without a cover by the cover batch deadline')
+
+
+def record_cache_lookup(cache: str, hits: int = 0, misses: int = 0):
+    if hits:
+        cache_lookups.inc(hits, cache=cache, result='hit')
+    if misses:
+        cache_lookups.inc(misses, cache=cache, result='miss')
+
+
+# Stage durations of the request being handled, None outside of a request
+_request_timings = contextvars.ContextVar('request_timings', default=None)
+
+
+def start_request_timings() -> Dict[str, float]:
+    """
+    Start collecting span durations for the current request (see server_timing_header)
+    """
+    timings = OrderedDict()
+    _request_timings.set(timings)
+    return timings
+
+
+def request_timings() -> Optional[Dict[str, float]]:
+    return _request_timings.get()
+
+
+@contextmanager
+def span(stage: str):
+    """
+    Time a processing stage into the stage histogram and, within a request, its Server-Timing
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        stage_duration.observe(elapsed, stage=stage)
+        timings = _request_timings.get()
+        if timings is not None:
+            timings[stage] = timings.get(stage, 0.0) + elapsed
+
+
+def server_timing_header(timings: Dict[str, float], total: Optional[float] = None) -> str:
+    """
+    Server-Timing header value of the collected stage durations (in milliseconds)
+    """
+    entries = [f"{stage};dur={seconds * 1000:.1f}" for stage, seconds in timings.items()]
+    if total is not None:
+        entries.append(f"total;dur={total * 1000:.1f}")
+    return ', '.join(entries)
+
+
+logger = logging.getLogger('goodreads_wrapped')
+if not logger.handlers:
+    _handler = logging.StreamHandler()
+    _handler.setFormatter(logging.Formatter('%(message)s'))
+    logger.addHandler(_handler)
+    logger.setLevel(LOG_LEVEL)
+    logger.propagate = False
+
+
+def sampled(rate: float) -> bool:
+    """
+    Whether to log an event sampled at `rate`, decide before building the event
+    """
+    return rate >= 1 or (rate > 0 and random.random() < rate)
+
+
+def log_event(event: str, level: int = logging.INFO, **fields):
+    """
+    Write one structured (JSON) log line
+    """
+    if logger.isEnabledFor(level):
+        logger.log(level, json.dumps({'ts': round(time.time(), 3), 'event': event, **fields}, default=str))
@@ -0,0 +1,190 @@
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+from instrumentation import log_event
+from process_data import cover_resolver
+
+# Finished jobs are kept around this long for clients to collect (seconds)
+JOB_TTL = 60 * 60
+# Running jobs are never purged, except shared ones nothing wrote to for this long: their worker died
+STALE_JOB_TTL = 6 * 60 * 60
+COVER_JOB_WORKERS = 2
+# Set to a directory to share jobs between gunicorn workers through the filesystem
+JOB_STORE_DIR = os.environ.get('JOB_STORE_DIR', '')
+
+
+class JobStore:
+    """
+    Store for background cover resolution jobs
+
+    Jobs live in memory by default. With a directory, each job is kept as a small
+    JSON metadata file plus an append-only JSON lines file of resolved covers,
+    so any worker process on the host can answer GET /jobs/<id>.
+    """
+
+    def __init__(self, directory: Optional[str] = None, ttl: int = JOB_TTL, stale_ttl: int = STALE_JOB_TTL):
+        self.directory = directory
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self._jobs = {}
+        self._lock = threading.Lock()
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def _meta_path(self, job_id: str) -> str:
+        return os.path.join(self.directory, f"{job_id}.json")
+
+    def _covers_path(self, job_id: str) -> str:
+        return os.path.join(self.directory, f"{job_id}.covers.jsonl")
+
+    def _write_meta(self, job_id: str, meta: dict):
+        tmp_path = self._meta_path(job_id) + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, self._meta_path(job_id))
+
+    def _read_meta(self, job_id: str) -> Optional[dict]:
+        try:
+            with open(self._meta_path(job_id), encoding='utf-8') as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+    def _purge_expired(self):
+        now = time.time()
+        with self._lock:
+            expired = [
+                job_id for job_id, job in self._jobs.items()
+                if job['status'] != 'running' and job['finished'] < now - self.ttl
+            ]
+            for job_id in expired:
+                del self._jobs[job_id]
+        if not self.directory:
+            return
+
+        # Every cover and finish() touch a job's files, the latest write tells how long it has been idle
+        files, last_write = {}, {}
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            try:
+                mtime = os.path.getmtime(path)
+            except OSError:
+                continue
+            job_id = name.split('.', 1)[0]
+            files.setdefault(job_id, []).append(path)
+            last_write[job_id] = max(last_write.get(job_id, mtime), mtime)
+        for job_id, paths in files.items():
+            idle = now - last_write[job_id]
+            if idle < self.ttl:
+                continue
+            meta = self._read_meta(job_id)
+            if meta is not None and meta['status'] == 'running' and idle < self.stale_ttl:
+                continue
+            for path in paths:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+    def create(self, total: int) -> str:
+        """
+        Register a new job expecting `total` covers and return its id
+        """
+        self._purge_expired()
+        job_id = uuid.uuid4().hex
+        meta = {'status': 'running', 'total': total, 'created': time.time(), 'finished': None, 'error': None}
+        if self.directory:
+            self._write_meta(job_id, meta)
+            open(self._covers_path(job_id), 'w').close()
+        else:
+            with self._lock:
+                self._jobs[job_id] = {**meta, 'covers': []}
+        return job_id
+
+    def add_cover(self, job_id: str, book_id: str, cover_url: Optional[str]):
+        update = {'book_id': book_id, 'cover_url': cover_url}
+        if self.directory:
+            with self._lock, open(self._covers_path(job_id), 'a', encoding='utf-8') as f:
+                f.write(json.dumps(update) + '\n')
+        else:
+            with self._lock:
+                job = self._jobs.get(job_id)
+                if job is not None:
+                    job['covers'].append(update)
+
+    def finish(self, job_id: str, error: Optional[str] = None):
+        status = 'failed' if error else 'done'
+        if self.directory:
+            meta = self._read_meta(job_id)
+            if meta is not None:
+                meta.update(status=status, finished=time.time(), error=error)
+                self._write_meta(job_id, meta)
+        else:
+            with self._lock:
+                job = self._jobs.get(job_id)
+                if job is not None:
+                    job.update(status=status, finished=time.time(), error=error)
+
+    def get(self, job_id: str, since: int = 0) -> Optional[dict]:
+        """
+        Get a job's status and the cover updates resolved after the first `since` ones
+        Returns None for unknown or expired jobs
+        """
+        if not job_id.isalnum():
+            return None
+        if self.directory:
+            meta = self._read_meta(job_id)
+            if meta is None:
+                return None
+            with self._lock, open(self._covers_path(job_id), encoding='utf-8') as f:
+                covers = [json.loads(line) for line in f if line.strip()]
+        else:
+            with self._lock:
+                job = self._jobs.get(job_id)
+                if job is None:
+                    return None
+                meta = job
+                covers = list(job['covers'])
+
+        return {
+            'job_id': job_id,
+            'status': meta['status'],
+            'error': meta['error'],
+            'total': meta['total'],
+            'resolved': len(covers),
+            'next': len(covers),
+            'covers': covers[since:]
+        }
+
+
+job_store = JobStore(JOB_STORE_DIR or None)
+_executor = ThreadPoolExecutor(max_workers=COVER_JOB_WORKERS, thread_name_prefix='cover-job')
+
+
+def _run_cover_job(store: JobStore, job_id: str, books: list[dict]):
+    try:
+        cover_resolver.resolve(
+            books,
+            on_cover=lambda book_id, cover_url: store.add_cover(job_id, book_id, cover_url)
+        )
+    except Exception as e:
+        log_event('cover_job_failed', logging.ERROR, job_id=job_id, error=str(e), error_type=type(e).__name__)
+        store.finish(job_id, error=str(e))
+    else:
+        store.finish(job_id)
+
+
+def start_cover_job(books: list[dict], store: JobStore = job_store) -> str:
+    """
+    Resolve covers for the given books in the background
+    Returns the job id to poll with store.get()
+    """
+    job_id = store.create(total=len(books))
+    _executor.submit(_run_cover_job, store, job_id, books)
+    return job_id
@@ -0,0 +1,151 @@
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+
+# Largest/smallest page count wins, ties go to the row that comes first like idxmax/idxmin
+def _longest(candidates: list) -> Optional[tuple]:
+    return min(candidates, key=lambda item: (-item[0], item[1])) if candidates else None
+
+
+def _shortest(candidates: list) -> Optional[tuple]:
+    return min(candidates) if candidates else None
+
+
+class MonthlyIndex:
+    """
+    Per-(year, month) aggregates of the books read, built once per export
+
+    Each bucket holds the row positions of its books, the book count, page sum, rating
+    histogram and rating sum, the longest/shortest book and the first/last read date.
+    Statistics for any run of whole months are answered by combining buckets instead
+    of rescanning the frame. The longest/shortest books are kept as (pages, row label), labels
+    are expected to follow the row order like the export's RangeIndex does.
+    """
+
+    def __init__(self, df: pd.DataFrame):
+        dates = df['Date Read']
+        mask = (df['Exclusive Shelf'] == 'read').to_numpy() & dates.notna().to_numpy()
+        positions = np.flatnonzero(mask)
+        read = df.iloc[positions]
+
+        # Index every column by row position so per-group idxmax/idxmin return positions
+        position_index = pd.Index(positions)
+        dates = pd.Series(read['Date Read'].to_numpy(), index=position_index)
+        pages = pd.Series(read['Number of Pages'].to_numpy(dtype='float64'), index=position_index)
+        ratings = pd.Series(read['My Rating'].to_numpy(), index=position_index)
+        keys = [dates.dt.year.rename('year'), dates.dt.month.rename('month')]
+
+        self.buckets: Dict[Tuple[int, int], dict] = {}
+        for (year, month), bucket_dates in dates.groupby(keys):
+            self.buckets[(int(year), int(month))] = {
+                'positions': bucket_dates.index.to_numpy(),
+                'count': len(bucket_dates),
+                'first_read': bucket_dates.min(),
+                'last_read': bucket_dates.max(),
+                'page_sum': 0.0,
+                'rating_sum': 0.0,
+                'rating_counts': {},
+                'longest': None,
+                'shortest': None
+            }
+
+        for (year, month), page_sum in pages.groupby(keys).sum().items():
+            self.buckets[(year, month)]['page_sum'] = float(page_sum)
+        for (year, month), rating_sum in ratings.astype('float64').groupby(keys).sum().items():
+            self.buckets[(year, month)]['rating_sum'] = float(rating_sum)
+        for (year, month, rating), count in ratings.groupby(keys + [ratings]).size().items():
+            self.buckets[(year, month)]['rating_counts'][rating] = int(count)
+
+        # Books without a page count can't be the longest or shortest
+        known_pages = pages.dropna()
+        known_keys = [key[known_pages.index] for key in keys]
+        grouped_pages = known_pages.groupby(known_keys)
+        for (year, month), position in grouped_pages.idxmax().items():
+            self.buckets[(year, month)]['longest'] = (known_pages[position], df.index[position])
+        for (year, month), position in grouped_pages.idxmin().items():
+            self.buckets[(year, month)]['shortest'] = (known_pages[position], df.index[position])
+
+    @staticmethod
+    def month_span(start_date, end_date) -> Optional[Tuple[Tuple[int, int], Tuple[int, int]]]:
+        """
+        First and last (year, month) of a period made of whole months
+        Returns None if either bound is missing or the period doesn't start on the first
+        day of a month and end on the last day of a month
+        """
+        if not start_date or not end_date:
+            return None
+        start, end = pd.to_datetime(start_date), pd.to_datetime(end_date)
+        if start != start.normalize() or start.day != 1:
+            return None
+        if end != end.normalize() or not end.is_month_end:
+            return None
+        return (start.year, start.month), (end.year, end.month)
+
+    def select(self, first_month: Tuple[int, int], last_month: Tuple[int, int]) -> list:
+        """
+        Keys of the non-empty buckets between two (year, month) pairs, inclusive and in order
+        """
+        return sorted(key for key in self.buckets if first_month <= key <= last_month)
+
+    def merge(self, other: 'MonthlyIndex'):
+        """
+        Fold the buckets of an index built over a later chunk of the same export into this one
+        Positions only make sense within one frame, merged buckets don't keep them
+        """
+        for key, theirs in other.buckets.items():
+            ours = self.buckets.get(key)
+            if ours is None:
+                self.buckets[key] = {**theirs, 'positions': None, 'rating_counts': dict(theirs['rating_counts'])}
+                continue
+            ours['positions'] = None
+            ours['count'] += theirs['count']
+            ours['page_sum'] += theirs['page_sum']
+            ours['rating_sum'] += theirs['rating_sum']
+            for rating, count in theirs['rating_counts'].items():
+                ours['rating_counts'][rating] = ours['rating_counts'].get(rating, 0) + count
+            ours['first_read'] = min(ours['first_read'], theirs['first_read'])
+            ours['last_read'] = max(ours['last_read'], theirs['last_read'])
+            ours['longest'] = _longest([item for item in (ours['longest'], theirs['longest']) if item])
+            ours['shortest'] = _shortest([item for item in (ours['shortest'], theirs['shortest']) if item])
+
+    def positions(self, keys: list) -> np.ndarray:
+        """
+        Row positions of every book in the given buckets, in frame order
+        """
+        if not keys:
+            return np.array([], dtype=np.int64)
+        return np.sort(np.concatenate([self.buckets[key]['positions'] for key in keys]))
+
+    def combine(self, keys: list) -> dict:
+        """
+        Aggregate the given buckets into the period summary get_statistics needs
+        """
+        buckets = [self.buckets[key] for key in keys]
+        rating_counts = {}
+        for bucket in buckets:
+            for rating, count in bucket['rating_counts'].items():
+                rating_counts[rating] = rating_counts.get(rating, 0) + count
+
+        longest = [bucket['longest'] for bucket in buckets if bucket['longest']]
+        shortest = [bucket['shortest'] for bucket in buckets if bucket['shortest']]
+
+        return {
+            'total_books': sum(bucket['count'] for bucket in buckets),
+            'total_pages': sum(bucket['page_sum'] for bucket in buckets),
+            'rating_sum': sum(bucket['rating_sum'] for bucket in buckets),
+            'rating_counts': dict(sorted(rating_counts.items())),
+            'first_read': min((bucket['first_read'] for bucket in buckets), default=None),
+            'last_read': max((bucket['last_read'] for bucket in buckets), default=None),
+            'longest': _longest(longest),
+            'shortest': _shortest(shortest),
+            'months': {
+                key: {
+                    'count': bucket['count'],
+                    'rating_sum': bucket['rating_sum'],
+                    'rating_counts': bucket['rating_counts']
+                }
+                for key, bucket in zip(keys, buckets)
+            }
+        }
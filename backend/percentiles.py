@@ -0,0 +1,316 @@
+import atexit
+import bisect
+import itertools
+import json
+import logging
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows, where workers don't coordinate their writes
+    fcntl = None
+
+from instrumentation import log_event
+
+# Per-metric sketches of every analyzed calendar year, shared by the workers of the host
+PERCENTILE_PATH = os.environ.get('PERCENTILE_PATH', os.path.join('cache', 'percentiles.json'))
+# How often (seconds) a worker merges its new observations into the shared file
+PERCENTILE_FLUSH_INTERVAL = 60
+# Below this many readers a percentile says nothing, none is reported
+PERCENTILE_MIN_POPULATION = 20
+# Centroids kept per sketch grow with the compression (about 2x), not with the readers
+SKETCH_COMPRESSION = 100
+SKETCH_BUFFER_SIZE = 500
+# Uploads (digest and year) a worker remembers having recorded, so re-analyzing one doesn't count it again
+RECORDED_READERS_MAX = 10000
+# Statistics readers are ranked on: section, field
+PERCENTILE_METRICS = {
+    'estimated_hours': 'Basic_Statistics',
+    'total_books': 'Basic_Statistics',
+    'total_pages': 'Basic_Statistics',
+    'average_rating': 'Rating_Statistics'
+}
+
+
+class TDigest:
+    """
+    Mergeable quantile sketch (merging t-digest) of a stream of values
+
+    Values are buffered and merged into weighted centroids, small ones near the tails and
+    larger ones in the middle, so memory and the cost of an update don't depend on how
+    many values were added. Two digests merge into one describing both streams.
+    """
+
+    def __init__(self, compression: float = SKETCH_COMPRESSION, centroids: Optional[List[List[float]]] = None,
+                 minimum: float = math.inf, maximum: float = -math.inf):
+        self.compression = compression
+        self.centroids = [tuple(centroid) for centroid in centroids or []]
+        self.minimum = minimum
+        self.maximum = maximum
+        self._buffer = []
+
+    @property
+    def count(self) -> float:
+        return sum(weight for _, weight in self.centroids) + sum(weight for _, weight in self._buffer)
+
+    def add(self, value: float, weight: float = 1):
+        self._buffer.append((value, weight))
+        self.minimum = min(self.minimum, value)
+        self.maximum = max(self.maximum, value)
+        if len(self._buffer) >= SKETCH_BUFFER_SIZE:
+            self._compress()
+
+    def merge(self, other: 'TDigest'):
+        self._buffer.extend(other.centroids)
+        self._buffer.extend(other._buffer)
+        self.minimum = min(self.minimum, other.minimum)
+        self.maximum = max(self.maximum, other.maximum)
+        self._compress()
+
+    def _k(self, q: float) -> float:
+        return self.compression / (2 * math.pi) * math.asin(2 * q - 1)
+
+    def _q_limit(self, q: float) -> float:
+        k = self._k(q) + 1
+        if k >= self.compression / 4:
+            return 1.0
+        return (math.sin(2 * math.pi * k / self.compression) + 1) / 2
+
+    def _compress(self):
+        if not self._buffer:
+            return
+        points = sorted(self.centroids + self._buffer)
+        self._buffer = []
+        total = sum(weight for _, weight in points)
+
+        merged = []
+        mean, weight = points[0]
+        done = 0.0
+        limit = self._q_limit(0.0)
+        for point_mean, point_weight in points[1:]:
+            if (done + weight + point_weight) / total <= limit:
+                weight += point_weight
+                mean += (point_mean - mean) * point_weight / weight
+            else:
+                merged.append((mean, weight))
+                done += weight
+                limit = self._q_limit(done / total)
+                mean, weight = point_mean, point_weight
+        merged.append((mean, weight))
+        self.centroids = merged
+
+    def cdf(self, value: float) -> Optional[float]:
+        """
+        Estimated share of the values below `value`, values equal to it count for half
+        """
+        self._compress()
+        if not self.centroids:
+            return None
+        if value < self.minimum:
+            return 0.0
+        if value > self.maximum:
+            return 1.0
+
+        # Cumulative weight at each distinct mean, half of a centroid lies on either side of it
+        means, ranks = [], []
+        if self.minimum < self.centroids[0][0]:
+            means.append(self.minimum)
+            ranks.append(0.0)
+        total = 0.0
+        for mean, group in itertools.groupby(self.centroids, key=lambda centroid: centroid[0]):
+            weight = sum(weight for _, weight in group)
+            means.append(mean)
+            ranks.append(total + weight / 2)
+            total += weight
+        if self.maximum > means[-1]:
+            means.append(self.maximum)
+            ranks.append(total)
+
+        i = bisect.bisect_left(means, value)
+        if i == len(means):
+            rank = total
+        elif means[i] == value or i == 0:
+            rank = ranks[i]
+        else:
+            rank = ranks[i - 1] + (ranks[i] - ranks[i - 1]) * (value - means[i - 1]) / (means[i] - means[i - 1])
+        return rank / total
+
+    def to_dict(self) -> dict:
+        self._compress()
+        return {
+            'min': self.minimum,
+            'max': self.maximum,
+            'centroids': [[round(mean, 6), weight] for mean, weight in self.centroids]
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'TDigest':
+        return cls(centroids=data['centroids'], minimum=data['min'], maximum=data['max'])
+
+
+class PopulationSketches:
+    """
+    Per-metric TDigests of the statistics of every analyzed year, without any per-reader row
+
+    Each worker adds its readers to a pending digest. Every flush_interval seconds the
+    pending digests are merged into the file at `path` under a file lock, and the merged
+    result, with every worker's readers, is loaded back. Readers are ranked against the
+    loaded digests plus this worker's pending ones.
+    """
+
+    def __init__(self, path: str = PERCENTILE_PATH, flush_interval: float = PERCENTILE_FLUSH_INTERVAL):
+        self.path = path
+        self.flush_interval = flush_interval
+        self._merged = {metric: TDigest() for metric in PERCENTILE_METRICS}
+        self._pending = {metric: TDigest() for metric in PERCENTILE_METRICS}
+        self._last_flush = None
+        self._recorded = OrderedDict()
+        self._lock = threading.Lock()
+
+    def record(self, values: Dict[str, float], key: Optional[str] = None):
+        """
+        Count one reader in; a key already recorded by this worker is skipped
+        """
+        with self._lock:
+            if key is not None:
+                if key in self._recorded:
+                    self._recorded.move_to_end(key)
+                    return
+                self._recorded[key] = None
+                if len(self._recorded) > RECORDED_READERS_MAX:
+                    self._recorded.popitem(last=False)
+            for metric, value in values.items():
+                self._pending[metric].add(value)
+            self._flush_if_due()
+
+    def percentiles(self, values: Dict[str, float]) -> Dict[str, Optional[float]]:
+        """
+        Percentile (0-100) of each value among the readers recorded so far, None while
+        there are fewer than PERCENTILE_MIN_POPULATION of them
+        """
+        with self._lock:
+            self._flush_if_due()
+            ranks = {}
+            for metric, value in values.items():
+                merged, pending = self._merged[metric], self._pending[metric]
+                population = merged.count + pending.count
+                if population < PERCENTILE_MIN_POPULATION:
+                    ranks[metric] = None
+                    continue
+                below = sum((digest.cdf(value) or 0.0) * digest.count for digest in (merged, pending))
+                ranks[metric] = round(100 * below / population, 1)
+            return ranks
+
+    def population(self) -> int:
+        with self._lock:
+            return int(self._merged['estimated_hours'].count + self._pending['estimated_hours'].count)
+
+    def _flush_if_due(self):
+        if self._last_flush is None or time.monotonic() - self._last_flush >= self.flush_interval:
+            self._flush()
+
+    def flush(self):
+        with self._lock:
+            self._flush()
+
+    def _flush(self):
+        self._last_flush = time.monotonic()
+        if not self.path:
+            return
+        try:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(f"{self.path}.lock", 'a') as lock:
+                if fcntl is not None:
+                    fcntl.flock(lock, fcntl.LOCK_EX)
+                merged = self._load()
+                if any(digest.centroids or digest._buffer for digest in self._pending.values()):
+                    for metric, digest in self._pending.items():
+                        merged[metric].merge(digest)
+                    self._save(merged)
+        except (OSError, ValueError) as e:
+            log_event('percentile_flush_failed', logging.WARNING, path=self.path, error=str(e))
+            return
+        self._merged = merged
+        self._pending = {metric: TDigest() for metric in PERCENTILE_METRICS}
+
+    def _load(self) -> Dict[str, TDigest]:
+        digests = {metric: TDigest() for metric in PERCENTILE_METRICS}
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                stored = json.load(f)
+            for metric, data in stored['metrics'].items():
+                if metric in digests:
+                    digests[metric] = TDigest.from_dict(data)
+        except FileNotFoundError:
+            pass
+        except (ValueError, KeyError, TypeError) as e:
+            # Unreadable file: start over rather than never recording again
+            log_event('percentile_file_reset', logging.WARNING, path=self.path, error=str(e))
+            digests = {metric: TDigest() for metric in PERCENTILE_METRICS}
+        return digests
+
+    def _save(self, digests: Dict[str, TDigest]):
+        # Written next to the file and renamed, readers never see a partial file
+        temporary = f"{self.path}.{os.getpid()}.tmp"
+        with open(temporary, 'w', encoding='utf-8') as f:
+            json.dump({'metrics': {metric: digest.to_dict() for metric, digest in digests.items()}}, f)
+        os.replace(temporary, self.path)
+
+
+population_sketches = PopulationSketches()
+atexit.register(population_sketches.flush)
+
+
+def _is_calendar_year(period: dict) -> bool:
+    start, end = period.get('start') or '', period.get('end') or ''
+    return start[4:] == '-01-01' and end[4:] == '-12-31' and start[:4] == end[:4]
+
+
+def _calendar_years(stats):
+    """
+    Calendar-year periods of a get_statistics (or get_statistics_for_years) result,
+    shorter periods aren't comparable
+    """
+    if not isinstance(stats, dict):
+        return
+    if 'Basic_Statistics' not in stats:
+        for period in stats.values():
+            yield from _calendar_years(period)
+    elif _is_calendar_year(stats['Time_Period']):
+        yield stats
+
+
+def _metric_values(period: dict) -> Dict[str, float]:
+    return {
+        metric: period[section][metric] for metric, section in PERCENTILE_METRICS.items()
+        if period[section][metric] is not None
+    }
+
+
+def add_percentiles(stats, sketches: PopulationSketches = population_sketches):
+    """
+    Rank the readers of every calendar year of a result against everyone analyzed
+    before, in a Percentiles section
+    """
+    for period in _calendar_years(stats):
+        period['Percentiles'] = {
+            **{metric: None for metric in PERCENTILE_METRICS},
+            **sketches.percentiles(_metric_values(period)),
+            'population': sketches.population()
+        }
+    return stats
+
+
+def record_readers(stats, digest: str, sketches: PopulationSketches = population_sketches):
+    """
+    Count the calendar years of a result into the population, once per upload (digest) and year
+    """
+    for period in _calendar_years(stats):
+        sketches.record(_metric_values(period), key=f"{digest}:{period['Time_Period']['start'][:4]}")
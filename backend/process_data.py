@@ -2,176 +2,1168 @@ import pandas as pd
 from datetime import datetime
 import numpy as np
 import re
-import json
-from typing import Dict,Optional
+import io
+import hashlib
+import logging
+from typing import Callable, Dict, Optional
 import time
 import requests
 import math
 import aiohttp
 import asyncio
+import concurrent.futures
+import atexit
+import contextvars
+import os
+import threading
 import ssl
 import urllib
+import weakref
+from collections import OrderedDict
+from functools import lru_cache, partial
+from cover_cache import get_cover_cache
+from monthly_index import MonthlyIndex
+from serialization import dumps
+from instrumentation import (
+    COVER_LOG_SAMPLE_RATE, cover_deadline_timeouts, log_event, provider_duration, provider_requests,
+    record_cache_lookup, sampled, span
+)
+from provider_health import ProviderRateLimited, parse_retry_after, provider_health
+
+# Cover fetching limits: books resolved at once, connections per provider host,
+# and the wall-clock budget for a whole batch (seconds)
+COVER_FETCH_CONCURRENCY = 20
+COVER_FETCH_PER_HOST = 8
+COVER_BATCH_DEADLINE = 30
+# 'waterfall' (one provider after another) or 'race' (all providers at once)
+COVER_LOOKUP_STRATEGY = os.environ.get('COVER_LOOKUP_STRATEGY', 'waterfall')
+# Shared cover session: idle connections are kept open this long, DNS answers cached this long (seconds)
+COVER_KEEPALIVE_TIMEOUT = 30
+COVER_DNS_CACHE_TTL = 300
+# Provider endpoints, overridable to point the cover lookups at a mock server
+GOOGLE_BOOKS_API = os.environ.get('GOOGLE_BOOKS_API', 'https://www.googleapis.com/books/v1')
+OPEN_LIBRARY_API = os.environ.get('OPEN_LIBRARY_API', 'https://openlibrary.org')
+OPEN_LIBRARY_COVERS = os.environ.get('OPEN_LIBRARY_COVERS', 'https://covers.openlibrary.org')
+# ISBNs per batched lookup: Google Books OR query (it returns at most 40 volumes) and
+# Open Library books API call
+GOOGLE_ISBN_BATCH_SIZE = 20
+OPEN_LIBRARY_ISBN_BATCH_SIZE = 50
+
+@lru_cache(maxsize=None)
+def _get_ssl_context() -> ssl.SSLContext:
+    """
+    Shared SSL context for all cover requests (building one is surprisingly expensive)
+    """
+    ssl_context = ssl.create_default_context()
+    ssl_context.check_hostname = False
+    ssl_context.verify_mode = ssl.CERT_NONE
+    return ssl_context
+
+# Smallest body we accept as a real cover, and how much of it we read to find out
+MIN_COVER_BYTES = 500
+VERIFIED_URL_MEMO_SIZE = 10000
+
+_verified_urls = OrderedDict()
+_verified_urls_lock = threading.Lock()
+
+def _remember_verified_url(url: str, valid: bool):
+    with _verified_urls_lock:
+        _verified_urls[url] = valid
+        _verified_urls.move_to_end(url)
+        while len(_verified_urls) > VERIFIED_URL_MEMO_SIZE:
+            _verified_urls.popitem(last=False)
+
+def _image_size_from_headers(headers) -> Optional[int]:
+    """
+    Full image size from Content-Range ("bytes 0-1023/12345") or Content-Length
+    """
+    content_range = headers.get('content-range', '')
+    if '/' in content_range:
+        total = content_range.rsplit('/', 1)[1]
+        if total.isdigit():
+            return int(total)
+    content_length = headers.get('content-length')
+    if content_length and content_length.isdigit():
+        return int(content_length)
+    return None
 
 async def check_image_size(url: str, session: aiohttp.ClientSession, ssl_context) -> bool:
     """
-    Check if an image URL returns a valid-sized image
+    Check if an image URL returns a valid-sized image without downloading it
+    Only the first MIN_COVER_BYTES bytes are ever requested. Results are memoized per process,
+    so a URL verified for one request is not probed again by the next.
     """
+    with _verified_urls_lock:
+        if url in _verified_urls:
+            _verified_urls.move_to_end(url)
+            return _verified_urls[url]
+
+    probe_url = url
+    if url.startswith(OPEN_LIBRARY_COVERS):
+        # Open Library answers 404 instead of a blank placeholder image when asked to
+        probe_url += ('&' if '?' in url else '?') + 'default=false'
+
     try:
-        # Use GET for Open Library, HEAD for others
-        if 'openlibrary.org' in url:
-            async with session.get(url, timeout=5, ssl=ssl_context) as response:
-                if response.status == 200:
-                    content = await response.read()
-                    return len(content) > 500  # Reduced minimum size
-        else:
-            async with session.head(url, timeout=5, ssl=ssl_context) as response:
-                if response.status == 200:
-                    content_length = int(response.headers.get('content-length', 0))
-                    return content_length > 500  # Reduced minimum size
+        headers = {'Range': f'bytes=0-{MIN_COVER_BYTES}'}
+        async with session.get(probe_url, timeout=5, ssl=ssl_context, headers=headers) as response:
+            _check_provider_status(response)
+            if response.status not in (200, 206):
+                valid = False
+            else:
+                size = _image_size_from_headers(response.headers)
+                if size is None:
+                    # Neither header is there, count what the server actually sends
+                    size = len(await response.content.read(MIN_COVER_BYTES + 1))
+                valid = size > MIN_COVER_BYTES
+    except (ProviderRateLimited, aiohttp.ClientResponseError, asyncio.TimeoutError):
+        # The provider is unwell rather than the cover missing: not memoized, and counted
+        # against the provider by the lookup that asked
+        raise
     except Exception as e:
-        print(f"Error checking image size for {url}: {str(e)}")
-        print(f"Full error details: {type(e).__name__}")
+        if sampled(COVER_LOG_SAMPLE_RATE):
+            log_event('cover_check_failed', url=url, error=str(e), error_type=type(e).__name__)
         return False
 
-async def get_book_cover_async(isbn: str, title: str, author: str, session: aiohttp.ClientSession) -> Optional[str]:
+    _remember_verified_url(url, valid)
+    return valid
+
+def _check_provider_status(response: aiohttp.ClientResponse):
+    """
+    Raise ProviderRateLimited for a 429 (with its Retry-After) and ClientResponseError for a 5xx,
+    so they count as provider failures instead of books without a cover
+    """
+    if response.status == 429:
+        raise ProviderRateLimited(parse_retry_after(response.headers.get('Retry-After')))
+    if response.status >= 500:
+        response.raise_for_status()
+
+def _normalize_isbn(isbn) -> Optional[str]:
+    """
+    Strip Goodreads export quirks (="..." wrapping, dashes, spaces) from an ISBN
+    Returns None if nothing usable is left
+    """
+    if not isbn or pd.isna(isbn) or isbn == '=""':
+        return None
+    isbn = str(isbn).strip().replace('="', '').replace('"', '').replace('-', '').replace(' ', '')
+    return isbn or None
+
+def _cover_cache_keys(book: dict) -> list[str]:
+    """
+    Build the cover cache keys for a book: normalized ISBN and normalized title + author
+    """
+    keys = []
+    isbn = _normalize_isbn(book.get('isbn'))
+    if isbn:
+        keys.append(f"isbn:{isbn}")
+    title = book.get('title')
+    if title and not pd.isna(title):
+        author = book.get('author')
+        author = str(author) if author and not pd.isna(author) else ''
+        normalized = ' '.join(f"{title}__{author}".lower().split())
+        keys.append(f"title:{normalized}")
+    return keys
+
+class ProviderStats:
+    """
+    Per-provider success rate and latency, logged with every batch summary
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats = {}
+
+    def record(self, provider: str, outcome: str, latency: float):
+        """
+        Record one lookup; outcome is 'success', 'miss', 'error', 'timeout' or 'rate_limited'
+        Lookups are also counted in the /metrics provider counters and latency histogram
+        """
+        with self._lock:
+            entry = self._stats.setdefault(
+                provider, {'success': 0, 'miss': 0, 'error': 0, 'timeout': 0, 'rate_limited': 0, 'total_latency': 0.0}
+            )
+            entry[outcome] += 1
+            entry['total_latency'] += latency
+        provider_requests.inc(provider=provider, outcome=outcome)
+        provider_duration.observe(latency, provider=provider)
+
+    def snapshot(self) -> Dict[str, dict]:
+        with self._lock:
+            summary = {}
+            for provider, entry in self._stats.items():
+                attempts = entry['success'] + entry['miss'] + entry['error'] + entry['timeout'] + entry['rate_limited']
+                summary[provider] = {
+                    'attempts': attempts,
+                    'successes': entry['success'],
+                    'errors': entry['error'],
+                    'timeouts': entry['timeout'],
+                    'rate_limited': entry['rate_limited'],
+                    'success_rate': entry['success'] / attempts if attempts else 0.0,
+                    'average_latency': entry['total_latency'] / attempts if attempts else 0.0
+                }
+            return summary
+
+provider_stats = ProviderStats()
+
+def _record_lookup(provider: str, outcome: str, latency: float, retry_after: Optional[float] = None):
+    provider_stats.record(provider, outcome, latency)
+    provider_health.record(provider, outcome, latency, retry_after)
+
+def _failure_outcome(error: Exception) -> str:
+    if isinstance(error, ProviderRateLimited):
+        return 'rate_limited'
+    return 'timeout' if isinstance(error, asyncio.TimeoutError) else 'error'
+
+async def _google_books_search(query: str, session: aiohttp.ClientSession, ssl_context) -> Optional[str]:
+    google_url = f"{GOOGLE_BOOKS_API}/volumes?q={query}&fields=items(volumeInfo(imageLinks))"
+    async with session.get(google_url, timeout=5, ssl=ssl_context) as response:
+        _check_provider_status(response)
+        if response.status == 200:
+            data = await response.json()
+            if data.get('items'):
+                image_links = data['items'][0].get('volumeInfo', {}).get('imageLinks', {})
+                # Google only lists image links it can serve, no need to probe them
+                for size in ['thumbnail', 'smallThumbnail']:
+                    if size in image_links:
+                        return image_links[size].replace('http://', 'https://')
+    return None
+
+async def _google_isbn_cover(isbn, title, author, session, ssl_context) -> Optional[str]:
+    return await _google_books_search(f"isbn:{isbn}", session, ssl_context)
+
+async def _openlibrary_isbn_cover(isbn, title, author, session, ssl_context) -> Optional[str]:
+    openlibrary_url = f"{OPEN_LIBRARY_COVERS}/b/isbn/{isbn}-M.jpg"
+    if await check_image_size(openlibrary_url, session, ssl_context):
+        return openlibrary_url
+    return None
+
+async def _google_title_cover(isbn, title, author, session, ssl_context) -> Optional[str]:
+    search_query = f"{title} {author}".strip()
+    return await _google_books_search(urllib.parse.quote(search_query), session, ssl_context)
+
+async def _openlibrary_title_cover(isbn, title, author, session, ssl_context) -> Optional[str]:
+    encoded_title = urllib.parse.quote(title)
+    openlibrary_search_url = f"{OPEN_LIBRARY_API}/search.json?title={encoded_title}&fields=cover_i"
+    async with session.get(openlibrary_search_url, timeout=5, ssl=ssl_context) as response:
+        _check_provider_status(response)
+        if response.status == 200:
+            data = await response.json()
+            if data.get('docs') and len(data['docs']) > 0 and data['docs'][0].get('cover_i'):
+                cover_id = data['docs'][0]['cover_i']
+                img_url = f"{OPEN_LIBRARY_COVERS}/b/id/{cover_id}-M.jpg"
+                if await check_image_size(img_url, session, ssl_context):
+                    return img_url
+    return None
+
+# Cover providers in priority order: (name, lookup, needs an ISBN)
+COVER_PROVIDERS = [
+    ('google_isbn', _google_isbn_cover, True),
+    ('openlibrary_isbn', _openlibrary_isbn_cover, True),
+    ('google_title', _google_title_cover, False),
+    ('openlibrary_title', _openlibrary_title_cover, False),
+]
+
+async def _run_provider(name: str, lookup, isbn, title, author, session, ssl_context) -> Optional[str]:
+    """
+    Run a single provider lookup, recording its outcome and latency
+    """
+    start = time.perf_counter()
+    try:
+        result = await lookup(isbn, title, author, session, ssl_context)
+    except asyncio.CancelledError:
+        raise
+    except Exception as e:
+        outcome = _failure_outcome(e)
+        _record_lookup(name, outcome, time.perf_counter() - start, getattr(e, 'retry_after', None))
+        if sampled(COVER_LOG_SAMPLE_RATE):
+            log_event('cover_provider_failed', provider=name, outcome=outcome, title=title, isbn=isbn, error=str(e))
+        return None
+    _record_lookup(name, 'success' if result else 'miss', time.perf_counter() - start)
+    return result
+
+# Provider HTTP requests made by the current get_covers_batch call, counted by a session trace
+_batch_request_count = contextvars.ContextVar('cover_batch_request_count', default=None)
+
+async def _count_request(session, context, params):
+    counter = _batch_request_count.get()
+    if counter is not None:
+        counter[0] += 1
+
+def _request_count_trace() -> aiohttp.TraceConfig:
+    trace_config = aiohttp.TraceConfig()
+    trace_config.on_request_start.append(_count_request)
+    return trace_config
+
+async def _google_isbn_batch(isbns: list[str], session: aiohttp.ClientSession, ssl_context) -> Dict[str, str]:
+    """
+    Covers for several ISBNs from one OR-combined Google Books query
+    Volumes are matched back to the requested ISBNs through their industry identifiers
+    """
+    query = urllib.parse.quote(' OR '.join(f"isbn:{isbn}" for isbn in isbns))
+    google_url = (f"{GOOGLE_BOOKS_API}/volumes?q={query}&maxResults=40"
+                  f"&fields=items(volumeInfo(industryIdentifiers,imageLinks))")
+    covers = {}
+    async with session.get(google_url, timeout=5, ssl=ssl_context) as response:
+        _check_provider_status(response)
+        response.raise_for_status()
+        data = await response.json()
+    wanted = set(isbns)
+    for item in data.get('items') or []:
+        volume = item.get('volumeInfo', {})
+        image_links = volume.get('imageLinks', {})
+        image = image_links.get('thumbnail') or image_links.get('smallThumbnail')
+        if not image:
+            continue
+        for identifier in volume.get('industryIdentifiers', []):
+            isbn = identifier.get('identifier')
+            if isbn in wanted and isbn not in covers:
+                covers[isbn] = image.replace('http://', 'https://')
+    return covers
+
+async def _openlibrary_isbn_batch(isbns: list[str], session: aiohttp.ClientSession, ssl_context) -> Dict[str, str]:
+    """
+    Covers for several ISBNs from one Open Library books API call
+    The API only lists a thumbnail for books that have a cover, so nothing is probed
+    """
+    bibkeys = ','.join(f"ISBN:{isbn}" for isbn in isbns)
+    openlibrary_url = f"{OPEN_LIBRARY_API}/api/books?bibkeys={bibkeys}&format=json"
+    covers = {}
+    async with session.get(openlibrary_url, timeout=5, ssl=ssl_context) as response:
+        _check_provider_status(response)
+        response.raise_for_status()
+        data = await response.json(content_type=None)
+    for isbn in isbns:
+        thumbnail = (data.get(f"ISBN:{isbn}") or {}).get('thumbnail_url')
+        if thumbnail:
+            covers[isbn] = thumbnail.replace('-S.jpg', '-M.jpg').replace('http://', 'https://')
+    return covers
+
+async def _run_batch_provider(name: str, lookup, isbns: list[str], session, ssl_context) -> Optional[Dict[str, str]]:
+    """
+    Run one batched lookup, recording it in provider_stats. Returns None if the request failed
+    or the provider's circuit is open
+    """
+    if not provider_health.allow(name):
+        return None
+    start = time.perf_counter()
+    try:
+        covers = await lookup(isbns, session, ssl_context)
+    except asyncio.CancelledError:
+        raise
+    except Exception as e:
+        outcome = _failure_outcome(e)
+        _record_lookup(name, outcome, time.perf_counter() - start, getattr(e, 'retry_after', None))
+        # One batched request stands for many books, its failures are always logged
+        log_event('cover_provider_failed', provider=name, outcome=outcome, isbns=len(isbns), error=str(e))
+        return None
+    _record_lookup(name, 'success' if covers else 'miss', time.perf_counter() - start)
+    return covers
+
+class IsbnBatchLookup:
+    """
+    Batching stage in front of the per-book cover lookups
+
+    The ISBNs of a batch are grouped into Google Books OR queries, the ones Google has no
+    cover for go to Open Library's books API in one call per group. Each book then awaits
+    its group's answer. An ISBN counts as answered when both providers were asked
+    successfully, so its book only needs the title searches; ISBNs whose requests failed
+    are left to the full per-book lookup.
+    """
+
+    def __init__(self, isbns: list[str], session: aiohttp.ClientSession, ssl_context,
+                 google_batch_size: int = GOOGLE_ISBN_BATCH_SIZE,
+                 openlibrary_batch_size: int = OPEN_LIBRARY_ISBN_BATCH_SIZE):
+        self.session = session
+        self.ssl_context = ssl_context
+        self.openlibrary_batch_size = openlibrary_batch_size
+        self._groups = {}
+        unique_isbns = list(dict.fromkeys(isbn for isbn in isbns if isbn))
+        for start in range(0, len(unique_isbns), google_batch_size):
+            group = unique_isbns[start:start + google_batch_size]
+            task = asyncio.ensure_future(self._resolve_group(group))
+            for isbn in group:
+                self._groups[isbn] = task
+
+    async def _resolve_group(self, isbns: list[str]) -> Dict[str, Optional[str]]:
+        google = await _run_batch_provider('google_isbn_batch', _google_isbn_batch, isbns, self.session, self.ssl_context)
+        answers = dict(google or {})
+        remaining = [isbn for isbn in isbns if isbn not in answers]
+        for start in range(0, len(remaining), self.openlibrary_batch_size):
+            group = remaining[start:start + self.openlibrary_batch_size]
+            openlibrary = await _run_batch_provider(
+                'openlibrary_isbn_batch', _openlibrary_isbn_batch, group, self.session, self.ssl_context
+            )
+            if openlibrary is None:
+                continue
+            answers.update(openlibrary)
+            if google is not None:
+                for isbn in group:
+                    answers.setdefault(isbn, None)
+        return answers
+
+    async def cover_for(self, isbn: Optional[str]) -> tuple[Optional[str], bool]:
+        """
+        (cover URL or None, whether both ISBN providers answered for this ISBN)
+        """
+        task = self._groups.get(isbn)
+        if task is None:
+            return None, False
+        # Shielded: a book hitting the deadline must not cancel the lookup other books share
+        answers = await asyncio.shield(task)
+        return answers.get(isbn), isbn in answers
+
+    async def cancel(self):
+        pending = [task for task in set(self._groups.values()) if not task.done()]
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+
+class ProvidersUnavailable(Exception):
+    """
+    No cover was found, but providers were skipped because their circuit is open; the book
+    is not cached as having no cover, so it is looked up again once they are back
+    """
+
+async def get_book_cover_async(isbn: str, title: str, author: str, session: aiohttp.ClientSession,
+                               ssl_context: Optional[ssl.SSLContext] = None,
+                               strategy: str = COVER_LOOKUP_STRATEGY,
+                               skip_isbn_providers: bool = False) -> Optional[str]:
     """
     Asynchronously retrieve book cover URL, with better ISBN validation
+
+    strategy='waterfall' tries each provider in COVER_PROVIDERS order until one finds a cover,
+    except that a provider much faster than the one before it goes first (ISBN lookups
+    always come before title searches, see ProviderHealth.ordered).
+    strategy='race' starts every provider at once and returns the first valid result in
+    priority order, cancelling the lookups that are no longer needed.
+    Providers whose circuit is open are skipped; if no other provider has a cover,
+    ProvidersUnavailable is raised.
+    skip_isbn_providers leaves out the ISBN lookups, for books IsbnBatchLookup already answered.
     """
-    ssl_context = ssl.create_default_context()
-    ssl_context.check_hostname = False
-    ssl_context.verify_mode = ssl.CERT_NONE
-    
+    if ssl_context is None:
+        ssl_context = _get_ssl_context()
+
     # Better ISBN validation - check for actual ISBN content
-    if isbn and not pd.isna(isbn) and isbn != '=""':
-        isbn = str(isbn).strip().replace('="', '').replace('"', '').replace('-', '').replace(' ', '')
-        if isbn:  # Make sure we still have content after cleaning
-            # Try Google Books API with ISBN
-            try:
-                google_url = f"https://www.googleapis.com/books/v1/volumes?q=isbn:{isbn}&fields=items(volumeInfo(imageLinks))"
-                async with session.get(google_url, timeout=5, ssl=ssl_context) as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        if data.get('items'):
-                            image_links = data['items'][0].get('volumeInfo', {}).get('imageLinks', {})
-                            for size in ['thumbnail', 'smallThumbnail']:
-                                if size in image_links:
-                                    img_url = image_links[size].replace('http://', 'https://')
-                                    if await check_image_size(img_url, session, ssl_context):
-                                        return img_url
-            except Exception as e:
-                print(f"Google Books error for ISBN {isbn}: {str(e)}")
-            
-            # Try Open Library API with ISBN
-            openlibrary_url = f"https://covers.openlibrary.org/b/isbn/{isbn}-M.jpg"
-            if await check_image_size(openlibrary_url, session, ssl_context):
-                return openlibrary_url
-    
-    # If no valid ISBN or no cover found, try title + author search
-    if title and not pd.isna(title):
+    isbn = _normalize_isbn(isbn)
+    has_title = bool(title) and not pd.isna(title)
+    if has_title:
         title = title.strip()
         author = str(author).strip() if author and not pd.isna(author) else ""
-        search_query = f"{title} {author}".strip()
-        
-        try:
-            google_url = f"https://www.googleapis.com/books/v1/volumes?q={urllib.parse.quote(search_query)}&fields=items(volumeInfo(imageLinks))"
-            async with session.get(google_url, timeout=5, ssl=ssl_context) as response:
-                if response.status == 200:
-                    data = await response.json()
-                    if data.get('items'):
-                        image_links = data['items'][0].get('volumeInfo', {}).get('imageLinks', {})
-                        for size in ['thumbnail', 'smallThumbnail']:
-                            if size in image_links:
-                                img_url = image_links[size].replace('http://', 'https://')
-                                if await check_image_size(img_url, session, ssl_context):
-                                    return img_url
-        except Exception as e:
-            print(f"Google Books error for title search '{search_query}': {str(e)}")
-        
-        # Try Open Library with title search as last resort
+
+    # Title searches are the fallback for books without a valid ISBN
+    isbn_providers = [
+        (name, lookup) for name, lookup, needs_isbn in COVER_PROVIDERS if needs_isbn and isbn and not skip_isbn_providers
+    ]
+    title_providers = [(name, lookup) for name, lookup, needs_isbn in COVER_PROVIDERS if not needs_isbn and has_title]
+    if strategy == 'waterfall':
+        providers = provider_health.ordered(isbn_providers) + provider_health.ordered(title_providers)
+    elif strategy == 'race':
+        providers = isbn_providers + title_providers
+    else:
+        raise ValueError(f"Unknown cover lookup strategy: {strategy}")
+
+    skipped = []
+    if strategy == 'race':
+        tasks = []
+        for name, lookup in providers:
+            if not provider_health.allow(name):
+                skipped.append(name)
+                continue
+            tasks.append(asyncio.ensure_future(_run_provider(name, lookup, isbn, title, author, session, ssl_context)))
         try:
-            encoded_title = urllib.parse.quote(title)
-            openlibrary_search_url = f"https://openlibrary.org/search.json?title={encoded_title}&fields=cover_i"
-            async with session.get(openlibrary_search_url, timeout=5, ssl=ssl_context) as response:
-                if response.status == 200:
-                    data = await response.json()
-                    if data.get('docs') and len(data['docs']) > 0 and data['docs'][0].get('cover_i'):
-                        cover_id = data['docs'][0]['cover_i']
-                        img_url = f"https://covers.openlibrary.org/b/id/{cover_id}-M.jpg"
-                        if await check_image_size(img_url, session, ssl_context):
-                            return img_url
-        except Exception as e:
-            print(f"Open Library error for title search '{title}': {str(e)}")
-    
+            for task in tasks:
+                result = await task
+                if result:
+                    return result
+        finally:
+            pending = [task for task in tasks if not task.done()]
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+    else:
+        for name, lookup in providers:
+            # Asked right before each lookup, a half-open circuit's probe goes to the lookup that uses it
+            if not provider_health.allow(name):
+                skipped.append(name)
+                continue
+            result = await _run_provider(name, lookup, isbn, title, author, session, ssl_context)
+            if result:
+                return result
+
+    if skipped:
+        raise ProvidersUnavailable(f"skipped {', '.join(skipped)}")
     return None
 
-async def get_covers_batch(books: list[dict]) -> Dict[str, Optional[str]]:
+def _lookup_key(cache_keys: list[str], book_id: str) -> str:
+    """
+    Key identifying the same book across lookups: its normalized ISBN, else title + author
+    """
+    return cache_keys[0] if cache_keys else f"book:{book_id}"
+
+class InFlightLookups:
+    """
+    Cover lookups currently running, per event loop, keyed by _lookup_key
+
+    With CoverResolver every batch of the process runs on the same loop, so concurrent
+    requests for the same book share one lookup and each book hits the network at most
+    once at a time. Finished lookups remove themselves.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._by_loop = weakref.WeakKeyDictionary()
+
+    def _lookups(self) -> dict:
+        with self._lock:
+            return self._by_loop.setdefault(asyncio.get_running_loop(), {})
+
+    def get(self, key: str) -> Optional[asyncio.Future]:
+        return self._lookups().get(key)
+
+    def add(self, key: str, task: asyncio.Future):
+        lookups = self._lookups()
+        lookups[key] = task
+
+        def forget(done_task):
+            if lookups.get(key) is done_task:
+                del lookups[key]
+        task.add_done_callback(forget)
+
+in_flight_lookups = InFlightLookups()
+
+async def _follow_lookup(in_flight: asyncio.Future, lookup) -> Optional[str]:
+    """
+    Wait for another batch's lookup; giving up (deadline) doesn't cancel it for its owner
+    If the owner cancels it (its own deadline), run lookup() instead
+    """
+    try:
+        return await asyncio.shield(in_flight)
+    except asyncio.CancelledError:
+        if not in_flight.cancelled():
+            raise
+    return await lookup()
+
+async def get_covers_batch(books: list[dict], cache=None,
+                           concurrency: int = COVER_FETCH_CONCURRENCY,
+                           per_host_limit: int = COVER_FETCH_PER_HOST,
+                           deadline: Optional[float] = COVER_BATCH_DEADLINE,
+                           strategy: str = COVER_LOOKUP_STRATEGY,
+                           on_cover: Optional[Callable[[str, Optional[str]], None]] = None,
+                           session: Optional[aiohttp.ClientSession] = None,
+                           batch_isbns: bool = True) -> Dict[str, Optional[str]]:
     """
     Fetch multiple book covers concurrently and log results
+    Books already in the cover cache are answered from it, only cache misses go to the network.
+    At most `concurrency` books are resolved at once over one shared connector capped at
+    `per_host_limit` connections per host. Books still unresolved after `deadline` seconds
+    get a cover_url of None.
+    If given, on_cover(book_id, cover_url) is called as soon as each book is resolved.
+    Books with the same ISBN (or title + author when there is none) share a single lookup,
+    also with concurrent batches on the same event loop (see InFlightLookups).
+    A session (see CoverResolver) is used as is, otherwise one is opened for this batch.
+    With batch_isbns, ISBNs are first looked up many at a time (see IsbnBatchLookup) and
+    only the books left without a cover get per-book lookups.
     Returns a dictionary with book identifier (title + author) as key
     """
-    ssl_context = ssl.create_default_context()
-    ssl_context.check_hostname = False
-    ssl_context.verify_mode = ssl.CERT_NONE
+    # The cache is SQLite: opening it, reading and writing run on the loop's executor, a slow
+    # disk or a locked database must not stall the other batches on a shared loop (see CoverResolver)
+    loop = asyncio.get_running_loop()
+    if cache is None:
+        cache = await loop.run_in_executor(None, get_cover_cache)
+
+    valid_books = []
+    for book in books:
+        if book and (book.get('isbn') or book.get('title')):
+            valid_books.append(book)
+        elif sampled(COVER_LOG_SAMPLE_RATE):
+            log_event('cover_book_skipped', reason='missing both ISBN and title')
+
+    # Create a unique identifier using title and author
+    book_ids = [f"{book.get('title', '')}__{book.get('author', '')}" for book in valid_books]
+    book_keys = [_cover_cache_keys(book) for book in valid_books]
+    cached = {}
+    if cache:
+        cached = await loop.run_in_executor(None, cache.get_many, [key for keys in book_keys for key in keys])
+
+    results = [None] * len(valid_books)
+    from_cache = [False] * len(valid_books)
+    to_fetch = []
+    for i, keys in enumerate(book_keys):
+        hits = [cached[key] for key in keys if cached.get(key)]
+        if hits:
+            results[i] = hits[0]
+            from_cache[i] = True
+        elif keys and all(key in cached for key in keys):
+            # Every key is a cached "no cover found"
+            from_cache[i] = True
+        else:
+            to_fetch.append(i)
+            continue
+        if on_cover:
+            on_cover(book_ids[i], results[i])
+
+    timed_out = 0
+    request_count = [0]
+    shared_in_batch = shared_in_flight = 0
+    if to_fetch:
+        ssl_context = _get_ssl_context()
+        semaphore = asyncio.Semaphore(concurrency)
+        counter_token = _batch_request_count.set(request_count)
+
+        own_session = session is None
+        if own_session:
+            conn = aiohttp.TCPConnector(ssl=ssl_context, limit=concurrency, limit_per_host=per_host_limit)
+            session = aiohttp.ClientSession(connector=conn, trace_configs=[_request_count_trace()])
+        # One lookup per distinct book; books already being looked up by another batch on this
+        # loop wait for that lookup instead of starting their own
+        groups = OrderedDict()
+        for i in to_fetch:
+            groups.setdefault(_lookup_key(book_keys[i], book_ids[i]), []).append(i)
+        shared_in_batch = len(to_fetch) - len(groups)
+        following = {key: in_flight_lookups.get(key) for key in groups}
+        following = {key: in_flight for key, in_flight in following.items() if in_flight is not None}
+        leading = [key for key in groups if key not in following]
+        shared_in_flight = sum(len(groups[key]) for key in following)
+
+        batch_lookup = None
+        try:
+            if batch_isbns:
+                batch_lookup = IsbnBatchLookup(
+                    [_normalize_isbn(valid_books[groups[key][0]].get('isbn')) for key in leading], session, ssl_context
+                )
+
+            async def fetch(i):
+                result, isbn_answered = None, False
+                if batch_lookup:
+                    result, isbn_answered = await batch_lookup.cover_for(_normalize_isbn(valid_books[i].get('isbn')))
+                if result is None:
+                    async with semaphore:
+                        result = await get_book_cover_async(
+                            isbn=valid_books[i].get('isbn'),
+                            title=valid_books[i].get('title'),
+                            author=valid_books[i].get('author'),
+                            session=session,
+                            ssl_context=ssl_context,
+                            strategy=strategy,
+                            skip_isbn_providers=isbn_answered
+                        )
+                return result
+
+            lookups = {}
+            for key in groups:
+                if key in following:
+                    lookups[key] = asyncio.ensure_future(
+                        _follow_lookup(following[key], partial(fetch, groups[key][0]))
+                    )
+                else:
+                    lookups[key] = asyncio.ensure_future(fetch(groups[key][0]))
+                    in_flight_lookups.add(key, lookups[key])
+
+            def notify(key, task):
+                if on_cover and not task.cancelled() and task.exception() is None:
+                    for i in groups[key]:
+                        on_cover(book_ids[i], task.result())
+
+            for key, task in lookups.items():
+                task.add_done_callback(partial(notify, key))
+
+            done, pending = await asyncio.wait(lookups.values(), timeout=deadline)
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+        finally:
+            if batch_lookup:
+                await batch_lookup.cancel()
+            if own_session:
+                await session.close()
+            _batch_request_count.reset(counter_token)
+
+        new_entries = {}
+        for key, task in lookups.items():
+            for i in groups[key]:
+                if task in pending:
+                    results[i] = asyncio.TimeoutError("cover batch deadline exceeded")
+                    timed_out += 1
+                elif task.exception() is not None:
+                    results[i] = task.exception()
+                else:
+                    results[i] = task.result()
+                    # Errors and timeouts are transient, only cache completed lookups
+                    for cache_key in book_keys[i]:
+                        new_entries[cache_key] = results[i]
+                    continue
+                if on_cover:
+                    on_cover(book_ids[i], None)
+        if cache:
+            await loop.run_in_executor(None, cache.set_many, new_entries)
+
+    cover_urls = {}
+    successful = 0
+    failed = 0
+
+    for book, book_id, result, was_cached in zip(valid_books, book_ids, results, from_cache):
+        if isinstance(result, Exception):
+            outcome = 'error'
+            cover_urls[book_id] = None
+            failed += 1
+        elif result is None:
+            outcome = 'not_found'
+            cover_urls[book_id] = None
+            failed += 1
+        else:
+            outcome = 'found'
+            cover_urls[book_id] = result
+            successful += 1
+
+        # Per-book events are sampled, the summary below covers every book
+        if sampled(COVER_LOG_SAMPLE_RATE):
+            log_event('cover_result', outcome=outcome, title=book.get('title'), isbn=book.get('isbn'),
+                      cached=was_cached, cover_url=result if outcome == 'found' else None,
+                      error=str(result) if outcome == 'error' else None)
+
+    record_cache_lookup('cover', hits=sum(from_cache), misses=len(to_fetch))
+    cover_deadline_timeouts.inc(timed_out)
+
+    log_event(
+        'cover_batch_summary',
+        books=len(valid_books),
+        found=successful,
+        failed=failed,
+        cache_hits=sum(from_cache),
+        cache_misses=len(to_fetch),
+        deadline_timeouts=timed_out,
+        provider_requests=request_count[0],
+        shared_in_batch=shared_in_batch,
+        shared_in_flight=shared_in_flight,
+        providers={
+            provider: {'attempts': entry['attempts'], 'success_rate': round(entry['success_rate'], 3),
+                       'average_latency': round(entry['average_latency'], 4)}
+            for provider, entry in provider_stats.snapshot().items()
+        },
+        circuits={
+            service: {'state': circuit['state'], 'retry_in': round(circuit['retry_in'], 1)}
+            for service, circuit in provider_health.snapshot().items() if circuit['state'] != 'closed'
+        }
+    )
+
+    return cover_urls
+
+
+class CoverResolver:
+    """
+    Long-lived cover resolution service, one per worker process
+
+    A background thread runs an event loop that owns a pooled aiohttp session with keep-alive
+    and DNS caching, so connections and their TLS handshakes to the providers are reused from
+    one request to the next instead of being set up again by every asyncio.run().
+    Synchronous callers submit batches with resolve() and wait for the result.
+    """
+
+    def __init__(self, concurrency: int = COVER_FETCH_CONCURRENCY, per_host_limit: int = COVER_FETCH_PER_HOST,
+                 keepalive_timeout: float = COVER_KEEPALIVE_TIMEOUT, dns_cache_ttl: int = COVER_DNS_CACHE_TTL):
+        self.concurrency = concurrency
+        self.per_host_limit = per_host_limit
+        self.keepalive_timeout = keepalive_timeout
+        self.dns_cache_ttl = dns_cache_ttl
+        self._lock = threading.Lock()
+        self._loop = None
+        self._thread = None
+        self._session = None
+        self._pid = None
+
+    def _get_loop(self) -> asyncio.AbstractEventLoop:
+        """
+        Start the loop thread on first use, and again in a process forked after it started
+        """
+        with self._lock:
+            if self._loop is None or self._pid != os.getpid():
+                self._loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(target=self._loop.run_forever, name='cover-resolver', daemon=True)
+                self._thread.start()
+                self._session = None
+                self._pid = os.getpid()
+            return self._loop
+
+    async def _get_session(self) -> aiohttp.ClientSession:
+        # Only ever called on the loop thread
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                ssl=_get_ssl_context(),
+                limit=self.concurrency,
+                limit_per_host=self.per_host_limit,
+                ttl_dns_cache=self.dns_cache_ttl,
+                keepalive_timeout=self.keepalive_timeout
+            )
+            self._session = aiohttp.ClientSession(connector=connector, trace_configs=[_request_count_trace()])
+        return self._session
+
+    async def _resolve(self, books: list[dict], options: dict) -> Dict[str, Optional[str]]:
+        return await get_covers_batch(books, session=await self._get_session(), **options)
+
+    def submit(self, books: list[dict], **options) -> concurrent.futures.Future:
+        """
+        Start resolving a batch of covers on the shared session without waiting for it
+        Takes the same options as get_covers_batch, the future's result is its return value
+        """
+        return asyncio.run_coroutine_threadsafe(self._resolve(books, options), self._get_loop())
+
+    def resolve(self, books: list[dict], **options) -> Dict[str, Optional[str]]:
+        """
+        Resolve a batch of covers on the shared session, blocking until it is done
+        Takes the same options as get_covers_batch
+        """
+        return self.submit(books, **options).result()
+
+    def close(self):
+        """
+        Close the session and stop the loop thread, the next resolve() starts them again
+        """
+        with self._lock:
+            loop, thread, session = self._loop, self._thread, self._session
+            self._loop = self._thread = self._session = None
+        if loop is None:
+            return
+        if session is not None:
+            asyncio.run_coroutine_threadsafe(session.close(), loop).result()
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join()
+        loop.close()
+
+cover_resolver = CoverResolver()
+atexit.register(cover_resolver.close)
+
+
+# Swear words and their censored versions (matched case insensitively)
+SWEAR_WORDS = {
+    'fuck': 'fu@@',
+    'fucking': 'fu@@ing',
+    'shit': 'sh!t',
+    'damn': 'd@mn',
+    'ass': '@ss'
+}
+REVIEW_MAX_LENGTH = 500
+# Column holding the cleaned review once a period has been prepared for the stats
+CLEAN_REVIEW_COLUMN = '_clean_review'
+
+class ReviewSanitizer:
+    """
+    Truncate reviews and censor a configurable word list with one compiled regex
+    """
+
+    def __init__(self, swear_words: Optional[Dict[str, str]] = None, max_length: int = REVIEW_MAX_LENGTH):
+        swear_words = SWEAR_WORDS if swear_words is None else swear_words
+        self.max_length = max_length
+        self._replacements = {word.lower(): replacement for word, replacement in swear_words.items() if word}
+        self._pattern = self._compile(list(self._replacements)) if self._replacements else None
+
+    @staticmethod
+    def _compile(words: list[str]):
+        """
+        Compile the words into one alternation, tried in list order like one replacement
+        pass per word would be (so 'FUCKING' still becomes 'fu@@ING').
+
+        Case is spelled out as [xX] classes and the words are grouped behind a character
+        class of their first letters: re.IGNORECASE alternations can't skip ahead to a
+        possible first letter and end up slower than five separate literal scans.
+        """
+        def any_case(text):
+            return ''.join(
+                f"[{re.escape(char.lower())}{re.escape(char.upper())}]" if char.lower() != char.upper()
+                else re.escape(char)
+                for char in text
+            )
+
+        tails = {}
+        for word in words:
+            tails.setdefault(word[0], []).append(any_case(word[1:]))
+        first_letters = ''.join(dict.fromkeys(
+            re.escape(char) for first in tails for char in (first.lower(), first.upper())
+        ))
+        branches = '|'.join(
+            f"(?<={any_case(first)})(?:{'|'.join(first_tails)})"
+            for first, first_tails in tails.items()
+        )
+        return re.compile(f"[{first_letters}](?:{branches})")
+
+    def fingerprint(self) -> str:
+        """
+        Identifies the cleaning rules, reviews cleaned under other rules can't be reused
+        """
+        rules = dumps([self.max_length, sorted(self._replacements.items())])
+        return hashlib.sha256(rules).hexdigest()[:16]
+
+    def _replace(self, match) -> str:
+        return self._replacements.get(match.group(0).lower(), match.group(0))
+
+    def _censor(self, review: str) -> str:
+        """
+        Replace the words until none is left: a pass doesn't see words overlapping one it
+        replaced ('classhit' -> 'cl@sshit' -> 'cl@ssh!t'). Most reviews match nothing and
+        take a single pass; there are never more passes than words, so a replacement
+        containing its own word can't loop.
+        """
+        for _ in range(len(self._replacements)):
+            review, replaced = self._pattern.subn(self._replace, review)
+            if not replaced:
+                break
+        return review
+
+    def clean(self, review, max_length: Optional[int] = None) -> str:
+        """
+        Clean a single review, returns "" for anything that isn't text
+        """
+        if not isinstance(review, str):
+            return ""
+        max_length = self.max_length if max_length is None else max_length
+
+        # Truncate text
+        if len(review) > max_length:
+            review = review[:max_length] + "..."
+        if self._pattern is not None:
+            review = self._censor(review)
+        return review
+
+    def clean_series(self, reviews: pd.Series) -> pd.Series:
+        """
+        Vectorized clean() for a whole review column
+        """
+        reviews = reviews.astype(object)
+        truncated = reviews.str.slice(0, self.max_length)
+        truncated = truncated.where(~(reviews.str.len() > self.max_length), truncated + "...")
+        if self._pattern is not None:
+            truncated = truncated.map(self._censor, na_action='ignore')
+        return truncated.fillna("")
+
+# Columns needed for basic processing
+REQUIRED_COLUMNS = [
+    'Title', 'Author', 'My Rating', 'Number of Pages',
+    'Date Read', 'Exclusive Shelf', 'ISBN',
+    'Year Published', 'My Review'
+]
+# Columns read from an export, the rest (shelves, notes, spoilers...) is never parsed.
+# Book Id identifies a row across versions of an export (see incremental.py)
+INGEST_COLUMNS = REQUIRED_COLUMNS + ['Date Added', 'Book Id']
+# Compact dtypes declared up front instead of inferred. Pages and years can be
+# missing, so they stay floating point
+INGEST_DTYPES = {
+    'Title': 'object',
+    'Author': 'category',
+    'My Rating': 'int8',
+    'Number of Pages': 'float32',
+    'Date Read': 'object',
+    'Exclusive Shelf': 'category',
+    'ISBN': 'object',
+    'Year Published': 'float32',
+    'My Review': 'object',
+    'Date Added': 'object',
+    'Book Id': 'int64'
+}
+# 'c' (pandas default) or 'pyarrow' (multi-threaded, needs the pyarrow package)
+CSV_ENGINE = os.environ.get('CSV_ENGINE', 'c')
+
+# Rows parsed by quick_validate_goodreads_csv to check shelves and dates
+VALIDATION_SAMPLE_ROWS = 200
+DATE_FORMAT = '%Y/%m/%d'
+# Books listed in the Top Books Summary
+TOP_BOOKS_SUMMARY_SIZE = 5
+
+def _as_seekable(source):
+    """
+    Turn raw bytes or a non-seekable stream into something pandas can read twice
+    Paths and seekable file objects are returned as they are.
+    """
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return io.BytesIO(source)
+    if hasattr(source, 'read') and not (hasattr(source, 'seekable') and source.seekable()):
+        return io.BytesIO(source.read())
+    return source
+
+def _read_header(source) -> pd.Index:
+    """
+    Read the column names, rewinding file objects to where they were
+    """
+    position = source.tell() if hasattr(source, 'tell') else None
+    header = pd.read_csv(source, nrows=0).columns
+    if position is not None:
+        source.seek(position)
+    return header
+
+def _ingest_options(header: pd.Index, int_dtypes: bool = True) -> dict:
+    """
+    usecols/dtype arguments for reading an export with the given header
+    Without int_dtypes, integer columns are left for pandas to infer (e.g. a blank rating)
+    """
+    usecols = [col for col in header if col in INGEST_COLUMNS]
+    dtypes = {col: INGEST_DTYPES[col] for col in usecols}
+    if not int_dtypes:
+        dtypes = {col: dtype for col, dtype in dtypes.items() if not dtype.startswith('int')}
+    return {'usecols': usecols, 'dtype': dtypes}
+
+def read_goodreads_export(csv_path, engine: str = CSV_ENGINE) -> pd.DataFrame:
+    """
+    Read the columns the processor needs from a Goodreads export with compact dtypes
+    csv_path can be a path, a file-like object (e.g. an uploaded file's stream) or bytes.
+    Columns missing from the file are left out, validate_goodreads_csv reports them.
+    """
+    if engine == 'pyarrow':
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            log_event('csv_engine_fallback', logging.WARNING, engine='c', reason='pyarrow is not installed')
+            engine = 'c'
+
+    source = _as_seekable(csv_path)
+    position = source.tell() if hasattr(source, 'tell') else None
+    header = _read_header(source)
+    try:
+        return pd.read_csv(source, engine=engine, **_ingest_options(header))
+    except (ValueError, TypeError):
+        # Integer columns can't hold missing values (e.g. a blank rating), let pandas infer those
+        if position is not None:
+            source.seek(position)
+        return pd.read_csv(source, engine=engine, **_ingest_options(header, int_dtypes=False))
+
+def iter_goodreads_export(source, chunk_rows: int, int_dtypes: bool = True):
+    """
+    Read a seekable export (see _as_seekable) in chunks of chunk_rows rows with the
+    dtypes of read_goodreads_export. Row labels keep counting across chunks.
+    """
+    header = _read_header(source)
+    options = _ingest_options(header, int_dtypes)
+    if not int_dtypes:
+        # Inferred chunk by chunk, a column with a few blanks would come out as int in some
+        # chunks and float in others. Read it as float like a whole-file read would.
+        options['dtype'].update({
+            col: 'float64' for col in options['usecols'] if INGEST_DTYPES[col].startswith('int')
+        })
+    with pd.read_csv(source, chunksize=chunk_rows, **options) as reader:
+        yield from reader
+
+def quick_validate_goodreads_csv(csv_path, sample_rows: int = VALIDATION_SAMPLE_ROWS) -> dict:
+    """
+    Validate a Goodreads export from its header and first rows only
+
+    Checks the required columns, that there is at least one book, that some book is on
+    the 'read' shelf and that read dates use the export's date format. Only if the sample
+    has no read book is the 'Exclusive Shelf' column of the whole file scanned.
+
+    Returns:
+        dict: Validation results with status and error messages
+    """
+    try:
+        source = _as_seekable(csv_path)
+        position = source.tell() if hasattr(source, 'tell') else None
+        sample = pd.read_csv(source, nrows=sample_rows, dtype=str)
+
+        missing_columns = [col for col in REQUIRED_COLUMNS if col not in sample.columns]
+        if missing_columns:
+            return {
+                'status': False,
+                'error': f'Missing required columns: {", ".join(missing_columns)}'
+            }
+
+        if len(sample) == 0:
+            return {
+                'status': False,
+                'error': 'CSV file is empty'
+            }
+
+        read_sample = sample[sample['Exclusive Shelf'] == 'read']
+        if len(read_sample) == 0 and len(sample) == sample_rows:
+            if position is not None:
+                source.seek(position)
+            shelves = pd.read_csv(source, usecols=['Exclusive Shelf'], dtype=str)['Exclusive Shelf']
+            has_read_books = (shelves == 'read').any()
+        else:
+            has_read_books = len(read_sample) > 0
+        if not has_read_books:
+            return {
+                'status': False,
+                'error': 'No books marked as "read" found'
+            }
+
+        try:
+            pd.to_datetime(sample['Date Read'].dropna(), format=DATE_FORMAT, errors='raise')
+        except (ValueError, TypeError):
+            return {
+                'status': False,
+                'error': 'Invalid date format in "Date Read" column'
+            }
+
+        return {
+            'status': True,
+            'sampled_books': len(sample),
+            'sampled_read_books': len(read_sample)
+        }
+
+    except Exception as e:
+        return {
+            'status': False,
+            'error': f'Validation error: {str(e)}'
+        }
+
+def _optional_values(series: pd.Series, dtype=None) -> list:
+    """
+    Column values as native Python objects, cast to dtype if given, with None where missing
+    """
+    values = series
+    if dtype is not None:
+        values = series.fillna(0).astype(dtype)
+    return values.astype(object).where(series.notna(), None).tolist()
+
+def _date_strings(dates: pd.Series) -> list:
+    """
+    YYYY-MM-DD strings of a date column, None where the date is missing
+    """
+    return dates.dt.strftime('%Y-%m-%d').astype(object).where(dates.notna(), None).tolist()
+
+def _records(columns: Dict[str, list]) -> list[dict]:
+    """
+    Turn equally long column lists into a list of row dictionaries
+    """
+    keys = list(columns)
+    return [dict(zip(keys, row)) for row in zip(*columns.values())]
+
+def _parse_dates(df: pd.DataFrame):
+    """
+    Parse the export's date columns in place, unparseable dates become NaT
+    """
+    date_columns = ['Date Read', 'Date Added']
+    for col in date_columns:
+        df[col] = pd.to_datetime(df[col], format=DATE_FORMAT, errors='coerce')
+
+def _period_mask(df: pd.DataFrame, start_date=None, end_date=None) -> pd.Series:
+    """
+    Rows on the 'read' shelf whose 'Date Read' falls in the specified period
+    Books read without a date belong to no period, not even an unbounded one, so every
+    section counts the same books as the monthly index
+    """
+    # Start with books marked as 'read'
+    mask = (df['Exclusive Shelf'] == 'read') & df['Date Read'].notna()
     
-    conn = aiohttp.TCPConnector(ssl=ssl_context)
-    async with aiohttp.ClientSession(connector=conn) as session:
-        tasks = []
-        valid_books = []
-        
-        for book in books:
-            if book and (book.get('isbn') or book.get('title')):
-                tasks.append(get_book_cover_async(
-                    isbn=book.get('isbn'),
-                    title=book.get('title'),
-                    author=book.get('author'),
-                    session=session
-                ))
-                valid_books.append(book)
-            else:
-                print(f"Skipping invalid book entry (missing both ISBN and title)")
-                
-        results = await asyncio.gather(*tasks, return_exceptions=True)
-        
-        cover_urls = {}
-        successful = 0
-        failed = 0
-        
-        for book, result in zip(valid_books, results):
-            # Create a unique identifier using title and author
-            book_id = f"{book.get('title', '')}__{book.get('author', '')}"
-            isbn = book.get('isbn')
-            title = book.get('title', 'Unknown Title')
-            
-            if isinstance(result, Exception):
-                print(f"Error fetching cover for book '{title}' (ISBN: {isbn}): {str(result)}")
-                cover_urls[book_id] = None
-                failed += 1
-            elif result is None:
-                print(f"No cover found for book '{title}' (ISBN: {isbn})")
-                cover_urls[book_id] = None
-                failed += 1
-            else:
-                print(f"Successfully retrieved cover for book '{title}' (ISBN: {isbn}): {result}")
-                cover_urls[book_id] = result
-                successful += 1
-                
-        print(f"\nSummary:")
-        print(f"Total books processed: {len(valid_books)}")
-        print(f"Successful retrievals: {successful}")
-        print(f"Failed retrievals: {failed}")
-        
-        return cover_urls
+    if start_date:
+        mask &= df['Date Read'] >= pd.to_datetime(start_date)
+    if end_date:
+        mask &= df['Date Read'] <= pd.to_datetime(end_date)
+    return mask
 
 
 class GoodreadsDataProcessor:
-    def __init__(self, csv_path):
-        self.df = pd.read_csv(csv_path)
-        self._process_dates()
+    def __init__(self, csv_path, swear_words: Optional[Dict[str, str]] = None, engine: str = CSV_ENGINE):
+        with span('read_csv'):
+            self.df = read_goodreads_export(csv_path, engine=engine)
+        self.review_sanitizer = ReviewSanitizer(swear_words)
+        with span('process_dates'):
+            self._process_dates()
+        # Per-month aggregates, so whole-month periods don't need a scan of the frame
+        with span('monthly_index'):
+            self.monthly_index = MonthlyIndex(self.df)
+        # Cleaned reviews and found covers by row label, computed for earlier periods or
+        # reused from a snapshot of a previous version of the export (see incremental.py)
+        self.known_reviews = {}
+        self.known_covers = {}
         
     def _process_dates(self):
-        date_columns = ['Date Read', 'Date Added']
-        for col in date_columns:
-            self.df[col] = pd.to_datetime(self.df[col], format='%Y/%m/%d', errors='coerce')
+        _parse_dates(self.df)
     
     def _clean_title(self, title):
         """
@@ -184,51 +1176,72 @@ class GoodreadsDataProcessor:
         # Remove series information in parentheses, including nested parentheses
         cleaned_title = re.sub(r'\s*\([^)]*\)', '', title).strip()
         return cleaned_title
+
+    def _clean_titles(self, titles: pd.Series) -> pd.Series:
+        """
+        Vectorized _clean_title for a whole column, missing titles are left as they are
+        """
+        return titles.astype(object).str.replace(r'\s*\([^)]*\)', '', regex=True).str.strip()
     
     def _filter_date_range(self, start_date=None, end_date=None):
         """
         Filter dataframe for specified date range based on 'Date Read'
-        If no dates specified, returns all read books
+        If no dates specified, returns all read books that have a read date
         """
-        # Start with books marked as 'read'
-        mask = self.df['Exclusive Shelf'] == 'read'
-        
-        if start_date:
-            mask &= self.df['Date Read'] >= pd.to_datetime(start_date)
-        if end_date:
-            mask &= self.df['Date Read'] <= pd.to_datetime(end_date)
-            
-        return self.df[mask].copy()
+        return self.df[_period_mask(self.df, start_date, end_date)].copy()
 
-    def _clean_review_text(self, review, max_length=500):
+    def _select_period(self, start_date=None, end_date=None):
+        """
+        Rows read in the specified period along with their aggregated summary
+        Periods made of whole months are answered from the monthly index, any other
+        period is filtered row by row and summarized on its own
+        """
+        months = MonthlyIndex.month_span(start_date, end_date)
+        if months is not None:
+            keys = self.monthly_index.select(*months)
+            df_period = self.df.iloc[self.monthly_index.positions(keys)].copy()
+            return df_period, self.monthly_index.combine(keys)
+
+        df_period = self._filter_date_range(start_date, end_date)
+        period_index = MonthlyIndex(df_period)
+        return df_period, period_index.combine(sorted(period_index.buckets))
+
+    def _clean_review_text(self, review, max_length=REVIEW_MAX_LENGTH):
         """
         Clean review text:
         - Truncate to max_length
         - Censor swear words
         - Add ellipsis if truncated
         """
-        if not isinstance(review, str):
-            return ""
-            
-        # Dictionary of swear words and their censored versions
-        swear_words = {
-            'fuck': 'fu@@',
-            'fucking': 'fu@@ing',
-            'shit': 'sh!t',
-            'damn': 'd@mn',
-            'ass': '@ss'
-        }
-        
-        # Truncate text
-        if len(review) > max_length:
-            review = review[:max_length] + "..."
-            
-        # Replace swear words (case insensitive)
-        for word, replacement in swear_words.items():
-            review = re.sub(re.compile(word, re.IGNORECASE), replacement, review)
-            
-        return review
+        return self.review_sanitizer.clean(review, max_length)
 
+    def _with_clean_reviews(self, df_period):
+        """
+        Add the cleaned review column to a filtered period, so every section reuses
+        the same cleaned text instead of cleaning each review again
+        """
+        if CLEAN_REVIEW_COLUMN not in df_period.columns:
+            with span('clean_reviews'):
+                df_period[CLEAN_REVIEW_COLUMN] = self._clean_reviews(df_period)
+        return df_period
+
+    def _clean_reviews(self, df_period) -> pd.Series:
+        """
+        Cleaned reviews of a period, only the ones not known yet are cleaned
+        """
+        if self.known_reviews is None:
+            return self.review_sanitizer.clean_series(df_period['My Review'])
+        if not self.known_reviews:
+            reviews = self.review_sanitizer.clean_series(df_period['My Review'])
+        else:
+            reviews = pd.Series(
+                [self.known_reviews.get(label) for label in df_period.index], index=df_period.index, dtype=object
+            )
+            missing = reviews.isna().to_numpy()
+            if missing.any():
+                reviews[missing] = self.review_sanitizer.clean_series(df_period['My Review'][missing]).to_numpy()
+        self.known_reviews.update(zip(df_period.index, reviews))
+        return reviews
 
     def validate_goodreads_csv(self):
         """
@@ -242,15 +1255,8 @@ class GoodreadsDataProcessor:
         """
         try:
             
-            # Required columns for basic processing
-            required_columns = [
-                'Title', 'Author', 'My Rating', 'Number of Pages', 
-                'Date Read', 'Exclusive Shelf', 'ISBN', 
-                'Year Published', 'My Review'
-            ]
-            
             # Check for required columns
-            missing_columns = [col for col in required_columns if col not in self.df.columns]
+            missing_columns = [col for col in REQUIRED_COLUMNS if col not in self.df.columns]
             if missing_columns:
                 return {
                     'status': False, 
@@ -300,18 +1306,28 @@ class GoodreadsDataProcessor:
         Returns: Dictionary with months as keys and rating distributions as values
         """
         df_period = self._filter_date_range(start_date, end_date)
-        
+        return self._monthly_rating_distribution(df_period)
+
+    def _monthly_rating_distribution(self, df_period, read_year=None, read_month=None):
+        """
+        Rating distribution per month for an already filtered period
+        read_year/read_month can be passed in to share them with other sections
+        """
+        if read_year is None:
+            read_year = df_period['Date Read'].dt.year
+            read_month = df_period['Date Read'].dt.month
+
         # Group by year, month, and rating
         monthly_ratings = df_period.groupby([
-            df_period['Date Read'].dt.year,
-            df_period['Date Read'].dt.month,
+            read_year,
+            read_month,
             'My Rating'
         ]).size().unstack(fill_value=0)
         
         # Calculate average rating per month
         monthly_avg_ratings = df_period.groupby([
-            df_period['Date Read'].dt.year,
-            df_period['Date Read'].dt.month
+            read_year,
+            read_month
         ])['My Rating'].mean()
         
         # Format the results
@@ -325,73 +1341,132 @@ class GoodreadsDataProcessor:
             
         return formatted_ratings
 
-    def get_top_books_summary(self, start_date=None, end_date=None, n=5):
+    def get_top_books_summary(self, start_date=None, end_date=None, n=TOP_BOOKS_SUMMARY_SIZE):
         """
         Get top n books based on rating
         Returns: List of dictionaries containing book details
         """
         df_period = self._filter_date_range(start_date, end_date)
-        
+        return self._top_books_summary(df_period, n)
+
+    def _top_books_summary(self, df_period, n=TOP_BOOKS_SUMMARY_SIZE):
+        """
+        Top n books based on rating for an already filtered period
+        """
         # Sort by rating (descending) and then by page count (descending) for ties
         top_books = df_period.sort_values(
             ['My Rating', 'Number of Pages'],
             ascending=[False, False]
         ).head(n)
         
-        return [{
-            'title': self._clean_title(row['Title']),
-            'author': row['Author'],
-            'rating': row['My Rating'],
-            'pages': row['Number of Pages'],
-            'date_read': row['Date Read'].strftime('%Y-%m-%d')
-        } for _, row in top_books.iterrows()]
+        return _records({
+            'title': self._clean_titles(top_books['Title']).tolist(),
+            'author': top_books['Author'].astype(object).tolist(),
+            'rating': top_books['My Rating'].tolist(),
+            'pages': _optional_values(top_books['Number of Pages'], 'int64'),
+            'date_read': _date_strings(top_books['Date Read'])
+        })
 
 
-    def get_all_books_read(self, start_date=None, end_date=None):
+    def _books_for_cover_fetch(self, sorted_books):
+        """
+        Build the isbn/title/author entries get_covers_batch expects
+        """
+        return _records({
+            'isbn': _optional_values(sorted_books['ISBN']),
+            'title': _optional_values(self._clean_titles(sorted_books['Title'])),
+            'author': _optional_values(sorted_books['Author'])
+        })
+
+    def get_cover_requests(self, start_date=None, end_date=None):
+        """
+        Get the cover lookups needed for the books read in the specified period
+        Used to resolve covers separately from get_statistics(fetch_covers=False)
+        """
+        df_period = self._filter_date_range(start_date, end_date)
+        sorted_books = df_period.sort_values('Date Read', ascending=False)
+        return self._books_for_cover_fetch(self._without_known_covers(sorted_books))
+
+    def _without_known_covers(self, sorted_books):
+        """
+        Books whose cover isn't known yet, only these need a lookup
+        """
+        if not self.known_covers:
+            return sorted_books
+        return sorted_books[~sorted_books.index.isin(list(self.known_covers))]
+
+    def get_all_books_read(self, start_date=None, end_date=None, fetch_covers=True):
         """
         Get details for all books read in the specified period with concurrent cover fetching
+        With fetch_covers=False every cover_url is None and no network requests are made
         """
         df_period = self._filter_date_range(start_date, end_date)
+        return self._all_books_read(df_period, fetch_covers)
+
+    def _all_books_read(self, df_period, fetch_covers=True, cover_urls=None):
+        """
+        Details for all books of an already filtered period, most recently read first
+        cover_urls can be passed in when covers were already resolved for a larger batch
+        """
+        df_period = self._with_clean_reviews(df_period)
         sorted_books = df_period.sort_values('Date Read', ascending=False)
         
-        # Prepare books data for cover fetching
-        books_data = []
-        for _, row in sorted_books.iterrows():
-            book = {
-                'isbn': row['ISBN'] if pd.notna(row['ISBN']) else None,
-                'title': self._clean_title(row['Title']) if pd.notna(row['Title']) else None,
-                'author': row['Author'] if pd.notna(row['Author']) else None
-            }
-            books_data.append(book)
-        
-        # Fetch covers for all books
-        cover_urls = asyncio.run(get_covers_batch(books_data))
-        
-        # Process all books with their covers
-        processed_books = []
-        for _, row in sorted_books.iterrows():
-            title = self._clean_title(row['Title'])
-            author = row['Author']
-            # Use the same book identifier as in get_covers_batch
-            book_id = f"{title}__{author}"
-            
-            book_data = {
-                'title': title,
-                'author': author,
-                'rating': float(row['My Rating']) if row['My Rating'] > 0 else None,
-                'pages': int(float(row['Number of Pages'])) if pd.notna(row['Number of Pages']) else None,
-                'date_read': row['Date Read'].strftime('%Y-%m-%d'),
-                'review': self._clean_review_text(row['My Review']) if pd.notna(row['My Review']) else None,
-                'isbn': row['ISBN'] if pd.notna(row['ISBN']) else None,
-                'year_published': int(row['Year Published']) if pd.notna(row['Year Published']) else None,
-                'cover_url': cover_urls.get(book_id)
-            }
-            processed_books.append(book_data)
+        cover_urls = cover_urls or {}
+        if fetch_covers:
+            # Fetch covers for all books not known yet
+            books_data = self._books_for_cover_fetch(self._without_known_covers(sorted_books))
+            if books_data:
+                with span('covers'):
+                    cover_urls = cover_resolver.resolve(books_data)
+
+        with span('book_list'):
+            return self._book_records(sorted_books, cover_urls)
+
+    def _book_records(self, sorted_books, cover_urls):
+        """
+        All Books Read entries of already sorted books, with their covers
+        Known covers come first, the ones found are remembered for later periods
+        """
+        titles = self._clean_titles(sorted_books['Title'])
+        authors = sorted_books['Author'].astype(object)
+        ratings = sorted_books['My Rating']
+        reviews = sorted_books['My Review']
+        clean_reviews = sorted_books[CLEAN_REVIEW_COLUMN]
+        # Use the same book identifier as in get_covers_batch
+        book_ids = titles.astype(str) + '__' + authors.astype(str)
+
+        processed_books = _records({
+            'title': titles.tolist(),
+            'author': authors.tolist(),
+            'rating': ratings.astype(float).astype(object).where(ratings > 0, None).tolist(),
+            'pages': _optional_values(sorted_books['Number of Pages'], 'int64'),
+            'date_read': _date_strings(sorted_books['Date Read']),
+            'review': clean_reviews.astype(object).where(reviews.notna(), None).tolist(),
+            'isbn': _optional_values(sorted_books['ISBN']),
+            'year_published': _optional_values(sorted_books['Year Published'], 'int64'),
+            'cover_url': self._cover_urls(sorted_books.index, book_ids, cover_urls)
+        })
         
         return processed_books
 
+    def _cover_urls(self, labels, book_ids, cover_urls) -> list:
+        if self.known_covers is None:
+            return [cover_urls.get(book_id) for book_id in book_ids]
+        known = self.known_covers
+        covers = [known.get(label) or cover_urls.get(book_id) for label, book_id in zip(labels, book_ids)]
+        known.update((label, url) for label, url in zip(labels, covers) if url)
+        return covers
 
-
+    def _rated_books(self, books):
+        """
+        Title/author/rating/review entries for the highest and lowest rated lists
+        """
+        return _records({
+            'Title': books['Title'].astype(object).tolist(),
+            'Author': books['Author'].astype(object).tolist(),
+            'My Rating': books['My Rating'].astype(float).tolist(),
+            'My Review': books[CLEAN_REVIEW_COLUMN].tolist()
+        })
 
     def _get_time_comparisons(self, hours):
         """
@@ -417,31 +1492,106 @@ class GoodreadsDataProcessor:
         average_days_per_book = 1 / books_per_day if books_per_day > 0 else 0
         return average_days_per_book
 
-    def get_statistics(self, start_date=None, end_date=None):
-        df_period = self._filter_date_range(start_date, end_date)
+    def _monthly_rating_summary(self, summary):
+        """
+        Monthly Rating Distribution built from a period summary
+        Every month lists all the ratings given in the period, months without a rating are left out
+        """
+        ratings = list(summary['rating_counts'])
+        formatted_ratings = {}
+        for (year, month), month_summary in summary['months'].items():
+            rated = sum(month_summary['rating_counts'].values())
+            if not rated:
+                continue
+            formatted_ratings[f"{year:04d}-{month:02d}"] = {
+                'distribution': {rating: month_summary['rating_counts'].get(rating, 0) for rating in ratings},
+                'average': month_summary['rating_sum'] / rated
+            }
+        return formatted_ratings
+
+    def get_statistics(self, start_date=None, end_date=None, fetch_covers=True):
+        """
+        Compute every section of the wrapped statistics for the specified period
+        Counts, pages, ratings and extremes come from the period's monthly summary, the
+        rows are only used for the book lists.
+        With fetch_covers=False covers are left as None, to be resolved separately
+        """
+        with span('select_period'):
+            df_period, summary = self._select_period(start_date, end_date)
         
         if len(df_period) == 0:
             return "No books found in the specified date range."
 
+        # Clean every review once, all sections below share the result
+        df_period = self._with_clean_reviews(df_period)
+
         # Get all books first (includes covers)
-        all_books = self.get_all_books_read(start_date, end_date)
+        all_books = self._all_books_read(df_period, fetch_covers=fetch_covers)
         # Create a mapping of title to cover URL
         cover_url_map = {book['title']: book['cover_url'] for book in all_books}
+        with span('build_statistics'):
+            return self._build_statistics(df_period, summary, all_books, cover_url_map, start_date, end_date)
+
+    def get_statistics_for_years(self, years, fetch_covers=True):
+        """
+        Compute the statistics of several calendar years in one call
+        Covers for every year are resolved in a single batch
+        Returns: Dictionary with years as keys and get_statistics results as values
+        """
+        periods = {}
+        for year in years:
+            start_date, end_date = f"{int(year):04d}-01-01", f"{int(year):04d}-12-31"
+            with span('select_period'):
+                df_period, summary = self._select_period(start_date, end_date)
+            periods[str(year)] = (start_date, end_date, self._with_clean_reviews(df_period), summary)
 
-        # Rest of your existing stats calculations...
-        reading_hours = (df_period['Number of Pages'].sum() * 2.5) / 60
+        cover_urls = {}
+        if fetch_covers:
+            books_data = []
+            for _, _, df_period, _ in periods.values():
+                sorted_books = df_period.sort_values('Date Read', ascending=False)
+                books_data.extend(self._books_for_cover_fetch(self._without_known_covers(sorted_books)))
+            if books_data:
+                with span('covers'):
+                    cover_urls = cover_resolver.resolve(books_data)
+
+        results = {}
+        for year, (start_date, end_date, df_period, summary) in periods.items():
+            if len(df_period) == 0:
+                results[year] = "No books found in the specified date range."
+                continue
+            all_books = self._all_books_read(df_period, fetch_covers=False, cover_urls=cover_urls)
+            cover_url_map = {book['title']: book['cover_url'] for book in all_books}
+            with span('build_statistics'):
+                results[year] = self._build_statistics(df_period, summary, all_books, cover_url_map, start_date, end_date)
+        return results
+
+    def _build_statistics(self, df_period, summary, all_books, cover_url_map, start_date, end_date):
+        """
+        Assemble the statistics sections of a non-empty period
+        """
+        ratings = df_period['My Rating']
+        total_pages = summary['total_pages']
+        reading_hours = (total_pages * 2.5) / 60
         reading_days = reading_hours / 24
-        
-        # Convert books_per_month Period objects to strings
-        books_per_month = (
-            df_period['Date Read']
-            .dt.to_period('M')
-            .value_counts()
-            .sort_index()
-            .apply(lambda x: int(x))
-            .to_dict()
-        )
-        books_per_month = {str(k): v for k, v in books_per_month.items()}
+
+        rating_counts = summary['rating_counts']
+        rated = sum(rating_counts.values())
+        books_per_month = {
+            f"{year:04d}-{month:02d}": month_summary['count']
+            for (year, month), month_summary in summary['months'].items()
+        }
+
+        date_range = (summary['last_read'] - summary['first_read']).days if summary['first_read'] is not None else 0
+        books_per_day = summary['total_books'] / date_range if date_range > 0 else 0
+        average_days_per_book = 1 / books_per_day if books_per_day > 0 else 0
+
+        longest_pages, longest_label = summary['longest']
+        shortest_pages, shortest_label = summary['shortest']
+        longest = df_period.loc[longest_label]
+        shortest = df_period.loc[shortest_label]
+        longest_title = self._clean_title(longest['Title'])
+        shortest_title = self._clean_title(shortest['Title'])
 
         stats = {
             "Time_Period": {
@@ -450,21 +1600,21 @@ class GoodreadsDataProcessor:
             },
             
             "Basic_Statistics": {
-                "total_books": len(df_period),
-                "total_pages": int(df_period['Number of Pages'].sum()),
-                "estimated_words": int(df_period['Number of Pages'].sum() * 250),
+                "total_books": summary['total_books'],
+                "total_pages": int(total_pages),
+                "estimated_words": int(total_pages * 250),
                 "estimated_hours": float(reading_hours),
                 "estimated_days": float(reading_days)
             },
             
             "Rating_Statistics": {
-                "average_rating": float(df_period['My Rating'].mean()),
-                "rating_distribution": {str(k): int(v) for k, v in df_period['My Rating'].value_counts().sort_index().to_dict().items()}
+                "average_rating": summary['rating_sum'] / rated if rated else None,
+                "rating_distribution": {str(k): v for k, v in rating_counts.items()}
             },
             
             "Reading_Patterns": {
                 "books_per_month": books_per_month,
-                "average_days_to_finish": float(self._calculate_reading_pace(df_period))
+                "average_days_to_finish": float(average_days_per_book)
             },
             
             "Time_Comparisons": self._get_time_comparisons(reading_hours),
@@ -472,48 +1622,37 @@ class GoodreadsDataProcessor:
             # Update Book_Extremes to include cover URLs
             "Book_Extremes": {
                 "longest_book": {
-                    "title": self._clean_title(df_period.loc[df_period['Number of Pages'].idxmax(), 'Title']),
-                    "author": df_period.loc[df_period['Number of Pages'].idxmax(), 'Author'],
-                    "pages": int(df_period['Number of Pages'].max()),
-                    "rating": float(df_period.loc[df_period['Number of Pages'].idxmax(), 'My Rating']),
-                    "review": self._clean_review_text(df_period.loc[df_period['Number of Pages'].idxmax(), 'My Review']),
-                    "cover_url": cover_url_map.get(self._clean_title(df_period.loc[df_period['Number of Pages'].idxmax(), 'Title']))
+                    "title": longest_title,
+                    "author": longest['Author'],
+                    "pages": int(longest_pages),
+                    "rating": float(longest['My Rating']),
+                    "review": longest[CLEAN_REVIEW_COLUMN],
+                    "cover_url": cover_url_map.get(longest_title)
                 },
                 "shortest_book": {
-                    "title": self._clean_title(df_period.loc[df_period['Number of Pages'].idxmin(), 'Title']),
-                    "author": df_period.loc[df_period['Number of Pages'].idxmin(), 'Author'],
-                    "pages": int(df_period['Number of Pages'].min()),
-                    "rating": float(df_period.loc[df_period['Number of Pages'].idxmin(), 'My Rating']),
-                    "review": self._clean_review_text(df_period.loc[df_period['Number of Pages'].idxmin(), 'My Review']),
-                    "cover_url": cover_url_map.get(self._clean_title(df_period.loc[df_period['Number of Pages'].idxmin(), 'Title']))
+                    "title": shortest_title,
+                    "author": shortest['Author'],
+                    "pages": int(shortest_pages),
+                    "rating": float(shortest['My Rating']),
+                    "review": shortest[CLEAN_REVIEW_COLUMN],
+                    "cover_url": cover_url_map.get(shortest_title)
                 }
             }
         }
 
         # Update with high/low ratings
-        high_rated = df_period[df_period['My Rating'] == df_period['My Rating'].max()]
-        low_rated = df_period[df_period['My Rating'] == df_period['My Rating'].min()]
+        high_rated = df_period[ratings == ratings.max()]
+        low_rated = df_period[ratings == ratings.min()]
         
         stats["Highest and Lowest Rated"] = {
-            "highest_rated": [{
-                'Title': row['Title'],
-                'Author': row['Author'],
-                'My Rating': float(row['My Rating']),
-                'My Review': self._clean_review_text(row['My Review'])
-            } for _, row in high_rated.iterrows()],
-            
-            "lowest_rated": [{
-                'Title': row['Title'],
-                'Author': row['Author'],
-                'My Rating': float(row['My Rating']),
-                'My Review': self._clean_review_text(row['My Review'])
-            } for _, row in low_rated.iterrows()]
+            "highest_rated": self._rated_books(high_rated),
+            "lowest_rated": self._rated_books(low_rated)
         }
 
         # Add the remaining sections
         stats.update({
-            "Monthly Rating Distribution": self.get_monthly_rating_distribution(start_date, end_date),
-            "Top Books Summary": self.get_top_books_summary(start_date, end_date),
+            "Monthly Rating Distribution": self._monthly_rating_summary(summary),
+            "Top Books Summary": self._top_books_summary(df_period),
             "All Books Read": all_books  # Already includes cover URLs
         })
         
@@ -525,26 +1664,12 @@ def export_to_json(stats: Dict, output_path: str,):
     Export statistics to a JSON file
     Returns the stats dictionary for immediate use if needed
     """
-    stats = stats
-
-    # Convert any numpy/pandas types to native Python types for JSON serialization
-    def convert_to_native_types(obj):
-        if isinstance(obj, (np.integer, np.floating)):
-            return float(obj)
-        elif isinstance(obj, pd.Period):
-            return str(obj)
-        elif isinstance(obj, dict):
-            return {key: convert_to_native_types(value) for key, value in obj.items()}
-        elif isinstance(obj, list):
-            return [convert_to_native_types(item) for item in obj]
-        return obj
-
-    serializable_stats = convert_to_native_types(stats)
-
-    with open(output_path, 'w', encoding='utf-8') as f:
-        json.dump(serializable_stats, f, ensure_ascii=False, indent=2)
+    # Statistics are built from native Python types, numpy/pandas leftovers are
+    # converted by the encoder's default
+    with open(output_path, 'wb') as f:
+        f.write(dumps(stats, compact=False))
 
-    return serializable_stats
+    return stats
 
 if __name__ == "__main__":
     start_time = time.time()
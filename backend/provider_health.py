@@ -0,0 +1,233 @@
+import logging
+import os
+import threading
+import time
+from collections import deque
+from email.utils import parsedate_to_datetime
+from typing import Callable, Dict, List, Optional
+
+from instrumentation import log_event, metrics
+
+# Set PROVIDER_CIRCUIT_BREAKER=0 to always query every provider
+PROVIDER_CIRCUIT_BREAKER = os.environ.get('PROVIDER_CIRCUIT_BREAKER', '1') != '0'
+# Outcomes a circuit decides on: the last HEALTH_WINDOW lookups of a service, no older than
+# HEALTH_WINDOW_SECONDS, once there are at least CIRCUIT_MIN_REQUESTS of them
+HEALTH_WINDOW = 50
+HEALTH_WINDOW_SECONDS = 120
+CIRCUIT_MIN_REQUESTS = 10
+CIRCUIT_FAILURE_RATE = 0.5
+# Seconds a tripped circuit stays open, doubled each time its probe fails again
+CIRCUIT_COOLDOWN = 30
+CIRCUIT_MAX_COOLDOWN = 300
+# A half-open circuit lets one probe through; one not back after this long frees the slot
+CIRCUIT_PROBE_TIMEOUT = 10
+# Longest Retry-After honored (seconds), providers asking for more are retried after this
+RETRY_AFTER_MAX = 600
+# Weight of the newest lookup in a provider's latency average
+LATENCY_EWMA_ALPHA = 0.2
+# A provider only moves ahead of the one before it when that one is this many times slower
+REORDER_FACTOR = 2
+
+FAILED_OUTCOMES = ('error', 'timeout', 'rate_limited')
+
+provider_skips = metrics.counter(
+    'goodreads_provider_skipped_total', 'Cover provider lookups skipped by an open circuit', ('provider',))
+circuit_trips = metrics.counter(
+    'goodreads_provider_circuit_trips_total', 'Provider circuits opened, by reason (error, timeout, rate_limited)',
+    ('service', 'reason'))
+
+
+def provider_service(provider: str) -> str:
+    """
+    Service a provider queries ('google_isbn_batch' -> 'google'); rate limits and outages
+    hit every endpoint of a service, so circuits are kept per service
+    """
+    return provider.partition('_')[0]
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """
+    Seconds to wait from a Retry-After header, given in seconds or as an HTTP date
+    Returns None if the header is missing or malformed
+    """
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        seconds = float(value)
+    else:
+        try:
+            seconds = parsedate_to_datetime(value).timestamp() - time.time()
+        except (TypeError, ValueError):
+            return None
+    return min(max(seconds, 0.0), RETRY_AFTER_MAX)
+
+
+class ProviderRateLimited(Exception):
+    """
+    A provider answered 429; retry_after is how long it asked us to wait, if it said
+    """
+
+    def __init__(self, retry_after: Optional[float] = None):
+        super().__init__('rate limited' if retry_after is None else f"rate limited, retry after {retry_after:g} s")
+        self.retry_after = retry_after
+
+
+class _Circuit:
+    def __init__(self):
+        # (monotonic time, failed) of the latest lookups
+        self.outcomes = deque(maxlen=HEALTH_WINDOW)
+        # 0 while closed, else when the circuit half-opens
+        self.open_until = 0.0
+        # Consecutive trips, the cool-down doubles with each
+        self.trips = 0
+        self.probe_started = None
+
+
+class ProviderHealth:
+    """
+    Circuit breakers per provider service and latency per provider, shared by every cover
+    batch of the worker process
+
+    A service's circuit opens once CIRCUIT_FAILURE_RATE of its recent lookups failed (errors,
+    timeouts, 429s), or on any 429 for as long as its Retry-After asks. While open, lookups on
+    that service are skipped. After the cool-down a single probe lookup is let through:
+    if it works the circuit closes, otherwise it opens again for twice as long.
+    """
+
+    def __init__(self, enabled: bool = PROVIDER_CIRCUIT_BREAKER, clock: Callable[[], float] = time.monotonic):
+        self.enabled = enabled
+        # Source of the monotonic time cool-downs and the health window are measured on
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._circuits: Dict[str, _Circuit] = {}
+        self._latency: Dict[str, float] = {}
+
+    def allow(self, provider: str) -> bool:
+        """
+        Whether a lookup on this provider may go out now (it then has to be record()ed)
+        """
+        if not self.enabled:
+            return True
+        now = self._clock()
+        with self._lock:
+            circuit = self._circuits.get(provider_service(provider))
+            if circuit is None or not circuit.open_until:
+                return True
+            if now < circuit.open_until:
+                allowed = False
+            elif circuit.probe_started is not None and now - circuit.probe_started < CIRCUIT_PROBE_TIMEOUT:
+                allowed = False
+            else:
+                circuit.probe_started = now
+                allowed = True
+        if not allowed:
+            provider_skips.inc(provider=provider)
+        return allowed
+
+    def record(self, provider: str, outcome: str, latency: float, retry_after: Optional[float] = None):
+        """
+        Record one lookup; outcome is 'success', 'miss', 'error', 'timeout' or 'rate_limited'
+        """
+        with self._lock:
+            if outcome in ('success', 'miss', 'timeout'):
+                previous = self._latency.get(provider)
+                self._latency[provider] = latency if previous is None else (
+                    previous + LATENCY_EWMA_ALPHA * (latency - previous))
+            if not self.enabled:
+                return
+
+            service = provider_service(provider)
+            circuit = self._circuits.setdefault(service, _Circuit())
+            now = self._clock()
+            failed = outcome in FAILED_OUTCOMES
+            if circuit.open_until:
+                if now < circuit.open_until and outcome != 'rate_limited':
+                    # Sent before the circuit opened, it says nothing about the cool-down
+                    return
+                circuit.probe_started = None
+                if failed:
+                    cooldown = self._open(circuit, now, retry_after)
+                else:
+                    circuit.open_until = 0.0
+                    circuit.trips = 0
+                    circuit.outcomes.clear()
+                    cooldown = None
+            else:
+                circuit.outcomes.append((now, failed))
+                recent = [failure for when, failure in circuit.outcomes if now - when <= HEALTH_WINDOW_SECONDS]
+                if outcome == 'rate_limited' or (
+                        len(recent) >= CIRCUIT_MIN_REQUESTS and sum(recent) >= CIRCUIT_FAILURE_RATE * len(recent)):
+                    cooldown = self._open(circuit, now, retry_after)
+                else:
+                    return
+
+        if cooldown is None:
+            log_event('provider_circuit_closed', service=service, provider=provider)
+        else:
+            circuit_trips.inc(service=service, reason=outcome)
+            log_event('provider_circuit_opened', logging.WARNING, service=service, provider=provider,
+                      reason=outcome, cooldown=round(cooldown, 3))
+
+    @staticmethod
+    def _open(circuit: _Circuit, now: float, retry_after: Optional[float]) -> float:
+        # A provider saying when to come back is taken at its word
+        if retry_after is not None:
+            cooldown = retry_after
+        else:
+            cooldown = min(CIRCUIT_COOLDOWN * 2 ** circuit.trips, CIRCUIT_MAX_COOLDOWN)
+        circuit.trips += 1
+        circuit.open_until = now + cooldown
+        circuit.outcomes.clear()
+        return cooldown
+
+    def ordered(self, providers: List[tuple]) -> List[tuple]:
+        """
+        Providers (tuples starting with the provider name) in the given priority order, except
+        that a provider observed to be REORDER_FACTOR times faster than the one before it goes
+        first. Providers without a latency yet keep their place.
+        """
+        with self._lock:
+            latency = dict(self._latency)
+        providers = list(providers)
+        for _ in range(len(providers)):
+            swapped = False
+            for i in range(len(providers) - 1):
+                before, after = latency.get(providers[i][0]), latency.get(providers[i + 1][0])
+                if before is not None and after is not None and before > REORDER_FACTOR * after:
+                    providers[i], providers[i + 1] = providers[i + 1], providers[i]
+                    swapped = True
+            if not swapped:
+                break
+        return providers
+
+    def snapshot(self) -> Dict[str, dict]:
+        """
+        State of every service's circuit: 'closed', 'open' or 'half_open', seconds until an open
+        one half-opens, and the failure rate of its recent lookups
+        """
+        now = self._clock()
+        with self._lock:
+            summary = {}
+            for service, circuit in self._circuits.items():
+                recent = [failure for when, failure in circuit.outcomes if now - when <= HEALTH_WINDOW_SECONDS]
+                if not circuit.open_until:
+                    state = 'closed'
+                elif now < circuit.open_until:
+                    state = 'open'
+                else:
+                    state = 'half_open'
+                summary[service] = {
+                    'state': state,
+                    'retry_in': max(circuit.open_until - now, 0.0) if state == 'open' else 0.0,
+                    'failure_rate': sum(recent) / len(recent) if recent else 0.0
+                }
+            return summary
+
+    def reset(self):
+        with self._lock:
+            self._circuits.clear()
+            self._latency.clear()
+
+
+provider_health = ProviderHealth()
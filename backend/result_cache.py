@@ -0,0 +1,116 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Optional
+
+from instrumentation import record_cache_lookup, span
+from process_data import GoodreadsDataProcessor
+from streaming import STREAMING_MIN_BYTES, StreamingGoodreadsProcessor
+
+# The frontend posts the same file to /validate and then /analyze, parsed frames only
+# need to survive that handoff. Finished results are kept longer for repeat uploads.
+HANDOFF_TTL = 2 * 60
+RESULT_TTL = 60 * 60
+PARSED_CACHE_MAX_BYTES = 256 * 1024 * 1024
+RESULT_CACHE_MAX_BYTES = 64 * 1024 * 1024
+BOOK_LIST_CACHE_MAX_BYTES = 64 * 1024 * 1024
+# Rough in-memory size of a parsed export relative to its CSV bytes
+PARSED_SIZE_FACTOR = 2
+
+
+def upload_digest(data: bytes) -> str:
+    """
+    Content address of an uploaded export
+    """
+    return hashlib.sha256(data).hexdigest()
+
+
+class BoundedTTLCache:
+    """
+    In-process LRU cache bounded by the total size of its entries, with a per-cache TTL
+    """
+
+    def __init__(self, max_bytes: int, ttl: float):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, size, expires_at = entry
+            if expires_at <= time.time():
+                del self._entries[key]
+                self._size -= size
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def put(self, key: str, value: Any, size: int):
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._size -= self._entries.pop(key)[1]
+            self._entries[key] = (value, size, time.time() + self.ttl)
+            self._size += size
+            while self._size > self.max_bytes:
+                _, (_, evicted_size, _) = self._entries.popitem(last=False)
+                self._size -= evicted_size
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+
+parsed_uploads = BoundedTTLCache(PARSED_CACHE_MAX_BYTES, HANDOFF_TTL)
+analysis_results = BoundedTTLCache(RESULT_CACHE_MAX_BYTES, RESULT_TTL)
+# All Books Read lists served page by page from /books/<id>
+book_lists = BoundedTTLCache(BOOK_LIST_CACHE_MAX_BYTES, RESULT_TTL)
+_parser = ThreadPoolExecutor(max_workers=1, thread_name_prefix='upload-parser')
+
+
+def prefetch_processor(digest: str, data: bytes):
+    """
+    Start parsing an upload in the background so a following /analyze can pick it up
+    Large uploads are streamed by /analyze and never parsed whole
+    """
+    if len(data) < STREAMING_MIN_BYTES and parsed_uploads.get(digest) is None:
+        future = _parser.submit(GoodreadsDataProcessor, data)
+        parsed_uploads.put(digest, future, len(data) * PARSED_SIZE_FACTOR)
+
+
+def get_processor(digest: str, data: bytes) -> GoodreadsDataProcessor:
+    """
+    Return the processor for an upload, reusing a frame parsed during /validate if there is one
+    Uploads of STREAMING_MIN_BYTES or more get a streaming processor instead
+    """
+    if len(data) >= STREAMING_MIN_BYTES:
+        return StreamingGoodreadsProcessor(data)
+
+    cached = parsed_uploads.get(digest)
+    record_cache_lookup('parsed_upload', hits=int(cached is not None), misses=int(cached is None))
+    if cached is not None:
+        # Parsing may still be running in the background
+        with span('parse_wait'):
+            return cached.result()
+
+    processor = GoodreadsDataProcessor(data)
+    future = Future()
+    future.set_result(processor)
+    parsed_uploads.put(digest, future, len(data) * PARSED_SIZE_FACTOR)
+    return processor
+
+
+def result_key(digest: str, start_date: Optional[str], end_date: Optional[str]) -> str:
+    return f"{digest}:{start_date}:{end_date}"
@@ -0,0 +1,101 @@
+import gzip
+import json
+import math
+from datetime import date, datetime
+from typing import Any, Optional
+
+import numpy as np
+import pandas as pd
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Bodies smaller than this are sent as they are, compressing them costs more than it saves
+COMPRESS_MIN_BYTES = 1024
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 6
+
+
+def json_default(obj: Any) -> Any:
+    """
+    Native value for the numpy/pandas types that can end up in a statistics dict
+    NaT and pd.NA become null (NaN too with orjson, the statistics themselves use None)
+    """
+    if isinstance(obj, np.integer):
+        return int(obj)
+    if isinstance(obj, np.floating):
+        return None if math.isnan(obj) else float(obj)
+    if isinstance(obj, np.bool_):
+        return bool(obj)
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    if obj is pd.NaT or obj is pd.NA:
+        return None
+    if isinstance(obj, (pd.Timestamp, datetime, date)):
+        return obj.isoformat()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def dumps(obj: Any, compact: bool = True) -> bytes:
+    """
+    UTF-8 JSON for a statistics dict, with orjson when it is installed
+    compact=False indents with two spaces, for files meant to be read
+    """
+    if orjson is not None:
+        option = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+        if not compact:
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, default=json_default, option=option)
+    if compact:
+        return json.dumps(obj, default=json_default, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    return json.dumps(obj, default=json_default, ensure_ascii=False, indent=2).encode('utf-8')
+
+
+def _accepted_encodings(accept_encoding: str) -> dict:
+    """
+    Content codings of an Accept-Encoding header with their q-values
+    """
+    accepted = {}
+    for part in accept_encoding.split(','):
+        coding, _, params = part.strip().partition(';')
+        if not coding:
+            continue
+        quality = 1.0
+        for param in params.split(';'):
+            name, _, value = param.strip().partition('=')
+            if name == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        accepted[coding.strip().lower()] = quality
+    return accepted
+
+
+def negotiate_encoding(accept_encoding: Optional[str]) -> Optional[str]:
+    """
+    Best response coding the client accepts: br (when brotli is installed), then gzip
+    None means the body is sent uncompressed
+    """
+    accepted = _accepted_encodings(accept_encoding or '')
+    available = ['br', 'gzip'] if brotli is not None else ['gzip']
+    for coding in available:
+        quality = accepted.get(coding, accepted.get('*', 0.0))
+        if quality > 0:
+            return coding
+    return None
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == 'br':
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    if encoding == 'gzip':
+        return gzip.compress(body, compresslevel=GZIP_LEVEL)
+    raise ValueError(f"Unsupported content coding: {encoding}")
@@ -0,0 +1,175 @@
+import os
+from typing import Dict, Optional
+
+import pandas as pd
+
+from instrumentation import span
+from monthly_index import MonthlyIndex
+from process_data import (
+    CLEAN_REVIEW_COLUMN, INGEST_COLUMNS, TOP_BOOKS_SUMMARY_SIZE, GoodreadsDataProcessor, ReviewSanitizer,
+    _as_seekable, _parse_dates, _period_mask, iter_goodreads_export
+)
+
+# Rows parsed at a time in streaming mode
+STREAMING_CHUNK_ROWS = int(os.environ.get('STREAMING_CHUNK_ROWS', 5000))
+# Uploads at least this large are analyzed in streaming mode instead of being loaded whole
+STREAMING_MIN_BYTES = int(os.environ.get('STREAMING_MIN_BYTES', 8 * 1024 * 1024))
+
+# Columns the All Books Read list needs, everything else is dropped once a chunk is aggregated
+BOOK_LIST_COLUMNS = [
+    'Title', 'Author', 'My Rating', 'Number of Pages', 'Date Read',
+    'My Review', CLEAN_REVIEW_COLUMN, 'ISBN', 'Year Published'
+]
+
+
+class PeriodRows:
+    """
+    Collects the filtered chunks of a period into one frame
+    """
+
+    def __init__(self):
+        self.chunks = []
+
+    def add(self, chunk: pd.DataFrame):
+        self.chunks.append(chunk)
+
+    def frame(self) -> pd.DataFrame:
+        non_empty = [chunk for chunk in self.chunks if len(chunk)]
+        if non_empty:
+            return pd.concat(non_empty)
+        return self.chunks[0] if self.chunks else pd.DataFrame(columns=INGEST_COLUMNS)
+
+
+class StatisticsAccumulator:
+    """
+    Running aggregates for every section of get_statistics, fed one filtered chunk at a time
+
+    Counts, page sums, rating histograms, monthly counts and the longest/shortest book are
+    folded into a MonthlyIndex. Only the rows that can still show up in a section are kept:
+    the current top books, the ties for highest and lowest rating and the page extremes.
+    The book list is the output itself, it keeps just the columns it needs.
+    """
+
+    def __init__(self, top_n: int = TOP_BOOKS_SUMMARY_SIZE):
+        self.top_n = top_n
+        self.index: Optional[MonthlyIndex] = None
+        self.candidates: Optional[pd.DataFrame] = None
+        self.book_chunks = []
+        self.total_rows = 0
+
+    def add(self, chunk: pd.DataFrame):
+        if len(chunk) == 0:
+            return
+        self.total_rows += len(chunk)
+
+        chunk_index = MonthlyIndex(chunk)
+        if self.index is None:
+            self.index = chunk_index
+        else:
+            self.index.merge(chunk_index)
+
+        self.book_chunks.append(chunk[[col for col in BOOK_LIST_COLUMNS if col in chunk.columns]])
+        rows = chunk if self.candidates is None else pd.concat([self.candidates, chunk])
+        self.candidates = self._prune(rows)
+
+    def _prune(self, rows: pd.DataFrame) -> pd.DataFrame:
+        """
+        Drop the rows that can no longer be a top book, highest/lowest rated or an extreme
+        Rows stay in export order, so ties resolve the same way as on the whole frame
+        """
+        ratings = rows['My Rating']
+        keep = (ratings == ratings.max()) | (ratings == ratings.min())
+
+        top_books = rows.sort_values(['My Rating', 'Number of Pages'], ascending=[False, False]).head(self.top_n)
+        keep |= rows.index.isin(top_books.index)
+
+        summary = self.summary()
+        for extreme in (summary['longest'], summary['shortest']):
+            if extreme is not None:
+                keep |= rows.index == extreme[1]
+        return rows[keep]
+
+    def summary(self) -> dict:
+        return self.index.combine(sorted(self.index.buckets))
+
+    def books(self) -> pd.DataFrame:
+        """
+        The period's rows for the book list, the collected chunks are released
+        """
+        books = pd.concat(self.book_chunks)
+        self.book_chunks = []
+        return books
+
+
+class StreamingGoodreadsProcessor(GoodreadsDataProcessor):
+    """
+    GoodreadsDataProcessor that never holds the whole export in memory
+
+    Every call reads the export again in chunks of chunk_rows rows and only keeps the read
+    books of the requested period. Peak memory is bounded by the chunk size plus the output.
+    """
+
+    def __init__(self, csv_path, swear_words: Optional[Dict[str, str]] = None,
+                 chunk_rows: int = STREAMING_CHUNK_ROWS):
+        self.source = _as_seekable(csv_path)
+        self.start_position = self.source.tell() if hasattr(self.source, 'tell') else None
+        self.review_sanitizer = ReviewSanitizer(swear_words)
+        self.chunk_rows = chunk_rows
+        self.df = None
+        self.monthly_index = None
+        # Nothing is kept between passes, streamed exports are never snapshotted either
+        self.known_reviews = None
+        self.known_covers = None
+
+    def _period_chunks(self, start_date, end_date, int_dtypes: bool, clean_reviews: bool):
+        if self.start_position is not None:
+            self.source.seek(self.start_position)
+        for chunk in iter_goodreads_export(self.source, self.chunk_rows, int_dtypes=int_dtypes):
+            _parse_dates(chunk)
+            period = chunk[_period_mask(chunk, start_date, end_date)].copy()
+            yield self._with_clean_reviews(period) if clean_reviews else period
+
+    def _fold_period(self, start_date, end_date, new_accumulator, clean_reviews: bool = False):
+        """
+        Feed every filtered chunk of the period to a fresh accumulator and return it
+        Like read_goodreads_export, the export is read again without integer dtypes if a
+        chunk has missing values in an integer column
+        """
+        try:
+            accumulator = new_accumulator()
+            for chunk in self._period_chunks(start_date, end_date, True, clean_reviews):
+                accumulator.add(chunk)
+        except (ValueError, TypeError):
+            accumulator = new_accumulator()
+            for chunk in self._period_chunks(start_date, end_date, False, clean_reviews):
+                accumulator.add(chunk)
+        return accumulator
+
+    def _filter_date_range(self, start_date=None, end_date=None):
+        return self._fold_period(start_date, end_date, PeriodRows).frame()
+
+    def get_statistics(self, start_date=None, end_date=None, fetch_covers=True):
+        """
+        Compute the same statistics as GoodreadsDataProcessor.get_statistics in one pass
+        over the export
+        """
+        with span('stream_period'):
+            accumulator = self._fold_period(start_date, end_date, StatisticsAccumulator, clean_reviews=True)
+        if accumulator.total_rows == 0:
+            return "No books found in the specified date range."
+
+        all_books = self._all_books_read(accumulator.books(), fetch_covers=fetch_covers)
+        cover_url_map = {book['title']: book['cover_url'] for book in all_books}
+        with span('build_statistics'):
+            return self._build_statistics(
+                accumulator.candidates, accumulator.summary(), all_books, cover_url_map, start_date, end_date
+            )
+
+    def get_statistics_for_years(self, years, fetch_covers=True):
+        """
+        Statistics of several calendar years, one pass over the export per year
+        """
+        return {
+            str(year): self.get_statistics(f"{int(year):04d}-01-01", f"{int(year):04d}-12-31", fetch_covers)
+            for year in years
+        }
@@ -0,0 +1,9 @@
+import os
+import sys
+
+# Tests import the backend modules the way app.py does, from the backend directory
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Nothing a test does may end up in the caches and sketches on disk
+os.environ.setdefault('COVER_CACHE_PATH', '')
+os.environ.setdefault('PERCENTILE_PATH', '')
@@ -0,0 +1,57 @@
+import io
+
+import pytest
+
+from benchmarks.mock_providers import MockProviders
+from tests.test_statistics import BOOKS, _export
+
+
+@pytest.fixture(scope='module')
+def client():
+    mock = MockProviders(latency=0.001).start()
+    import app
+    from result_cache import analysis_results
+    app.limiter.enabled = False
+    analysis_results.clear()
+    yield app.app.test_client()
+    mock.stop()
+
+
+def _analyze(client, query='', headers=None):
+    upload = {'file': (io.BytesIO(_export(BOOKS)), 'export.csv')}
+    return client.post(f"/analyze?start_date=2023-01-01&end_date=2024-12-31{query}", data=upload, headers=headers)
+
+
+@pytest.fixture
+def behind_proxy():
+    """
+    Headers of a request forwarded by a TLS terminating proxy, with the results cached
+    for direct requests cleared
+    """
+    from result_cache import analysis_results
+    analysis_results.clear()
+    yield {'X-Forwarded-Proto': 'https', 'X-Forwarded-Host': 'api.example.com'}
+    analysis_results.clear()
+
+
+def test_job_mode_is_not_answered_from_the_result_cache(client):
+    synchronous = _analyze(client)
+    assert synchronous.status_code == 200
+    assert 'job_id' not in synchronous.get_json()
+
+    first, second = _analyze(client, '&async=1'), _analyze(client, '&async=1')
+    assert first.get_json()['job_id'] != second.get_json()['job_id']
+
+
+def test_cover_urls_keep_the_forwarded_scheme_and_host(client, behind_proxy, monkeypatch):
+    import cover_proxy
+    # Proxy the covers of the mock Open Library as well
+    monkeypatch.setattr(cover_proxy, 'COVER_PROXY_HOSTS', cover_proxy.COVER_PROXY_HOSTS | {'127.0.0.1'})
+    stats = _analyze(client, headers=behind_proxy).get_json()
+    cover_urls = [book['cover_url'] for book in stats['All Books Read']]
+    assert cover_urls and all(url.startswith('https://api.example.com/covers/') for url in cover_urls)
+
+
+def test_book_list_url_keeps_the_forwarded_scheme_and_host(client, behind_proxy):
+    book_list = _analyze(client, headers=behind_proxy).get_json()['Book_List']
+    assert book_list['url'] == f"https://api.example.com/books/{book_list['id']}"
@@ -0,0 +1,95 @@
+import pytest
+
+from book_list import BookList, _encode_cursor, parse_fields
+
+NAN = float('nan')
+
+
+def _book(title, author='Author', rating=None, pages=None, date_read=None, year_published=None):
+    return {'title': title, 'author': author, 'rating': rating, 'pages': pages, 'date_read': date_read,
+            'review': None, 'isbn': None, 'year_published': year_published, 'cover_url': None}
+
+
+@pytest.mark.parametrize('field', ['title', 'author', 'rating', 'pages', 'year_published'])
+@pytest.mark.parametrize('descending', [False, True])
+def test_missing_values_sort_last(field, descending):
+    later, earlier = _book('b', 'b', 3, 200, year_published=2001), _book('a', 'a', 5, 100, year_published=1999)
+    books = [{**later, field: None}, later, {**later, field: NAN}, earlier]
+    order = BookList(books).order(f"-{field}" if descending else field)
+    assert order == ([1, 3, 0, 2] if (later[field] > earlier[field]) == descending else [3, 1, 0, 2])
+
+
+def _books(count):
+    # Ratings and page counts repeat, so sorts have ties to break
+    return [
+        _book(f"Title {i:02d}", f"Author {i % 7}", rating=i % 5 + 1, pages=100 + 10 * (i % 4),
+              date_read=f"2024-{12 - i % 12:02d}-01", year_published=1990 + i % 9)
+        for i in range(count)
+    ]
+
+
+def _all_pages(book_list, sort, limit, fields=None):
+    books, cursor = [], None
+    while True:
+        page = book_list.page(sort, cursor, limit, fields)
+        assert page['total'] == len(book_list.books)
+        assert page['sort'] == sort
+        books.extend(page['books'])
+        cursor = page['next_cursor']
+        if cursor is None:
+            return books
+
+
+@pytest.mark.parametrize('sort', ['-date_read', 'title', '-title', 'author', 'rating', '-rating', 'pages',
+                                  '-year_published'])
+@pytest.mark.parametrize('limit', [1, 7, 25, 200])
+def test_pages_cover_every_book_once_in_sort_order(sort, limit):
+    books = _books(25)
+    book_list = BookList(books)
+    paged = _all_pages(book_list, sort, limit)
+
+    field = sort.lstrip('-')
+    expected = sorted(books, key=lambda book: book[field], reverse=sort.startswith('-'))
+    if sort == '-date_read':
+        # The default order is the order All Books Read was built in
+        expected = books
+    assert paged == expected
+    # The same cursor always gives the same page
+    assert _all_pages(book_list, sort, limit) == paged
+
+
+def test_fields_select_the_book_fields():
+    page = BookList(_books(3)).page(fields=['title', 'rating'])
+    assert page['books'] == [{'title': 'Title 00', 'rating': 1}, {'title': 'Title 01', 'rating': 2},
+                             {'title': 'Title 02', 'rating': 3}]
+
+
+@pytest.mark.parametrize('value, expected', [
+    (None, None),
+    ('', None),
+    ('title, rating', ['title', 'rating']),
+])
+def test_parse_fields(value, expected):
+    assert parse_fields(value) == expected
+
+
+def test_parse_fields_rejects_unknown_fields():
+    with pytest.raises(ValueError, match='secret'):
+        parse_fields('title,secret')
+
+
+@pytest.mark.parametrize('cursor', ['not a cursor!', 'bm9wZQ', _encode_cursor('title', 2), _encode_cursor('-rating', -1)])
+def test_invalid_cursors_are_rejected(cursor):
+    with pytest.raises(ValueError):
+        BookList(_books(5)).page('-rating', cursor)
+
+
+@pytest.mark.parametrize('sort, limit', [('review', 10), ('-cover_url', 10), ('title', 0), ('title', 201)])
+def test_invalid_sorts_and_limits_are_rejected(sort, limit):
+    with pytest.raises(ValueError):
+        BookList(_books(5)).page(sort, limit=limit)
+
+
+def test_cursor_past_the_end_gives_an_empty_last_page():
+    page = BookList(_books(5)).page('title', _encode_cursor('title', 10))
+    assert page['books'] == [] and page['next_cursor'] is None
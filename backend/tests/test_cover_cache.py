@@ -0,0 +1,74 @@
+import sqlite3
+from types import SimpleNamespace
+
+import pytest
+
+import cover_cache
+from cover_cache import CoverCache
+
+URL = 'https://covers.openlibrary.org/b/id/1-M.jpg'
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """
+    Wall clock of the cover cache, moved forward by hand
+    """
+    now = SimpleNamespace(value=1_700_000_000.0)
+    monkeypatch.setattr(cover_cache, 'time', SimpleNamespace(time=lambda: now.value))
+
+    def advance(seconds):
+        now.value += seconds
+    return advance
+
+
+def _rows(cache):
+    with sqlite3.connect(cache.path) as conn:
+        return {key for key, in conn.execute('SELECT key FROM covers')}
+
+
+def test_misses_expire_before_hits(tmp_path, clock):
+    cache = CoverCache(str(tmp_path / 'covers.sqlite3'), hit_ttl=1000, miss_ttl=100)
+    cache.set_many({'found': URL, 'missing': None})
+    assert cache.get_many(['found', 'missing']) == {'found': URL, 'missing': None}
+
+    clock(99)
+    assert cache.get_many(['found', 'missing']) == {'found': URL, 'missing': None}
+    clock(1)
+    assert cache.get_many(['found', 'missing']) == {'found': URL}
+    clock(900)
+    assert cache.get_many(['found', 'missing']) == {}
+
+
+def test_expired_rows_are_deleted_on_the_next_write(tmp_path, clock):
+    cache = CoverCache(str(tmp_path / 'covers.sqlite3'), hit_ttl=1000, miss_ttl=100)
+    cache.set_many({'found': URL, 'missing': None})
+    clock(100)
+    cache.set_many({'other': URL})
+    assert _rows(cache) == {'found', 'other'}
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path, clock):
+    cache = CoverCache(str(tmp_path / 'covers.sqlite3'), max_entries=3)
+    for key in ('a', 'b', 'c'):
+        cache.set_many({key: URL})
+        clock(1)
+    # Reading a refreshes it, b is now the least recently used
+    cache.get_many(['a'])
+    clock(1)
+    cache.set_many({'d': URL})
+    assert _rows(cache) == {'a', 'c', 'd'}
+
+    # Rewriting an entry refreshes it as well
+    clock(1)
+    cache.set_many({'c': None})
+    clock(1)
+    cache.set_many({'e': URL})
+    assert _rows(cache) == {'c', 'd', 'e'}
+
+
+def test_lookups_beyond_the_parameter_chunk(tmp_path, clock):
+    cache = CoverCache(str(tmp_path / 'covers.sqlite3'))
+    entries = {f"isbn:{i}": (URL if i % 2 else None) for i in range(1200)}
+    cache.set_many(entries)
+    assert cache.get_many([*entries, 'isbn:0', 'unknown']) == entries
@@ -0,0 +1,109 @@
+import importlib
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import cover_proxy
+
+PROVIDER_URL = 'https://books.google.com/books/content?id=abc&printsec=frontcover&img=1'
+
+
+@pytest.fixture
+def reload_with_cover_proxy(monkeypatch):
+    """
+    Reload cover_proxy and app with COVER_PROXY set to a value, and back afterwards
+    """
+    def reload(value):
+        monkeypatch.setenv('COVER_PROXY', value)
+        importlib.reload(cover_proxy)
+        import app
+        return importlib.reload(app)
+    yield reload
+    monkeypatch.undo()
+    importlib.reload(cover_proxy)
+    import app
+    importlib.reload(app)
+
+
+def _stats():
+    return {
+        'All Books Read': [{'title': 'Book', 'cover_url': PROVIDER_URL}],
+        'Book_Extremes': {'Longest Book': {'title': 'Book', 'cover_url': PROVIDER_URL}}
+    }
+
+
+@pytest.mark.parametrize('value', ['0', ''])
+def test_cover_proxy_off_leaves_provider_urls(reload_with_cover_proxy, value):
+    app = reload_with_cover_proxy(value)
+    assert app.COVER_PROXY is False
+    with app.app.test_request_context():
+        stats = app._proxied(_stats())
+    assert stats['All Books Read'][0]['cover_url'] == PROVIDER_URL
+    assert stats['Book_Extremes']['Longest Book']['cover_url'] == PROVIDER_URL
+
+
+def test_cover_proxy_on_rewrites_provider_urls(reload_with_cover_proxy):
+    app = reload_with_cover_proxy('1')
+    with app.app.test_request_context():
+        stats = app._proxied(_stats())
+    assert stats['All Books Read'][0]['cover_url'].endswith(f"/covers/{cover_proxy.cover_key(PROVIDER_URL)}")
+
+
+class _CoverHandler(BaseHTTPRequestHandler):
+    ROUTES = {
+        '/cover.jpg': (200, {}, b'cover'),
+        '/moved': (302, {'Location': '/cover.jpg'}, b''),
+        '/elsewhere': (302, {'Location': 'http://example.com/cover.jpg'}, b''),
+        '/loop': (302, {'Location': '/loop'}, b''),
+    }
+
+    def do_GET(self):
+        if self.path == '/huge':
+            # No Content-Length, so the size is only known while streaming
+            self.send_response(200)
+            self.end_headers()
+            for _ in range(3):
+                self.wfile.write(b'x' * 1024)
+            return
+        status, headers, body = self.ROUTES.get(self.path, (404, {}, b''))
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def cover_host(monkeypatch):
+    """
+    Base URL of a local cover host the proxy is allowed to fetch from
+    """
+    server = ThreadingHTTPServer(('127.0.0.1', 0), _CoverHandler)
+    server.protocol_version = 'HTTP/1.0'
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    monkeypatch.setattr(cover_proxy, 'COVER_PROXY_HOSTS', cover_proxy.COVER_PROXY_HOSTS | {'127.0.0.1'})
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def test_download_cover_follows_redirects_on_allowed_hosts(cover_host):
+    assert cover_proxy.download_cover(f"{cover_host}/moved") == b'cover'
+
+
+@pytest.mark.parametrize('path', ['/elsewhere', '/loop'])
+def test_download_cover_refuses_other_redirects(cover_host, path):
+    with pytest.raises(ValueError):
+        cover_proxy.download_cover(f"{cover_host}{path}")
+
+
+def test_download_cover_stops_at_the_size_cap(cover_host, monkeypatch):
+    monkeypatch.setattr(cover_proxy, 'COVER_FETCH_MAX_BYTES', 2048)
+    with pytest.raises(ValueError):
+        cover_proxy.download_cover(f"{cover_host}/huge")
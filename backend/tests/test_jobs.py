@@ -0,0 +1,78 @@
+import os
+import time
+from types import SimpleNamespace
+
+import pytest
+
+import jobs
+from jobs import JOB_TTL, STALE_JOB_TTL, JobStore
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """
+    Wall clock of the job store, moved forward by hand
+    """
+    now = SimpleNamespace(value=time.time())
+    monkeypatch.setattr(jobs, 'time', SimpleNamespace(time=lambda: now.value))
+
+    def advance(seconds):
+        now.value += seconds
+    return advance
+
+
+def test_running_jobs_outlive_the_ttl(clock):
+    store = JobStore()
+    job_id = store.create(total=2)
+    clock(2 * JOB_TTL)
+    store.create(total=1)
+
+    store.add_cover(job_id, 'Book__Author', 'https://example.com/cover.jpg')
+    store.finish(job_id)
+    assert store.get(job_id)['status'] == 'done'
+    assert store.get(job_id)['resolved'] == 1
+
+
+def test_finished_jobs_expire_a_ttl_after_finishing(clock):
+    store = JobStore()
+    job_id = store.create(total=1)
+    clock(2 * JOB_TTL)
+    store.finish(job_id)
+    clock(JOB_TTL - 1)
+    store.create(total=1)
+    assert store.get(job_id) is not None
+
+    clock(2)
+    store.create(total=1)
+    assert store.get(job_id) is None
+    # A job's thread finding its job gone doesn't fail
+    store.add_cover(job_id, 'Book__Author', None)
+    store.finish(job_id, error='late')
+
+
+def _age(store, job_id, seconds):
+    stamp = time.time() - seconds
+    for path in (store._meta_path(job_id), store._covers_path(job_id)):
+        os.utime(path, (stamp, stamp))
+
+
+def test_shared_jobs_expire_by_their_last_write(tmp_path):
+    store = JobStore(str(tmp_path))
+    running, finished = store.create(total=1), store.create(total=1)
+    store.finish(finished)
+    _age(store, running, JOB_TTL + 1)
+    _age(store, finished, JOB_TTL + 1)
+    store.create(total=1)
+
+    assert store.get(running)['status'] == 'running'
+    assert store.get(finished) is None
+    assert not os.path.exists(store._covers_path(finished))
+
+
+def test_shared_running_jobs_left_by_a_dead_worker_are_purged(tmp_path):
+    store = JobStore(str(tmp_path))
+    job_id = store.create(total=1)
+    _age(store, job_id, STALE_JOB_TTL + 1)
+    store.create(total=1)
+    assert store.get(job_id) is None
+    assert not os.path.exists(store._covers_path(job_id))
@@ -0,0 +1,109 @@
+import json
+
+import numpy as np
+import pytest
+
+from percentiles import (
+    PERCENTILE_METRICS, PopulationSketches, TDigest, _metric_values, add_percentiles, record_readers
+)
+
+
+def _year(year, hours):
+    return {
+        'Time_Period': {'start': f"{year}-01-01", 'end': f"{year}-12-31"},
+        'Basic_Statistics': {'estimated_hours': hours, 'total_books': 10, 'total_pages': 3000},
+        'Rating_Statistics': {'average_rating': 4.0}
+    }
+
+
+def test_an_upload_is_counted_once_per_year():
+    sketches = PopulationSketches(path='')
+    stats = {'2023': _year(2023, 50.0), '2024': _year(2024, 60.0)}
+    for _ in range(3):
+        add_percentiles(stats, sketches)
+        record_readers(stats, 'digest', sketches)
+    record_readers(_year(2024, 60.0), 'digest', sketches)
+    assert sketches.population() == 2
+
+    record_readers(_year(2024, 60.0), 'another digest', sketches)
+    assert sketches.population() == 3
+
+
+def test_ranking_doesnt_count_the_reader_in():
+    sketches = PopulationSketches(path='')
+    stats = _year(2024, 60.0)
+    add_percentiles(stats, sketches)
+    add_percentiles(stats, sketches)
+    assert sketches.population() == 0
+    assert stats['Percentiles']['population'] == 0
+
+
+DISTRIBUTIONS = {
+    'uniform': lambda rng: rng.uniform(0, 100, 20000),
+    'normal': lambda rng: rng.normal(40, 12, 20000),
+    'lognormal': lambda rng: rng.lognormal(3, 1, 20000),
+    'exponential': lambda rng: rng.exponential(30, 20000),
+}
+QUANTILES = (0.001, 0.01, 0.1, 0.25, 0.5, 0.75, 0.9, 0.99, 0.999)
+
+
+@pytest.mark.parametrize('distribution', DISTRIBUTIONS)
+def test_cdf_matches_numpy_percentiles(distribution):
+    values = DISTRIBUTIONS[distribution](np.random.default_rng(7))
+    digest = TDigest()
+    for value in values:
+        digest.add(float(value))
+
+    for q in QUANTILES:
+        estimate = digest.cdf(float(np.percentile(values, 100 * q)))
+        # Tighter near the tails, where the centroids are small
+        assert abs(estimate - q) <= max(0.1 * min(q, 1 - q), 0.001), (q, estimate)
+
+
+@pytest.mark.parametrize('distribution', DISTRIBUTIONS)
+def test_merged_digests_match_numpy_percentiles(distribution):
+    values = DISTRIBUTIONS[distribution](np.random.default_rng(11))
+    digest = TDigest()
+    for chunk in np.array_split(values, 8):
+        part = TDigest()
+        for value in chunk:
+            part.add(float(value))
+        digest.merge(part)
+
+    assert digest.count == len(values)
+    for q in QUANTILES:
+        estimate = digest.cdf(float(np.percentile(values, 100 * q)))
+        assert abs(estimate - q) <= max(0.1 * min(q, 1 - q), 0.001), (q, estimate)
+
+
+def test_digest_survives_a_dict_round_trip():
+    digest = TDigest()
+    for value in np.random.default_rng(3).lognormal(3, 1, 5000):
+        digest.add(float(value))
+    restored = TDigest.from_dict(json.loads(json.dumps(digest.to_dict())))
+
+    assert restored.count == digest.count
+    for value in (0.0, 5.0, 20.0, 50.0, 500.0, 1e6):
+        assert restored.cdf(value) == pytest.approx(digest.cdf(value), abs=1e-6)
+
+
+def test_sketches_are_saved_and_loaded_back(tmp_path):
+    path = str(tmp_path / 'percentiles.json')
+    first, second = PopulationSketches(path=path), PopulationSketches(path=path)
+    for hours in range(15):
+        first.record(_metric_values(_year(2024, float(hours))))
+    for hours in range(15, 30):
+        second.record(_metric_values(_year(2024, float(hours))))
+    first.flush()
+    second.flush()
+
+    # A new worker reads both workers' readers from the file
+    loaded = PopulationSketches(path=path)
+    ranks = loaded.percentiles({'estimated_hours': 15.0, 'total_books': 10, 'total_pages': 3000,
+                                'average_rating': 4.0})
+    assert loaded.population() == 30
+    # 15 readers below, the one equal to it counts for half
+    assert ranks['estimated_hours'] == round(100 * 15.5 / 30, 1)
+    assert ranks['total_books'] == 50.0
+    with open(path, encoding='utf-8') as f:
+        assert json.load(f)['metrics'].keys() == PERCENTILE_METRICS.keys()
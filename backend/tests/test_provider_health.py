@@ -0,0 +1,179 @@
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+
+import pytest
+
+from provider_health import (
+    CIRCUIT_COOLDOWN, CIRCUIT_MAX_COOLDOWN, CIRCUIT_MIN_REQUESTS, CIRCUIT_PROBE_TIMEOUT, HEALTH_WINDOW_SECONDS,
+    RETRY_AFTER_MAX, ProviderHealth, parse_retry_after
+)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture
+def health(clock):
+    return ProviderHealth(enabled=True, clock=clock)
+
+
+def _fail(health, times, provider='google_isbn', outcome='error'):
+    for _ in range(times):
+        health.record(provider, outcome, 0.1)
+
+
+def _state(health, service='google'):
+    return health.snapshot()[service]
+
+
+def test_circuit_needs_enough_lookups_to_open(health):
+    _fail(health, CIRCUIT_MIN_REQUESTS - 1)
+    assert _state(health) == {'state': 'closed', 'retry_in': 0.0, 'failure_rate': 1.0}
+    assert health.allow('google_isbn')
+
+
+def test_circuit_opens_once_half_the_recent_lookups_failed(health):
+    for _ in range(CIRCUIT_MIN_REQUESTS // 2):
+        health.record('google_isbn', 'success', 0.1)
+    _fail(health, CIRCUIT_MIN_REQUESTS // 2 - 1, outcome='timeout')
+    assert _state(health)['state'] == 'closed'
+
+    _fail(health, 1, outcome='timeout')
+    assert _state(health)['state'] == 'open'
+    assert _state(health)['retry_in'] == CIRCUIT_COOLDOWN
+    # Circuits are per service, every Google endpoint is skipped
+    assert not health.allow('google_isbn')
+    assert not health.allow('google_title')
+    assert health.allow('openlibrary_isbn')
+
+
+def test_failures_older_than_the_window_are_forgotten(health, clock):
+    _fail(health, CIRCUIT_MIN_REQUESTS - 1)
+    clock.advance(HEALTH_WINDOW_SECONDS + 1)
+    _fail(health, CIRCUIT_MIN_REQUESTS - 1)
+    assert _state(health)['state'] == 'closed'
+
+
+def test_successful_probe_closes_the_circuit(health, clock):
+    _fail(health, CIRCUIT_MIN_REQUESTS)
+    clock.advance(CIRCUIT_COOLDOWN - 1)
+    assert not health.allow('google_isbn')
+
+    clock.advance(1)
+    assert _state(health)['state'] == 'half_open'
+    assert health.allow('google_isbn')
+    # A single probe at a time
+    assert not health.allow('google_title')
+
+    health.record('google_isbn', 'miss', 0.1)
+    assert _state(health) == {'state': 'closed', 'retry_in': 0.0, 'failure_rate': 0.0}
+    assert health.allow('google_title')
+
+
+def test_failed_probes_double_the_cooldown_up_to_the_maximum(health, clock):
+    _fail(health, CIRCUIT_MIN_REQUESTS)
+    cooldowns = []
+    for _ in range(6):
+        cooldowns.append(_state(health)['retry_in'])
+        clock.advance(cooldowns[-1])
+        assert health.allow('google_isbn')
+        _fail(health, 1)
+    assert cooldowns == [30, 60, 120, 240, CIRCUIT_MAX_COOLDOWN, CIRCUIT_MAX_COOLDOWN]
+
+    # Once a probe works the next trip starts from the base cool-down again
+    clock.advance(_state(health)['retry_in'])
+    assert health.allow('google_isbn')
+    health.record('google_isbn', 'success', 0.1)
+    _fail(health, CIRCUIT_MIN_REQUESTS)
+    assert _state(health)['retry_in'] == CIRCUIT_COOLDOWN
+
+
+def test_probe_that_never_returns_frees_the_slot(health, clock):
+    _fail(health, CIRCUIT_MIN_REQUESTS)
+    clock.advance(CIRCUIT_COOLDOWN)
+    assert health.allow('google_isbn')
+    clock.advance(CIRCUIT_PROBE_TIMEOUT - 1)
+    assert not health.allow('google_isbn')
+    clock.advance(1)
+    assert health.allow('google_isbn')
+
+
+def test_lookups_sent_before_the_circuit_opened_are_ignored(health):
+    _fail(health, CIRCUIT_MIN_REQUESTS)
+    health.record('google_title', 'success', 0.1)
+    assert _state(health)['state'] == 'open'
+    assert _state(health)['retry_in'] == CIRCUIT_COOLDOWN
+
+
+def test_rate_limit_opens_the_circuit_for_retry_after(health, clock):
+    health.record('google_isbn_batch', 'rate_limited', 0.1, retry_after=90)
+    assert _state(health)['state'] == 'open'
+    assert _state(health)['retry_in'] == 90
+
+    clock.advance(89)
+    assert not health.allow('google_isbn')
+    clock.advance(1)
+    assert health.allow('google_isbn')
+
+
+def test_rate_limit_while_open_extends_the_cooldown(health, clock):
+    _fail(health, CIRCUIT_MIN_REQUESTS)
+    clock.advance(10)
+    health.record('google_title', 'rate_limited', 0.1, retry_after=120)
+    assert _state(health)['retry_in'] == 120
+
+
+def test_reset_closes_every_circuit(health):
+    _fail(health, CIRCUIT_MIN_REQUESTS)
+    _fail(health, CIRCUIT_MIN_REQUESTS, provider='openlibrary_title')
+    health.reset()
+    assert health.snapshot() == {}
+    assert health.allow('google_isbn') and health.allow('openlibrary_title')
+
+
+def test_disabled_health_never_skips_a_provider(clock):
+    health = ProviderHealth(enabled=False, clock=clock)
+    _fail(health, 2 * CIRCUIT_MIN_REQUESTS)
+    assert health.allow('google_isbn')
+    assert health.snapshot() == {}
+
+
+def test_providers_are_only_reordered_when_much_slower(health):
+    providers = [('google_isbn', 'a'), ('openlibrary_isbn', 'b')]
+    health.record('google_isbn', 'success', 0.3)
+    health.record('openlibrary_isbn', 'success', 0.2)
+    assert health.ordered(providers) == providers
+
+    health.reset()
+    health.record('google_isbn', 'timeout', 5.0)
+    health.record('openlibrary_isbn', 'success', 0.2)
+    assert health.ordered(providers) == providers[::-1]
+
+
+@pytest.mark.parametrize('value, expected', [
+    (None, None),
+    ('', None),
+    ('soon', None),
+    ('120', 120.0),
+    ('99999', RETRY_AFTER_MAX),
+])
+def test_parse_retry_after(value, expected):
+    assert parse_retry_after(value) == expected
+
+
+def test_parse_retry_after_http_date():
+    value = format_datetime(datetime.now(timezone.utc) + timedelta(seconds=60), usegmt=True)
+    assert parse_retry_after(value) == pytest.approx(60, abs=2)
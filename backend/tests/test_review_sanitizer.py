@@ -0,0 +1,48 @@
+import random
+import re
+
+import pandas as pd
+import pytest
+
+from benchmarks.synthetic_export import REVIEW_WORDS
+from process_data import SWEAR_WORDS, ReviewSanitizer
+
+
+def per_word_passes(review: str) -> str:
+    """
+    The original cleaning: one case-insensitive pass per swear word
+    """
+    for word, replacement in SWEAR_WORDS.items():
+        review = re.sub(re.compile(word, re.IGNORECASE), replacement, review)
+    return review
+
+
+@pytest.mark.parametrize('review, cleaned', [
+    ('classhit', 'cl@ssh!t'),
+    ('FUCKING great', 'fu@@ING great'),
+    ('Damn, the assassin', 'd@mn, the @ss@ssin'),
+    ('no swearing here', 'no swearing here'),
+])
+def test_clean_censors_overlapping_words(review, cleaned):
+    assert ReviewSanitizer().clean(review) == cleaned
+
+
+def test_clean_series_matches_clean():
+    sanitizer = ReviewSanitizer()
+    reviews = pd.Series(['classhit', None, 'shitass', 'x' * 600])
+    assert sanitizer.clean_series(reviews).tolist() == [
+        sanitizer.clean(review) if isinstance(review, str) else '' for review in reviews
+    ]
+
+
+def test_clean_matches_per_word_passes():
+    rng = random.Random(0)
+    sanitizer = ReviewSanitizer(max_length=10000)
+    for _ in range(500):
+        # Words glued together as well, so they overlap
+        review = rng.choice(['', ' ']).join(rng.choices(REVIEW_WORDS, k=rng.randint(1, 30)))
+        assert sanitizer.clean(review) == per_word_passes(review)
+
+
+def test_replacement_containing_its_word_terminates():
+    assert ReviewSanitizer({'ass': 'ass*'}).clean('ass') == 'ass*'
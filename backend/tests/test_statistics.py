@@ -0,0 +1,56 @@
+import csv
+import io
+import json
+
+import pytest
+
+from benchmarks.synthetic_export import GOODREADS_COLUMNS
+from process_data import GoodreadsDataProcessor
+from streaming import StreamingGoodreadsProcessor
+
+# (Date Read, Exclusive Shelf, My Rating): two dated reads, one read without a date
+BOOKS = [
+    ('2024/03/02', 'read', 5),
+    ('2023/07/10', 'read', 2),
+    ('', 'read', 4),
+    ('', 'to-read', 0),
+]
+
+
+def _export(books, without_pages=()) -> bytes:
+    out = io.StringIO()
+    writer = csv.DictWriter(out, GOODREADS_COLUMNS)
+    writer.writeheader()
+    for book_id, (date_read, shelf, rating) in enumerate(books, start=1):
+        writer.writerow({
+            'Book Id': book_id, 'Title': f"Book {book_id}", 'Author': 'Author', 'ISBN': '=""',
+            'My Rating': rating, 'Number of Pages': '' if book_id in without_pages else 100 + book_id,
+            'Date Read': date_read,
+            'Date Added': '2023/01/01', 'Exclusive Shelf': shelf, 'My Review': ''
+        })
+    return out.getvalue().encode()
+
+
+@pytest.mark.parametrize('processor_class', [GoodreadsDataProcessor, StreamingGoodreadsProcessor])
+def test_unbounded_period_counts_the_same_books_everywhere(processor_class):
+    processor = processor_class(_export(BOOKS))
+    stats = processor.get_statistics(start_date=None, end_date=None, fetch_covers=False)
+
+    # Undated reads belong to no period: every section counts the two dated books
+    assert stats['Basic_Statistics']['total_books'] == 2
+    assert sum(stats['Reading_Patterns']['books_per_month'].values()) == 2
+    assert sum(stats['Rating_Statistics']['rating_distribution'].values()) == 2
+    assert len(stats['All Books Read']) == 2
+    assert all(isinstance(book['date_read'], str) for book in stats['All Books Read'])
+    assert all(isinstance(book['date_read'], str) for book in stats['Top Books Summary'])
+    json.dumps(stats, allow_nan=False)
+
+
+@pytest.mark.parametrize('processor_class', [GoodreadsDataProcessor, StreamingGoodreadsProcessor])
+def test_page_counts_stay_integers_when_some_are_missing(processor_class):
+    processor = processor_class(_export(BOOKS, without_pages={2}))
+    stats = processor.get_statistics(start_date=None, end_date=None, fetch_covers=False)
+
+    assert [book['pages'] for book in stats['Top Books Summary']] == [101, None]
+    assert type(stats['Top Books Summary'][0]['pages']) is int
+    assert [book['pages'] for book in stats['All Books Read']] == [101, None]
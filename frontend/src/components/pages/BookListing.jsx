@@ -1,4 +1,4 @@
-import React from "react";
+import React, { useState, useEffect } from "react";
 import { Star } from "lucide-react";
 import { motion, AnimatePresence } from "framer-motion";
 import {
@@ -14,16 +14,37 @@ const BookListing = ({
   maxBooks = 3,
   month = null,
 }) => {
-  const sortedBooks = [...data["All Books Read"]]
-    .filter((book) => {
-      if (!month) return true;
-      const bookDate = new Date(book.date_read);
-      return bookDate.getMonth() === month - 1; // Leave it as month
-    })
-    .sort((a, b) =>
-      sortOrder === "desc" ? b.rating - a.rating : a.rating - b.rating
-    )
-    .slice(0, maxBooks);
+  const bookListUrl = month ? null : data.Book_List?.url;
+  const [pagedBooks, setPagedBooks] = useState(null);
+
+  // Top and flop books come sorted from /books/<id>, so only maxBooks of them are sent
+  useEffect(() => {
+    if (!bookListUrl) return;
+    const controller = new AbortController();
+    const params = new URLSearchParams({
+      sort: sortOrder === "desc" ? "-rating" : "rating",
+      limit: maxBooks,
+      fields: "title,author,rating,pages,review,cover_url",
+    });
+    fetch(`${bookListUrl}?${params}`, { signal: controller.signal })
+      .then((response) => (response.ok ? response.json() : null))
+      .then((page) => page && setPagedBooks(page.books))
+      .catch(() => {});
+    return () => controller.abort();
+  }, [bookListUrl, sortOrder, maxBooks]);
+
+  const sortedBooks =
+    pagedBooks ||
+    [...(data["All Books Read"] || [])]
+      .filter((book) => {
+        if (!month) return true;
+        const bookDate = new Date(book.date_read);
+        return bookDate.getMonth() === month - 1; // Leave it as month
+      })
+      .sort((a, b) =>
+        sortOrder === "desc" ? b.rating - a.rating : a.rating - b.rating
+      )
+      .slice(0, maxBooks);
 
   const RatingStars = ({ rating, size = "small" }) => {
     const starSize = size === "large" ? "w-5 h-5" : "w-4 h-4";
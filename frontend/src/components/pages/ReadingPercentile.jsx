@@ -29,7 +29,13 @@ function calculatePercentile(hours) {
 const ReadingPercentile = ({ data, onPageComplete }) => {
   const [stage, setStage] = useState(0);
   const hours = Math.round(data.Basic_Statistics.estimated_hours);
-  const percentile = calculatePercentile(hours);
+  // Ranked by the backend against every reader analyzed so far, the table above is only
+  // used until it has enough of them
+  const rankedPercentile = data.Percentiles?.estimated_hours;
+  const percentile =
+    rankedPercentile != null
+      ? Math.max(1, Math.round(rankedPercentile))
+      : calculatePercentile(hours);
 
   const formatNumber = (num) => {
     return num >= 1000 ? num.toLocaleString() : num;